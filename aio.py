@@ -0,0 +1,270 @@
+import asyncio
+import concurrent.futures
+import threading
+from datetime import datetime
+
+from flask import Blueprint, abort, current_app, render_template, request
+from markupsafe import Markup
+
+from models import Venue, Artist, venue_genres, artist_genres
+from pagination import page_args, page_query, page_result
+from queries import (
+    VENUE_AREA_KEY,
+    ARTIST_KEY,
+    SHOW_KEY,
+    stats_counts_query,
+    live_counts_query,
+    venue_areas_query,
+    build_venue_areas,
+    artists_query,
+    build_artists,
+    build_search_results,
+    shows_feed_query,
+    build_shows_feed,
+    venue_shows_query,
+    artist_shows_query,
+    show_window,
+    venue_query,
+    artist_query,
+    genres_query,
+    build_venue_profile,
+    build_artist_profile
+)
+from search import (
+    backend,
+    ilike_query,
+    tsquery_query,
+    fts_statement,
+    names_query,
+    ranked_names
+)
+
+#----------------------------------------------------------------------------#
+# Async read path.
+#
+# The read pages again under /async, with their SQL run on SQLAlchemy's
+# asyncio engine (asyncpg, or aiosqlite). A request builds the same
+# statements as the sync views, hands them all to the engine at once and
+# waits for the lot, so the independent queries of a profile page run
+# concurrently, each on its own pooled connection.
+#
+# The engine lives on one event loop in a background thread per process.
+# Flask would run an ``async def`` view on a fresh loop every request, and
+# an asyncpg pool cannot outlive the loop it was opened on.
+#----------------------------------------------------------------------------#
+
+aio = Blueprint('aio', __name__, url_prefix='/async')
+
+
+class AsyncDatabase(object):
+    """An AsyncEngine on its own loop, started on first use (after fork)."""
+
+    def __init__(self, url, options, timeout=None):
+        self.url = url
+        self.options = options
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.loop = None
+        self.thread = None
+        self.engine = None
+
+    def _start(self):
+        with self.lock:
+            if self.loop is None:
+                # Needs SQLAlchemy 1.4+ and asyncpg/aiosqlite installed.
+                from sqlalchemy.ext.asyncio import create_async_engine
+                self.engine = create_async_engine(self.url, **self.options)
+                loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(
+                    target=loop.run_forever, name='aio-db', daemon=True)
+                self.thread.start()
+                self.loop = loop
+        return self.loop
+
+    def close(self):
+        """Dispose of the engine's connections and stop its loop; the next
+        fetch() starts both again."""
+        with self.lock:
+            loop, thread, engine = self.loop, self.thread, self.engine
+            self.loop = self.thread = self.engine = None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(engine.dispose(), loop) \
+            .result(self.timeout)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(self.timeout)
+        loop.close()
+
+    async def _all(self, statement):
+        async with self.engine.connect() as connection:
+            result = await connection.execute(statement)
+            return result.fetchall()
+
+    async def _gather(self, statements):
+        return await asyncio.gather(*[self._all(s) for s in statements])
+
+    def fetch(self, *queries):
+        """Run ``queries`` (Query objects or statements) concurrently and
+        return their rows, in order.
+
+        Raises concurrent.futures.TimeoutError, after cancelling the
+        queries, if they take longer than ``timeout`` seconds.
+        """
+        statements = [getattr(q, 'statement', q) for q in queries]
+        loop = self._start()
+        future = asyncio.run_coroutine_threadsafe(
+            self._gather(statements), loop)
+        try:
+            return future.result(self.timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+def fetch(*queries):
+    return current_app.extensions['async_db'].fetch(*queries)
+
+@aio.errorhandler(ImportError)
+def missing_driver(error):
+    return render_template('errors/500.html'), 501
+
+@aio.errorhandler(concurrent.futures.TimeoutError)
+def query_timeout(error):
+    return render_template('errors/500.html'), 504
+
+#  Query helpers
+#  ----------------------------------------------------------------
+
+def paginate(query, key_columns, cursor=None, limit=50, descending=False):
+    rows, = fetch(page_query(query, key_columns, cursor, limit, descending))
+    return page_result(rows, key_columns, limit)
+
+def show_counts(model, ids, now, fresh=None):
+    """queries.show_counts(), given the rows of its stats query if they
+    were already fetched alongside other queries."""
+    counts = dict.fromkeys(ids, (0, 0))
+    if not counts:
+        return counts
+    if fresh is None:
+        fresh, = fetch(stats_counts_query(model, counts, now))
+    stale = set(counts)
+    for entity_id, total, upcoming in fresh:
+        counts[entity_id] = (upcoming, total - upcoming)
+        stale.discard(entity_id)
+    if stale:
+        live, = fetch(live_counts_query(model, stale, now))
+        for entity_id, upcoming, past in live:
+            counts[entity_id] = (upcoming, past)
+    return counts
+
+def search_results(model, term):
+    limit = current_app.config.get('SEARCH_RESULTS_LIMIT', 100)
+    term = term.strip()
+    kind = backend(term)
+    if kind == 'postgresql':
+        rows, = fetch(tsquery_query(model, term, limit))
+    elif kind == 'sqlite':
+        ranked, = fetch(fts_statement(model, term, limit))
+        rows = []
+        if ranked:
+            names, = fetch(names_query(model, [r.id for r in ranked]))
+            rows = ranked_names(ranked, names)
+    else:
+        rows, = fetch(ilike_query(model, term, limit))
+    counts = show_counts(model, [entity_id for entity_id, _ in rows],
+                         datetime.now())
+    return build_search_results(rows, counts)
+
+def _profile(model, entity_query, link, fk_column, shows_query, entity_id):
+    now = datetime.now()
+    limit = current_app.config['PROFILE_SHOWS_LIMIT']
+    pages = [show_window(shows_query, window, now)
+             for window in ('upcoming', 'past')]
+    entity, genres, upcoming, past, fresh = fetch(
+        entity_query,
+        genres_query(link, fk_column, entity_id),
+        *[page_query(query, SHOW_KEY, limit=limit, descending=descending)
+          for query, descending in pages],
+        stats_counts_query(model, [entity_id], now))
+    if not entity:
+        abort(404)
+    counts = show_counts(model, [entity_id], now, fresh)[entity_id]
+    return (entity[0], [name for name, in genres],
+            page_result(upcoming, SHOW_KEY, limit),
+            page_result(past, SHOW_KEY, limit), counts)
+
+def venue_profile(venue_id):
+    return build_venue_profile(*_profile(
+        Venue, venue_query(venue_id), venue_genres, venue_genres.c.venue_id,
+        venue_shows_query(venue_id), venue_id))
+
+def artist_profile(artist_id):
+    return build_artist_profile(*_profile(
+        Artist, artist_query(artist_id), artist_genres,
+        artist_genres.c.artist_id, artist_shows_query(artist_id), artist_id))
+
+#  Views
+#  ----------------------------------------------------------------
+
+@aio.route('/venues')
+def venues():
+    cursor, limit = page_args()
+    rows, next_cursor = paginate(venue_areas_query(), VENUE_AREA_KEY,
+                                 cursor, limit)
+    counts = show_counts(Venue, [r.id for r in rows], datetime.now())
+    return render_template('pages/venues.html',
+                           areas=build_venue_areas(rows, counts),
+                           next_cursor=next_cursor)
+
+@aio.route('/venues/search', methods=['POST'])
+def search_venues():
+    search_term = request.form.get('search_term', '')
+    return render_template('pages/search_venues.html',
+                           results=search_results(Venue, search_term),
+                           search_term=search_term)
+
+@aio.route('/venues/<int:venue_id>')
+def show_venue(venue_id):
+    venue = venue_profile(venue_id)
+    return render_template('pages/show_venue.html', name=venue["name"],
+                           profile=Markup(render_template(
+                               'pages/_venue_profile.html', venue=venue)))
+
+@aio.route('/artists')
+def artists():
+    cursor, limit = page_args()
+    rows, next_cursor = paginate(artists_query(), ARTIST_KEY, cursor, limit)
+    return render_template('pages/artists.html', artists=build_artists(rows),
+                           next_cursor=next_cursor)
+
+@aio.route('/artists/search', methods=['POST'])
+def search_artists():
+    search_term = request.form.get('search_term', '')
+    return render_template('pages/search_artists.html',
+                           results=search_results(Artist, search_term),
+                           search_term=search_term)
+
+@aio.route('/artists/<int:artist_id>')
+def show_artist(artist_id):
+    artist = artist_profile(artist_id)
+    return render_template('pages/show_artist.html', name=artist["name"],
+                           profile=Markup(render_template(
+                               'pages/_artist_profile.html', artist=artist)))
+
+@aio.route('/shows')
+def shows():
+    window = request.args.get('window', 'upcoming')
+    if window not in ('upcoming', 'all'):
+        abort(400)
+    cursor, limit = page_args()
+    rows, next_cursor = paginate(
+        shows_feed_query(upcoming_only=(window != 'all')), SHOW_KEY,
+        cursor, limit)
+    return render_template('pages/shows.html', shows=build_shows_feed(rows),
+                           window=window, next_cursor=next_cursor)
+
+def init_app(app):
+    app.extensions['async_db'] = AsyncDatabase(
+        app.config['ASYNC_DATABASE_URI'],
+        app.config.get('ASYNC_ENGINE_OPTIONS') or {},
+        app.config.get('ASYNC_QUERY_TIMEOUT'))
+    app.register_blueprint(aio)
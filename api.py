@@ -0,0 +1,291 @@
+from datetime import datetime
+
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    jsonify,
+    request,
+    stream_with_context
+)
+
+from auth import require_token
+from autocomplete import complete
+from browse import browse_args, browse
+from conditional import (
+    conditional,
+    venues_validator,
+    artists_validator,
+    shows_validator,
+    venue_validator,
+    artist_validator,
+    venue_calendar_validator,
+    artist_calendar_validator
+)
+from exporter import FORMATS, export_stream
+from geo import geocode, nearby_venues, venues_within
+from importer import format_for, import_stream
+from models import Venue, Artist
+from pagination import page_args, paginate
+from queries import (
+    VENUE_AREA_KEY,
+    ARTIST_KEY,
+    SHOW_KEY,
+    show_counts,
+    venue_areas_query,
+    build_venue_areas,
+    artists_query,
+    build_artists,
+    search_results,
+    shows_feed_query,
+    build_shows_feed,
+    venue_shows_query,
+    artist_shows_query,
+    page_shows,
+    build_venue_shows,
+    build_artist_shows,
+    venue_profile,
+    artist_profile
+)
+from scheduling import range_args, availability
+
+#----------------------------------------------------------------------------#
+# JSON API.
+#
+# Mirrors the HTML pages from the same query builders, minus the templates.
+# Every endpoint accepts ``?fields=a,b`` to trim each record to the named
+# fields; listings page with the same ``cursor``/``limit`` arguments as the
+# HTML pages.
+#----------------------------------------------------------------------------#
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+def _jsonable(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_jsonable(v) for v in value]
+    return value
+
+def select_fields(record):
+    """Keep only the ``?fields=`` requested; all fields when none given."""
+    fields = request.args.get('fields')
+    if not fields:
+        return record
+    wanted = set(f.strip() for f in fields.split(','))
+    return {k: v for k, v in record.items() if k in wanted}
+
+def page_response(key, records, next_cursor):
+    return jsonify({key: _jsonable([select_fields(r) for r in records]),
+                    "next_cursor": next_cursor})
+
+@api.errorhandler(400)
+@api.errorhandler(401)
+@api.errorhandler(403)
+@api.errorhandler(404)
+@api.errorhandler(501)
+def api_error(error):
+    return jsonify(error=error.name, message=error.description), error.code
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@api.route('/venues')
+@conditional(venues_validator)
+def venues():
+    cursor, limit = page_args()
+    rows, next_cursor = paginate(venue_areas_query(), VENUE_AREA_KEY,
+                                 cursor, limit)
+    areas = build_venue_areas(rows, show_counts(Venue,
+                                                [r.id for r in rows]))
+    for area in areas:
+        area["venues"] = [select_fields(v) for v in area["venues"]]
+    return jsonify(areas=areas, next_cursor=next_cursor)
+
+@api.route('/venues/browse')
+def browse_venues():
+    cursor, limit = page_args()
+    results = browse(Venue, browse_args(), cursor, limit)
+    results["data"] = [select_fields(r) for r in results["data"]]
+    return jsonify(results)
+
+@api.route('/venues/search')
+def search_venues():
+    results = search_results(Venue, request.args.get('q', ''))
+    return jsonify(count=results["count"],
+                   data=[select_fields(r) for r in results["data"]])
+
+def _coordinate(name, value, limit):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        value = None
+    if value is None or not -limit <= value <= limit:
+        abort(400, description='%s must be a number from -%d to %d.'
+                               % (name, limit, limit))
+    return value
+
+def suggestions(model):
+    limit = current_app.config['AUTOCOMPLETE_LIMIT']
+    limit = max(1, min(request.args.get('limit', limit, type=int), limit))
+    return jsonify(data=[{"id": entity_id, "name": name} for entity_id, name
+                         in complete(model, request.args.get('q', ''), limit)])
+
+@api.route('/venues/autocomplete')
+def autocomplete_venues():
+    return suggestions(Venue)
+
+@api.route('/venues/nearby')
+def nearby():
+    """Venues within ``radius_km`` of ``lat``/``lon`` (or of a ``city`` and
+    ``state``), nearest first; or within ``bbox=west,south,east,north``."""
+    config = current_app.config
+    limit = max(1, min(request.args.get('limit', config['GEO_RESULTS_LIMIT'],
+                                        type=int), config['GEO_RESULTS_LIMIT']))
+    if request.args.get('bbox'):
+        box = request.args['bbox'].split(',')
+        if len(box) != 4:
+            abort(400, description='bbox must be west,south,east,north.')
+        west, east = [_coordinate('bbox longitude', box[i], 180) for i in (0, 2)]
+        south, north = [_coordinate('bbox latitude', box[i], 90) for i in (1, 3)]
+        if south > north:
+            abort(400, description='bbox south must not exceed north.')
+        found = [(None, row)
+                 for row in venues_within(south, west, north, east, limit)]
+    else:
+        if request.args.get('city'):
+            center = geocode(request.args['city'], request.args.get('state'))
+            if center is None:
+                abort(404, description='City not in the geocode table.')
+        else:
+            center = (_coordinate('lat', request.args.get('lat'), 90),
+                      _coordinate('lon', request.args.get('lon'), 180))
+        radius = request.args.get('radius_km', config['GEO_DEFAULT_RADIUS_KM'],
+                                  type=float)
+        if not 0 < radius <= config['GEO_MAX_RADIUS_KM']:
+            abort(400, description='radius_km must be above 0 and at most %d.'
+                                   % config['GEO_MAX_RADIUS_KM'])
+        found = nearby_venues(center[0], center[1], radius, limit)
+
+    counts = show_counts(Venue, [row.id for _, row in found])
+    data = [{
+        "id": row.id,
+        "name": row.name,
+        "city": row.city,
+        "state": row.state,
+        "latitude": row.latitude,
+        "longitude": row.longitude,
+        "distance_km": None if distance is None else round(distance, 3),
+        "num_upcoming_shows": counts[row.id][0],
+    } for distance, row in found]
+    return jsonify(count=len(data), data=[select_fields(r) for r in data])
+
+@api.route('/venues/<int:venue_id>')
+@conditional(venue_validator)
+def venue(venue_id):
+    return jsonify(_jsonable(select_fields(venue_profile(venue_id))))
+
+@api.route('/venues/<int:venue_id>/shows/<any(upcoming, past):window>')
+def venue_shows(venue_id, window):
+    cursor, limit = page_args()
+    rows, next_cursor = page_shows(venue_shows_query(venue_id), window,
+                                   cursor, limit)
+    return page_response("shows", build_venue_shows(rows), next_cursor)
+
+@api.route('/venues/<int:venue_id>/availability')
+@conditional(venue_calendar_validator)
+def venue_availability(venue_id):
+    return jsonify(_jsonable(availability(Venue, venue_id, *range_args())))
+
+#  Artists
+#  ----------------------------------------------------------------
+
+@api.route('/artists')
+@conditional(artists_validator)
+def artists():
+    cursor, limit = page_args()
+    rows, next_cursor = paginate(artists_query(), ARTIST_KEY, cursor, limit)
+    return page_response("artists", build_artists(rows), next_cursor)
+
+@api.route('/artists/browse')
+def browse_artists():
+    cursor, limit = page_args()
+    results = browse(Artist, browse_args(), cursor, limit)
+    results["data"] = [select_fields(r) for r in results["data"]]
+    return jsonify(results)
+
+@api.route('/artists/search')
+def search_artists():
+    results = search_results(Artist, request.args.get('q', ''))
+    return jsonify(count=results["count"],
+                   data=[select_fields(r) for r in results["data"]])
+
+@api.route('/artists/autocomplete')
+def autocomplete_artists():
+    return suggestions(Artist)
+
+@api.route('/artists/<int:artist_id>')
+@conditional(artist_validator)
+def artist(artist_id):
+    return jsonify(_jsonable(select_fields(artist_profile(artist_id))))
+
+@api.route('/artists/<int:artist_id>/shows/<any(upcoming, past):window>')
+def artist_shows(artist_id, window):
+    cursor, limit = page_args()
+    rows, next_cursor = page_shows(artist_shows_query(artist_id), window,
+                                   cursor, limit)
+    return page_response("shows", build_artist_shows(rows), next_cursor)
+
+@api.route('/artists/<int:artist_id>/availability')
+@conditional(artist_calendar_validator)
+def artist_availability(artist_id):
+    return jsonify(_jsonable(availability(Artist, artist_id, *range_args())))
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@api.route('/shows')
+@conditional(shows_validator)
+def shows():
+    window = request.args.get('window', 'upcoming')
+    if window not in ('upcoming', 'all'):
+        abort(400)
+    cursor, limit = page_args()
+    rows, next_cursor = paginate(
+        shows_feed_query(upcoming_only=(window != 'all')), SHOW_KEY,
+        cursor, limit)
+    return page_response("shows", build_shows_feed(rows), next_cursor)
+
+#  Bulk import
+#  ----------------------------------------------------------------
+
+@api.route('/import/<any(venues, artists, shows):entity>', methods=['POST'])
+@require_token
+def import_data(entity):
+    # multipart upload in the "file" field, or the raw request body
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    fmt = request.args.get('format') or \
+        format_for(upload.filename if upload else '')
+    if fmt not in ('csv', 'ndjson'):
+        abort(400)
+    return jsonify(import_stream(entity, stream, fmt).to_dict())
+
+#  Bulk export
+#  ----------------------------------------------------------------
+
+@api.route('/export/<any(venues, artists, shows):entity>'
+           '.<any(csv, ndjson, parquet):fmt>')
+@require_token
+def export_data(entity, fmt):
+    try:
+        chunks = export_stream(entity, fmt)
+    except ImportError:
+        abort(501, description='Parquet export needs pyarrow installed.')
+    return Response(stream_with_context(chunks), mimetype=FORMATS[fmt],
+                    headers={'Content-Disposition':
+                             'attachment; filename=%s.%s' % (entity, fmt)})
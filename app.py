@@ -5,7 +5,9 @@ import json
 import sys
 import dateutil.parser
 import babel
+import os
 from flask import (
+    Blueprint, 
     Flask, 
     abort, 
     jsonify, 
@@ -22,18 +24,78 @@ from flask_sqlalchemy import SQLAlchemy
 import logging
 from logging import Formatter, FileHandler
 from flask_wtf import Form
+from markupsafe import Markup
 from forms import *
 
-from models import db, Venue, Artist, Show
+import aio
+import autocomplete
+import cache
+import exporter
+import geo
+import importer
+import metrics
+import profiler
+import seeder
+import stats
+from api import api
+from browse import browse_args, browse
+from cache import (
+  get_or_render, 
+  venue_key, 
+  artist_key, 
+  invalidate_venue, 
+  invalidate_artist, 
+  invalidate_show
+)
+from conditional import (
+  conditional, 
+  current_etag, 
+  venues_validator, 
+  artists_validator, 
+  shows_validator, 
+  venue_validator, 
+  artist_validator, 
+  venue_calendar_validator, 
+  artist_calendar_validator
+)
+from models import db, Venue, Artist, Show, Genre
+from pagination import page_args, paginate
+from queries import (
+  VENUE_AREA_KEY, 
+  ARTIST_KEY, 
+  SHOW_KEY, 
+  show_counts, 
+  venue_areas_query, 
+  build_venue_areas, 
+  artists_query, 
+  build_artists, 
+  search_results, 
+  shows_feed_query, 
+  build_shows_feed, 
+  venue_shows_query, 
+  artist_shows_query, 
+  page_shows, 
+  build_venue_shows, 
+  build_artist_shows, 
+  venue_profile, 
+  artist_profile
+)
+from scheduling import (
+  check_booking, 
+  range_args, 
+  adjacent_ranges, 
+  availability, 
+  calendar_months
+)
+from config import CONFIGS
 #----------------------------------------------------------------------------#
 # App Config.
 #----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object('config')
-db.init_app(app)
-migrate = Migrate(app, db)
+moment = Moment()
+migrate = Migrate()
+# The HTML pages; create_app() registers them with the API and metrics.
+pages = Blueprint('pages', __name__)
 
 # COMPLETE connect to a local postgresql database
 
@@ -41,6 +103,7 @@ migrate = Migrate(app, db)
 # Filters.
 #----------------------------------------------------------------------------#
 
+@pages.app_template_filter('datetime')
 def format_datetime(value, format='medium'):
 
   if isinstance(value, str):
@@ -54,13 +117,16 @@ def format_datetime(value, format='medium'):
       format="EE MM, dd, y h:mma"
   return babel.dates.format_datetime(date, format, locale='en')
 
-app.jinja_env.filters['datetime'] = format_datetime
+def show_tiles(shows):
+  # JSON-ready show dicts, with start_time pre-formatted like the templates
+  return [dict(show, start_time=format_datetime(show['start_time'], 'full')) 
+          for show in shows]
 
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
 
-@app.route('/')
+@pages.route('/')
 def index():
   return render_template('pages/home.html')
 
@@ -68,34 +134,21 @@ def index():
 #  Venues
 #  ----------------------------------------------------------------
 
-@app.route('/venues')
+@pages.route('/venues')
+@conditional(venues_validator)
 def venues():
   # COMPLETE replace with real venues data.
   #       num_upcoming_shows should be aggregated based on number of upcoming 
   #       shows per venue.
-  data = []
-  venues_list = Venue.query.order_by('city', 'name')
-  city = venues_list.first().city
-  state = venues_list.first().state
-  venues_list = venues_list.all()
-  venues_list.append(Venue(city='', name=''))
-
-  venues = []
-  for v in venues_list:
-    num_upcoming_shows = Show.query.filter(Show.time > datetime.now(), 
-                                           Show.venue_id == v.id).count()
-
-    if v.city != city:
-      venues_by_city = {"city": city, "state": state, "venues": venues}
-      data.append(venues_by_city)
-      venues = []
-      city, state = v.city, v.state
-    venues.append({"id": v.id, "name": v.name, "num_upcoming_shows": 
-                   num_upcoming_shows})
-
-  return render_template('pages/venues.html', areas=data);
-
-@app.route('/venues/search', methods=['POST'])
+  cursor, limit = page_args()
+  rows, next_cursor = paginate(venue_areas_query(), VENUE_AREA_KEY, 
+                               cursor, limit)
+  counts = show_counts(Venue, [r.id for r in rows])
+  data = build_venue_areas(rows, counts)
+  return render_template('pages/venues.html', areas=data, 
+                         next_cursor=next_cursor);
+
+@pages.route('/venues/search', methods=['POST'])
 def search_venues():
   # COMPLETE implement search on artists with partial string search. Ensure 
   # it is case-insensitive.
@@ -103,61 +156,27 @@ def search_venues():
   # search for "Music" should return "The Musical Hop" and 
   # "Park Square Live Music & Coffee"
   search_term = request.form.get('search_term', '')
-  res = Venue.query.filter(Venue.name.ilike('%' + search_term + '%')).all()
-  
-  data = []
-  for v in res:
-    data.append({
-      "id": v.id,
-      "name": v.name,
-      "num_upcoming_shows": Show.query.filter(Show.venue_id == v.id,
-                                              Show.time<datetime.now()).count()
-    })
-
-  response={
-    "count": len(data),
-    "data": data
-  }
+  response = search_results(Venue, search_term)
   return render_template('pages/search_venues.html', results=response, 
                          search_term=request.form.get('search_term', ''))
 
-@app.route('/venues/<int:venue_id>')
+@pages.route('/venues/browse')
+def browse_venues():
+  cursor, limit = page_args()
+  results = browse(Venue, browse_args(), cursor, limit)
+  return render_template('pages/browse.html', kind='venue', results=results, 
+                         next_cursor=results["next_cursor"])
+
+@pages.route('/venues/<int:venue_id>')
+@conditional(venue_validator)
 def show_venue(venue_id):
   # shows the venue page with the given venue_id
   # COMPLETE replace with real venue data from the venues table, using venue_id
-  venue = Venue.query.filter(Venue.id == venue_id).first()
-  shows = Show.query.join(Artist).filter(Show.venue_id == venue_id).all()
-
-  past_shows = []
-  upcoming_shows = []
-  for show in shows:
-    show_info = {"artist_id": show.artist_id,
-                 "artist_name": show.artist.name,
-                 "artist_image_link": show.artist.image_link, 
-                 "start_time": show.time}
-    if show.time <= datetime.now():
-      past_shows.append(show_info)
-    else:
-      upcoming_shows.append(show_info)
-
-  data = {    
-    "id": venue.id,
-    "name": venue.name,
-    "genres": venue.genres.strip('{}').split(','),
-    "address": venue.address,
-    "city": venue.city,
-    "state": venue.state,
-    "phone": venue.phone,
-    "website": venue.website_link,
-    "facebook_link": venue.facebook_link,
-    "seeking_talent": venue.currently_seeking,
-    "seeking_description": venue.seeking_content,
-    "image_link": venue.image_link,
-    "past_shows": past_shows,
-    "upcoming_shows": upcoming_shows,
-    "past_shows_count": len(past_shows),
-    "upcoming_shows_count": len(upcoming_shows)
-    }
+  def render():
+    venue = venue_profile(venue_id)
+    return {"name": venue["name"], 
+            "html": render_template('pages/_venue_profile.html', venue=venue)}
+
   # data1={
   #   "id": 1,
   #   "name": "The Musical Hop",
@@ -236,17 +255,39 @@ def show_venue(venue_id):
   #   "upcoming_shows_count": 1,
   # }
   # data = list(filter(lambda d: d['id'] == venue_id, [data1, data2, data3]))[0]
-  return render_template('pages/show_venue.html', venue=data)
+  profile = get_or_render(venue_key(venue_id), render, current_etag())
+  return render_template('pages/show_venue.html', name=profile["name"], 
+                         profile=Markup(profile["html"]))
+
+@pages.route('/venues/<int:venue_id>/shows/<any(upcoming, past):window>')
+def venue_shows(venue_id, window):
+  # next page of a venue's upcoming or past shows, for "Load more"
+  cursor, limit = page_args()
+  rows, next_cursor = page_shows(venue_shows_query(venue_id), window, 
+                                 cursor, limit)
+  return jsonify(shows=show_tiles(build_venue_shows(rows)), 
+                 next_cursor=next_cursor)
+
+@pages.route('/venues/<int:venue_id>/calendar')
+@conditional(venue_calendar_validator)
+def venue_calendar(venue_id):
+  start, end = range_args()
+  data = availability(Venue, venue_id, start, end)
+  earlier, later = adjacent_ranges(start, end)
+  return render_template('pages/calendar.html', entity=data, kind='venue', 
+                         months=calendar_months(data), 
+                         earlier=dict(earlier, venue_id=venue_id), 
+                         later=dict(later, venue_id=venue_id))
 
 #  Create Venue
 #  ----------------------------------------------------------------
 
-@app.route('/venues/create', methods=['GET'])
+@pages.route('/venues/create', methods=['GET'])
 def create_venue_form():
   form = VenueForm()
   return render_template('forms/new_venue.html', form=form)
 
-@app.route('/venues/create', methods=['POST'])
+@pages.route('/venues/create', methods=['POST'])
 def create_venue_submission():
   # COMPLETE insert form data as a new Venue record in the db, instead
   # COMPLETE modify data to be the data object returned from db insertion
@@ -262,7 +303,7 @@ def create_venue_submission():
         address = venue_form.address.data,
         image_link = venue_form.image_link.data,
         facebook_link = venue_form.facebook_link.data,
-        genres = venue_form.genres.data,
+        genres = Genre.from_names(venue_form.genres.data),
         website_link = venue_form.website_link.data,
         currently_seeking = venue_form.seeking_talent.data,
         seeking_content = venue_form.seeking_description.data,
@@ -289,97 +330,64 @@ def create_venue_submission():
     venue_form = VenueForm()
     return render_template('forms/new_venue.html', form=venue_form)
 
-@app.route('/venues/<venue_id>', methods=['DELETE'])
+@pages.route('/venues/<venue_id>', methods=['DELETE'])
 def delete_venue(venue_id):
   # COMPLETE Complete this endpoint for taking a venue_id, and using
   # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
   try:
     Venue.query.filter_by(id=venue_id).delete()
     db.session.commit()
+    invalidate_venue(venue_id)
   except:
     db.session.rollback()
   finally:
     db.session.close()
-  return redirect(url_for('index'))
+  return redirect(url_for('pages.index'))
   # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
   # clicking that button delete it from the db then redirect the user to the homepage
   return None
 
 #  Artists
 #  ----------------------------------------------------------------
-@app.route('/artists')
+@pages.route('/artists')
+@conditional(artists_validator)
 def artists():
   # COMPLETE replace with real data returned from querying the database
-  data = []
-  artists = Artist.query.all()
-
-  for artist in artists:
-    data.append({"id": artist.id, "name": artist.name})
+  cursor, limit = page_args()
+  rows, next_cursor = paginate(artists_query(), ARTIST_KEY, cursor, limit)
+  data = build_artists(rows)
 
-  return render_template('pages/artists.html', artists=data)
+  return render_template('pages/artists.html', artists=data, 
+                         next_cursor=next_cursor)
 
-@app.route('/artists/search', methods=['POST'])
+@pages.route('/artists/search', methods=['POST'])
 def search_artists():
   # COMPLETE implement search on artists with partial string search. Ensure it is case-insensitive.
   # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
   # search for "band" should return "The Wild Sax Band".
   search_term = request.form.get('search_term', '')
-  res = Artist.query.filter(Artist.name.ilike('%' + search_term + '%')).all()
-  
-  data = []
-  for a in res:
-    data.append({
-      "id": a.id,
-      "name": a.name,
-      "num_upcoming_shows": Show.query.filter(Show.artist_id == a.id,
-                                              Show.time<datetime.now()).count()
-    })
-
-  response={
-    "count": len(data),
-    "data": data
-  }
+  response = search_results(Artist, search_term)
 
   return render_template('pages/search_artists.html', results=response, 
                          search_term=request.form.get('search_term', ''))
 
-@app.route('/artists/<int:artist_id>')
+@pages.route('/artists/browse')
+def browse_artists():
+  cursor, limit = page_args()
+  results = browse(Artist, browse_args(), cursor, limit)
+  return render_template('pages/browse.html', kind='artist', results=results, 
+                         next_cursor=results["next_cursor"])
+
+@pages.route('/artists/<int:artist_id>')
+@conditional(artist_validator)
 def show_artist(artist_id):
   # shows the artist page with the given artist_id
   # COMPLETE replace with real artist data from the artist table, using artist_id
-  artist = Artist.query.filter(Artist.id == artist_id).first()
-
-  shows = Show.query.join(Venue).filter(Show.artist_id == artist_id).all()
-
-  past_shows = []
-  upcoming_shows = []
-  for show in shows:
-    show_info = {"venue_id": show.venue_id,
-                 "venue_name": show.venue.name,
-                 "venue_image_link": show.venue.image_link, 
-                 "start_time": show.time}
-    if show.time <= datetime.now():
-      past_shows.append(show_info)
-    else:
-      upcoming_shows.append(show_info)
-
-  data = {    
-    "id": artist.id,
-    "name": artist.name,
-    "genres": artist.genres.strip('{}""').split(','),
-    "city": artist.city,
-    "state": artist.state,
-    "phone": artist.phone,
-    "website": artist.website_link,
-    "facebook_link": artist.facebook_link,
-    "seeking_venue": artist.currently_seeking,
-    "seeking_description": artist.seeking_content,
-    "image_link": artist.image_link,
-    "past_shows": past_shows,
-    "upcoming_shows": upcoming_shows,
-    "past_shows_count": len(past_shows),
-    "upcoming_shows_count": len(upcoming_shows) 
-    }
+  def render():
+    artist = artist_profile(artist_id)
+    return {"name": artist["name"], 
+            "html": render_template('pages/_artist_profile.html', 
+                                    artist=artist)}
 
   # data1={
   #   "id": 4,
@@ -453,18 +461,40 @@ def show_artist(artist_id):
   #   "upcoming_shows_count": 3,
   # }
   # data = list(filter(lambda d: d['id'] == artist_id, [data1, data2, data3]))[0]
-  return render_template('pages/show_artist.html', artist=data)
+  profile = get_or_render(artist_key(artist_id), render, current_etag())
+  return render_template('pages/show_artist.html', name=profile["name"], 
+                         profile=Markup(profile["html"]))
+
+@pages.route('/artists/<int:artist_id>/shows/<any(upcoming, past):window>')
+def artist_shows(artist_id, window):
+  # next page of an artist's upcoming or past shows, for "Load more"
+  cursor, limit = page_args()
+  rows, next_cursor = page_shows(artist_shows_query(artist_id), window, 
+                                 cursor, limit)
+  return jsonify(shows=show_tiles(build_artist_shows(rows)), 
+                 next_cursor=next_cursor)
 
 #  Update
 #  ----------------------------------------------------------------
-@app.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@pages.route('/artists/<int:artist_id>/calendar')
+@conditional(artist_calendar_validator)
+def artist_calendar(artist_id):
+  start, end = range_args()
+  data = availability(Artist, artist_id, start, end)
+  earlier, later = adjacent_ranges(start, end)
+  return render_template('pages/calendar.html', entity=data, kind='artist', 
+                         months=calendar_months(data), 
+                         earlier=dict(earlier, artist_id=artist_id), 
+                         later=dict(later, artist_id=artist_id))
+
+@pages.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
   form = ArtistForm()
-  artist = Artist.query.filter_by(id == artist_id)
+  artist = Artist.query.filter_by(id=artist_id).first()
   artist_data={
     "id": artist.id,
     "name": artist.name,
-    "genres": artist.genres.strip('{}""').split(','),
+    "genres": artist.genre_names,
     "city": artist.city,
     "state": artist.state,
     "phone": artist.phone,
@@ -480,7 +510,7 @@ def edit_artist(artist_id):
   return render_template('forms/edit_artist.html', form=form, 
                          artist=artist_data)
 
-@app.route('/artists/<int:artist_id>/edit', methods=['POST'])
+@pages.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
   # COMPLETE take values from the form submitted, and update existing
   # artist record with ID <artist_id> using the new attributes
@@ -495,18 +525,19 @@ def edit_artist_submission(artist_id):
       artist.phone = artist_form.phone.data
       artist.image_link = artist_form.image_link.data
       artist.facebook_link = artist_form.facebook_link.data
-      artist.genres = artist_form.genres.data
+      artist.genres = Genre.from_names(artist_form.genres.data)
       artist.website_link = artist_form.website_link.data
-      artist.currently_seeking = artist_form.seeking_talent.data
+      artist.currently_seeking = artist_form.seeking_venue.data
       artist.seeking_content = artist_form.seeking_description.data
       db.session.commit()
+      invalidate_artist(artist_id)
       flash('Artist ' + request.form['name'] + ' was successfully updated!')
     except Exception as e:
       db.session.rollback()
     finally:
       db.session.close()
 
-    return redirect(url_for('show_artist', artist_id=artist_id))
+    return redirect(url_for('pages.show_artist', artist_id=artist_id))
   else:
     message = []
     for field, errors in artist_form.errors.items():
@@ -517,7 +548,7 @@ def edit_artist_submission(artist_id):
     artist_data={
       "id": artist.id,
       "name": artist.name,
-      "genres": artist.genres.strip('{}""').split(','),
+      "genres": artist.genre_names,
       "city": artist.city,
       "state": artist.state,
       "phone": artist.phone,
@@ -533,14 +564,14 @@ def edit_artist_submission(artist_id):
                          artist=artist_data)
 
 
-@app.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@pages.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
   form = VenueForm()
   venue = Venue.query.filter_by(id=venue_id).first()
   venue_data={
     "id": venue.id,
     "name": venue.name,
-    "genres": venue.genres.strip('{}""').split(','),
+    "genres": venue.genre_names,
     "address": venue.address,
     "city": venue.city,
     "state": venue.state,
@@ -555,7 +586,7 @@ def edit_venue(venue_id):
   form = VenueForm(data=venue_data)
   return render_template('forms/edit_venue.html', form=form, venue=venue_data)
 
-@app.route('/venues/<int:venue_id>/edit', methods=['POST'])
+@pages.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):
   # COMPLETE take values from the form submitted, and update existing
   # venue record with ID <venue_id> using the new attributes
@@ -571,17 +602,18 @@ def edit_venue_submission(venue_id):
       venue.phone = venue_form.phone.data
       venue.image_link = venue_form.image_link.data
       venue.facebook_link = venue_form.facebook_link.data
-      venue.genres = venue_form.genres.data
+      venue.genres = Genre.from_names(venue_form.genres.data)
       venue.website_link = venue_form.website_link.data
       venue.currently_seeking = venue_form.seeking_talent.data
       venue.seeking_content = venue_form.seeking_description.data
       db.session.commit()
+      invalidate_venue(venue_id)
       flash('Venue ' + request.form['name'] + ' was successfully updated!')
     except Exception as e:
       db.session.rollback()
     finally:
       db.session.close()
-    return redirect(url_for('show_venue', venue_id=venue_id))
+    return redirect(url_for('pages.show_venue', venue_id=venue_id))
   else:
     message = []
     for field, errors in venue_form.errors.items():
@@ -593,7 +625,7 @@ def edit_venue_submission(venue_id):
     venue_data={
       "id": venue.id,
       "name": venue.name,
-      "genres": venue.genres.strip('{}""').split(','),
+      "genres": venue.genre_names,
       "address": venue.address,
       "city": venue.city,
       "state": venue.state,
@@ -611,12 +643,12 @@ def edit_venue_submission(venue_id):
 #  Create Artist
 #  ----------------------------------------------------------------
 
-@app.route('/artists/create', methods=['GET'])
+@pages.route('/artists/create', methods=['GET'])
 def create_artist_form():
   form = ArtistForm()
   return render_template('forms/new_artist.html', form=form)
 
-@app.route('/artists/create', methods=['POST'])
+@pages.route('/artists/create', methods=['POST'])
 def create_artist_submission():
   # called upon submitting the new artist listing form
   # COMPLETE insert form data as a new Venue record in the db, instead
@@ -631,7 +663,7 @@ def create_artist_submission():
         city = artist_form.city.data,
         state = artist_form.state.data,
         phone = artist_form.phone.data,
-        genres = artist_form.genres.data,
+        genres = Genre.from_names(artist_form.genres.data),
         image_link = artist_form.image_link.data,
         facebook_link = artist_form.facebook_link.data,
         website_link = artist_form.website_link.data,
@@ -664,98 +696,137 @@ def create_artist_submission():
 #  Shows
 #  ----------------------------------------------------------------
 
-@app.route('/shows')
+@pages.route('/shows')
+@conditional(shows_validator)
 def shows():
   # displays list of shows at /shows
   # COMPLETE replace with real venues data.
-  data = []
-  shows_list = Show.query.order_by("time").all()
-
-  for show in shows_list:
-    artist = Artist.query.filter(Artist.id == show.artist_id).first()
-    venue = Venue.query.filter(Venue.id == show.venue_id).first()
-    data.append({
-      "venue_id": show.venue_id,
-      "venue_name": venue.name,
-      "artist_id": show.artist_id,
-      "artist_name": artist.name,
-      "artist_image_link": artist.image_link,
-      "start_time": show.time
-    })
-
-  return render_template('pages/shows.html', shows=data)
-
-@app.route('/shows/create')
+  # Only upcoming shows are listed unless ?window=all is given.
+  window = request.args.get('window', 'upcoming')
+  if window not in ('upcoming', 'all'):
+    abort(400)
+  cursor, limit = page_args()
+  rows, next_cursor = paginate(
+    shows_feed_query(upcoming_only=(window != 'all')), SHOW_KEY, 
+    cursor, limit)
+  data = build_shows_feed(rows)
+
+  return render_template('pages/shows.html', shows=data, window=window, 
+                         next_cursor=next_cursor)
+
+@pages.route('/shows/create')
 def create_shows():
   # renders form. do not touch.
   form = ShowForm()
   return render_template('forms/new_show.html', form=form)
 
-@app.route('/shows/create', methods=['POST'])
+@pages.route('/shows/create', methods=['POST'])
 def create_show_submission():
   # called to create new shows in the db, upon submitting new show listing form
   # COMPLETE insert form data as a new Show record in the db, instead
   show_form =  ShowForm(request.form, meta={'csrf': False})
   
-  if show_form.validate():
-    try:
-      show = Show(
-        venue_id = show_form.venue_id.data,
-        artist_id = show_form.artist_id.data,
-        time = show_form.start_time.data,
-      )
+  valid = show_form.validate()
+  for field in (show_form.venue_id, show_form.artist_id):
+    if not (field.data or '').strip().isdigit():
+      field.errors.append('Not a valid ID.')
+      valid = False
 
-      db.session.add(show)
+  if valid:
+    try:
+      venue_id = int(show_form.venue_id.data)
+      artist_id = int(show_form.artist_id.data)
+      # locks the venue and artist until commit, so two overlapping
+      # submissions cannot both pass the check
+      conflicts = check_booking(venue_id, artist_id, show_form.start_time.data)
+      for field, errors in conflicts.items():
+        show_form[field].errors.extend(errors)
+        valid = False
+      if valid:
+        show = Show(
+          venue_id = venue_id,
+          artist_id = artist_id,
+          time = show_form.start_time.data,
+        )
+
+        db.session.add(show)
       db.session.commit()
+      if valid:
+        invalidate_show(venue_id, artist_id)
     except:
-      error = True
+      valid = False
       db.session.rollback()
       print(sys.exc_info())
     finally:
       db.session.close()
   
+  if valid:
     flash('Show was successfully listed!')
     return render_template('pages/home.html')
-  else:
-    message = []
-    for field, errors in show_form.errors.items():
-      for err in errors:
-        message.append(f"{field}: {err}")
-    flash('An error occurred. Show could not be listed.')
-    show_form = ShowForm()
-    return render_template('forms/new_venue.html', form=show_form)
+  flash('An error occurred. Show could not be listed.')
+  return render_template('forms/new_show.html', form=show_form)
   
 
-@app.errorhandler(404)
+@pages.app_errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
-@app.errorhandler(500)
+@pages.app_errorhandler(500)
 def server_error(error):
     return render_template('errors/500.html'), 500
 
 
-if not app.debug:
+#----------------------------------------------------------------------------#
+# App Factory.
+#----------------------------------------------------------------------------#
+
+def create_app(config_name=None):
+  """Build the app for ``config_name`` (see config.CONFIGS), defaulting to
+  the FYYUR_ENV environment variable and then to development."""
+  app = Flask(__name__)
+  app.config.from_object(
+    CONFIGS[config_name or os.environ.get('FYYUR_ENV', 'development')])
+  if not app.config['SECRET_KEY']:
+    raise RuntimeError('SECRET_KEY must be set')
+
+  moment.init_app(app)
+  db.init_app(app)
+  migrate.init_app(app, db)
+  cache.init_app(app)
+  autocomplete.init_app(app)
+  importer.init_app(app)
+  exporter.init_app(app)
+  geo.init_app(app)
+  stats.init_app(app)
+  seeder.init_app(app)
+  metrics.init_app(app)
+  profiler.init_app(app)
+  aio.init_app(app)
+  app.register_blueprint(pages)
+  app.register_blueprint(api)
+
+  if not app.debug and not app.testing:
     file_handler = FileHandler('error.log')
     file_handler.setFormatter(
-        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+      Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
     )
     app.logger.setLevel(logging.INFO)
     file_handler.setLevel(logging.INFO)
     app.logger.addHandler(file_handler)
     app.logger.info('errors')
+  return app
 
 #----------------------------------------------------------------------------#
 # Launch.
 #----------------------------------------------------------------------------#
 
-# Default port:
+# Development server only; production runs wsgi.py under gunicorn.
 if __name__ == '__main__':
-    app.run()
+    create_app().run()
 
 # Or specify port manually:
 '''
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
 '''
@@ -0,0 +1,24 @@
+import hmac
+from functools import wraps
+
+from flask import abort, current_app, request
+
+#----------------------------------------------------------------------------#
+# Token authentication for the bulk endpoints.
+#
+# Callers send ``Authorization: Bearer <API_TOKEN>``. With no API_TOKEN
+# configured the endpoints are disabled rather than open.
+#----------------------------------------------------------------------------#
+
+def require_token(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config.get('API_TOKEN')
+        if not token:
+            abort(403)
+        scheme, _, given = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(
+                given.strip().encode('utf-8'), token.encode('utf-8')):
+            abort(401)
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,202 @@
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import timedelta
+
+from flask import current_app, has_app_context
+
+from models import db, Venue, Artist
+
+#----------------------------------------------------------------------------#
+# Name autocomplete.
+#
+# Each process keeps the venue and artist names in memory as a sorted array
+# of (key, id) pairs, one key per word onward ("musical hop", "hop" for
+# "The Musical Hop"), so a prefix of any word finds its run with one
+# bisection and the first matches are read off in order.
+#
+# Commits in this process update the arrays as they happen. Writes from
+# other processes arrive when the arrays are next synced, at most
+# AUTOCOMPLETE_REFRESH_SECONDS later: rows whose updated_at moved are
+# re-read, and a changed row count (a delete) rebuilds the array.
+#----------------------------------------------------------------------------#
+
+# Rows committed out of updated_at order, e.g. by a long transaction, are
+# still picked up if they are no older than this when the sync runs.
+SYNC_OVERLAP = timedelta(minutes=5)
+
+
+def normalize(text):
+    return ' '.join(re.sub(r'[^\w\s]', ' ', (text or '').casefold()).split())
+
+def word_keys(name):
+    words = normalize(name).split()
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex(object):
+    """Names of one model, searchable by the prefix of any of their words."""
+
+    def __init__(self, rows=()):
+        self.lock = threading.Lock()
+        self.names = {}
+        keys = []
+        for entity_id, name in rows:
+            self.names[entity_id] = name
+            keys.extend((key, entity_id) for key in word_keys(name))
+        keys.sort()
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.names)
+
+    def _remove(self, entity_id):
+        name = self.names.pop(entity_id, None)
+        if name is None:
+            return
+        for key in word_keys(name):
+            i = bisect_left(self.keys, (key, entity_id))
+            if i < len(self.keys) and self.keys[i] == (key, entity_id):
+                del self.keys[i]
+
+    def add(self, entity_id, name):
+        with self.lock:
+            if self.names.get(entity_id) == name:
+                return
+            self._remove(entity_id)
+            self.names[entity_id] = name
+            for key in word_keys(name):
+                insort(self.keys, (key, entity_id))
+
+    def remove(self, entity_id):
+        with self.lock:
+            self._remove(entity_id)
+
+    def complete(self, prefix, limit):
+        """``[(id, name)]`` of up to ``limit`` names with a word starting
+        with ``prefix``, in key order."""
+        prefix = normalize(prefix)
+        found = {}
+        if not prefix:
+            return []
+        with self.lock:
+            i = bisect_left(self.keys, (prefix,))
+            while i < len(self.keys) and len(found) < limit:
+                key, entity_id = self.keys[i]
+                if not key.startswith(prefix):
+                    break
+                found.setdefault(entity_id, self.names[entity_id])
+                i += 1
+        return list(found.items())
+
+
+class Autocomplete(object):
+    """The PrefixIndex of each model, synced with the database."""
+
+    def __init__(self, refresh_seconds=30):
+        self.refresh_seconds = refresh_seconds
+        self.lock = threading.Lock()
+        # model: (index, rows counted, latest updated_at, next sync)
+        self.state = {}
+
+    def _rebuild(self, model):
+        seen = db.session.query(db.func.max(model.updated_at)).scalar()
+        index = PrefixIndex(db.session.query(model.id, model.name))
+        return index, seen
+
+    def _sync(self, model):
+        state = self.state.get(model)
+        count = db.session.query(db.func.count(model.id)).scalar()
+        if state is None:
+            index, seen = self._rebuild(model)
+        else:
+            index, _, seen, _ = state
+            if seen is not None:
+                for entity_id, name, updated_at in db.session.query(
+                        model.id, model.name, model.updated_at) \
+                        .filter(model.updated_at >= seen - SYNC_OVERLAP):
+                    index.add(entity_id, name)
+                    seen = max(seen, updated_at)
+            if seen is None or len(index) != count:
+                index, seen = self._rebuild(model)
+        self.state[model] = (index, count, seen,
+                             time.monotonic() + self.refresh_seconds)
+        return index
+
+    def index(self, model):
+        state = self.state.get(model)
+        if state is not None and time.monotonic() < state[3]:
+            return state[0]
+        # one thread syncs; the others keep answering from the old array
+        if not self.lock.acquire(state is None):
+            return state[0]
+        try:
+            state = self.state.get(model)
+            if state is not None and time.monotonic() < state[3]:
+                return state[0]
+            return self._sync(model)
+        finally:
+            self.lock.release()
+
+    def expire(self):
+        """Sync every index on its next use."""
+        for model, state in list(self.state.items()):
+            self.state[model] = state[:3] + (0,)
+
+    def apply(self, changes):
+        for (model, entity_id), name in changes.items():
+            state = self.state.get(model)
+            if state is None:
+                continue
+            if name is None:
+                state[0].remove(entity_id)
+            else:
+                state[0].add(entity_id, name)
+
+
+def get_autocomplete():
+    return current_app.extensions['autocomplete']
+
+def complete(model, prefix, limit):
+    return get_autocomplete().index(model).complete(prefix, limit)
+
+#  Session events
+#  ----------------------------------------------------------------
+
+@db.event.listens_for(db.session, 'after_flush')
+def record_names(session, flush_context):
+    changes = session.info.setdefault('autocomplete', {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, (Venue, Artist)) and (
+                obj in session.new or
+                db.inspect(obj).attrs.name.history.has_changes()):
+            changes[(type(obj), obj.id)] = obj.name
+    for obj in session.deleted:
+        if isinstance(obj, (Venue, Artist)):
+            changes[(type(obj), obj.id)] = None
+
+@db.event.listens_for(db.session, 'after_bulk_delete')
+def record_bulk_delete(delete_context):
+    # Query.delete() does not say which rows went; recount after commit.
+    delete_context.session.info['autocomplete_expire'] = True
+
+@db.event.listens_for(db.session, 'after_commit')
+def apply_names(session):
+    changes = session.info.pop('autocomplete', None)
+    expire = session.info.pop('autocomplete_expire', False)
+    if not (has_app_context() and 'autocomplete' in current_app.extensions):
+        return
+    if changes:
+        get_autocomplete().apply(changes)
+    if expire:
+        get_autocomplete().expire()
+
+@db.event.listens_for(db.session, 'after_soft_rollback')
+def discard_names(session, previous_transaction):
+    session.info.pop('autocomplete', None)
+    session.info.pop('autocomplete_expire', None)
+
+def init_app(app):
+    app.extensions['autocomplete'] = Autocomplete(
+        app.config.get('AUTOCOMPLETE_REFRESH_SECONDS', 30))
@@ -0,0 +1,98 @@
+"""Compare the throughput of the sync read pages and their /async twins.
+
+Seeds a scratch database, then drives each page from several threads at
+once through the Flask test client, first the sync view and then the async
+one, and prints requests per second and mean latency for both.
+
+    python -m bench.async_views
+    python -m bench.async_views --database-url postgresql://localhost/fyyur_bench --threads 16
+
+Point it at a scratch database: existing tables there are dropped. The
+async path needs SQLAlchemy 1.4+ with aiosqlite (SQLite) or asyncpg.
+"""
+import argparse
+import os
+import threading
+import time
+
+
+def drive(app, path, threads, seconds, form=None):
+    """Request ``path`` from ``threads`` clients for ``seconds``; returns
+    ``(requests, mean latency in ms)``."""
+    deadline = time.perf_counter() + seconds
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        local = []
+        with app.test_client() as c:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                if form is None:
+                    response = c.get(path)
+                else:
+                    response = c.post(path, data=form)
+                local.append(time.perf_counter() - started)
+                assert response.status_code == 200, (path, response.status)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=client) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return len(latencies), sum(latencies) * 1000 / max(len(latencies), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default='sqlite:///async_bench.db')
+    parser.add_argument('--venues', type=int, default=500)
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--shows', type=int, default=50000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    # config.py reads the environment when imported
+    os.environ['DATABASE_URL'] = args.database_url
+    os.environ['CACHE_BACKEND'] = 'null'
+    from app import create_app
+    from bench.show_indexes import seed
+    from models import db
+    from stats import reconcile_stats
+
+    app = create_app('production' if os.environ.get('SECRET_KEY')
+                     else 'development')
+    app.config.update(DEBUG=False, SQL_PROFILE=False)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        with db.engine.begin() as conn:
+            seed(conn, args.venues, args.artists, args.shows)
+        reconcile_stats(full=True)
+        db.session.commit()
+        dialect = db.engine.dialect.name
+
+    pages = [('/venues', None), ('/artists', None), ('/shows', None),
+             ('/venues/%d' % (args.venues // 2), None),
+             ('/artists/%d' % (args.artists // 2), None)]
+    # SQLite search needs the FTS5 tables only the migrations create.
+    if dialect == 'postgresql':
+        pages += [('/venues/search', {'search_term': 'venue 1'}),
+                  ('/artists/search', {'search_term': 'artist 1'})]
+
+    print('%-28s %12s %10s %12s %10s' % ('page', 'sync req/s', 'sync ms',
+                                         'async req/s', 'async ms'))
+    for path, form in pages:
+        results = []
+        for prefix in ('', '/async'):
+            count, mean = drive(app, prefix + path, args.threads,
+                                args.seconds, form)
+            results += [count / args.seconds, mean]
+        print('%-28s %12.1f %10.2f %12.1f %10.2f' % ((path,) + tuple(results)))
+
+
+if __name__ == '__main__':
+    main()
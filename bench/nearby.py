@@ -0,0 +1,79 @@
+"""Latency of the nearby-venue and within-box searches.
+
+Seeds a scratch database with synthetic venues (see seeder.py), then times
+geo.nearby_venues() around random venues at several radii, and
+geo.venues_within() for boxes of the same size, printing p50/p95/p99 and
+the mean number of venues found.
+
+    python -m bench.nearby
+    python -m bench.nearby --database-url postgresql://localhost/fyyur_bench --venues 100000
+
+Point it at a scratch database: existing tables there are dropped.
+"""
+import argparse
+import math
+import os
+import random
+import time
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile of the sorted ``samples``."""
+    return samples[max(0, int(math.ceil(p / 100.0 * len(samples))) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default='sqlite:///nearby_bench.db')
+    parser.add_argument('--venues', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--radii', default='1,5,25,100',
+                        help='Comma-separated radii in km.')
+    args = parser.parse_args()
+
+    # config.py reads the environment when imported
+    os.environ['TEST_DATABASE_URL'] = args.database_url
+    import sqlalchemy as sa
+    from flask_migrate import downgrade, upgrade
+    from app import create_app
+    from geo import box_around, nearby_venues, venues_within
+    from models import db, Venue
+    from seeder import seed
+
+    app = create_app('testing')
+    with app.app_context():
+        downgrade(revision='base')
+        upgrade()
+        seed(args.venues, 1, 0, seed=42)
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(sa.text('ANALYZE "Venue"'))
+        else:
+            db.session.execute(sa.text('ANALYZE'))
+        db.session.commit()
+        centres = db.session.query(Venue.latitude, Venue.longitude).all()
+
+        rng = random.Random(42)
+        print('%-8s %-8s %8s %8s %8s %8s' % ('search', 'km', 'p50 ms',
+                                             'p95 ms', 'p99 ms', 'found'))
+        for radius in [float(r) for r in args.radii.split(',')]:
+            for label in ('nearby', 'box'):
+                latencies, found = [], 0
+                for _ in range(args.repeat):
+                    lat, lon = rng.choice(centres)
+                    started = time.perf_counter()
+                    if label == 'nearby':
+                        rows = nearby_venues(lat, lon, radius, args.venues)
+                    else:
+                        box = box_around(lat, lon, radius)[0]
+                        rows = venues_within(*box, limit=args.venues)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    found += len(rows)
+                latencies.sort()
+                print('%-8s %-8g %8.2f %8.2f %8.2f %8.1f'
+                      % (label, radius, percentile(latencies, 50),
+                         percentile(latencies, 95), percentile(latencies, 99),
+                         found / float(args.repeat)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""Latency and query counts for every page route of the app.
+
+Builds the schema with the migrations, seeds synthetic data when the
+database is empty (see seeder.py), then requests each route of the pages
+blueprint through the Flask test client, filling its URL arguments with
+random ids. Prints p50/p95/p99 latency and queries per request per route.
+
+    python -m bench.routes
+    python -m bench.routes --shows 1000000 --requests 200
+    python -m bench.routes --database-url postgresql://localhost/fyyur_bench --shows 10000000
+
+An existing database is reused as it is; --reseed migrates it down to an
+empty schema first, so point that at a scratch database. --writes also
+submits the create and edit forms. Exits non-zero if any request failed.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+# Deleting a venue would pull ids out from under later requests.
+SKIPPED = {'pages.delete_venue'}
+WRITES = {
+    'pages.create_venue_submission',
+    'pages.create_artist_submission',
+    'pages.create_show_submission',
+    'pages.edit_venue_submission',
+    'pages.edit_artist_submission',
+}
+SEARCH_TERMS = ['the', 'blue', 'hall', 'jazz', 'rock', 'new york', 'austin',
+                'neon', 'kings 1', 'zz']
+
+
+def venue_form(rng, ids):
+    from seeder import CITIES, GENRES
+    city, state = rng.choice(CITIES)
+    return {'name': 'Bench Venue %d' % rng.randrange(10 ** 6), 'city': city,
+            'state': state, 'address': '1 Bench Street',
+            'phone': '555-555-0100', 'genres': rng.sample(GENRES, 2),
+            'facebook_link': 'https://www.facebook.com/bench'}
+
+def artist_form(rng, ids):
+    from seeder import CITIES, GENRES
+    city, state = rng.choice(CITIES)
+    return {'name': 'Bench Artist %d' % rng.randrange(10 ** 6), 'city': city,
+            'state': state, 'phone': '555-555-0100',
+            'genres': rng.sample(GENRES, 2),
+            'facebook_link': 'https://www.facebook.com/bench'}
+
+def show_form(rng, ids):
+    return {'venue_id': str(rng.choice(ids['venue_id'])),
+            'artist_id': str(rng.choice(ids['artist_id'])),
+            'start_time': '2031-%02d-%02d %02d:00:00' % (
+                rng.randint(1, 12), rng.randint(1, 28), rng.randint(0, 23))}
+
+FORMS = {
+    'pages.search_venues': lambda rng, ids:
+        {'search_term': rng.choice(SEARCH_TERMS)},
+    'pages.search_artists': lambda rng, ids:
+        {'search_term': rng.choice(SEARCH_TERMS)},
+    'pages.create_venue_submission': venue_form,
+    'pages.create_artist_submission': artist_form,
+    'pages.create_show_submission': show_form,
+    'pages.edit_venue_submission': venue_form,
+    'pages.edit_artist_submission': artist_form,
+}
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile of the sorted ``samples``."""
+    return samples[max(0, int(math.ceil(p / 100.0 * len(samples))) - 1)]
+
+def routes(app, writes):
+    """``(endpoint, method, rule)`` for each page route to drive."""
+    found = []
+    for rule in app.url_map.iter_rules():
+        if not rule.endpoint.startswith('pages.') or \
+                rule.endpoint in SKIPPED:
+            continue
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            if method != 'GET' and rule.endpoint not in FORMS:
+                continue
+            if rule.endpoint in WRITES and not writes:
+                continue
+            found.append((rule.endpoint, method, rule))
+    return sorted(found, key=lambda r: (r[2].rule, r[1]))
+
+def drive(client, urls, endpoint, method, rule, rng, ids, count, queries):
+    """Request one route ``count`` times; returns latencies (ms), query
+    counts and failed statuses."""
+    latencies, counts, failures = [], [], []
+    for _ in range(count):
+        values = {}
+        for argument in rule.arguments:
+            values[argument] = rng.choice(ids[argument])
+        path = urls.build(endpoint, values, method=method)
+        form = FORMS[endpoint](rng, ids) if method == 'POST' else None
+        queries[0] = 0
+        started = time.perf_counter()
+        response = client.open(path, method=method, data=form)
+        latencies.append((time.perf_counter() - started) * 1000)
+        counts.append(queries[0])
+        if response.status_code >= 400:
+            failures.append('%s %s' % (path, response.status))
+    return latencies, counts, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default='sqlite:///bench_routes.db')
+    parser.add_argument('--shows', type=int, default=10000)
+    parser.add_argument('--venues', type=int)
+    parser.add_argument('--artists', type=int)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reseed', action='store_true',
+                        help='Empty the database and seed afresh.')
+    parser.add_argument('--requests', type=int, default=50,
+                        help='Timed requests per route.')
+    parser.add_argument('--warmup', type=int, default=2,
+                        help='Untimed requests per route first.')
+    parser.add_argument('--writes', action='store_true',
+                        help='Also submit the create and edit forms.')
+    parser.add_argument('--json', action='store_true',
+                        help='Print the results as JSON.')
+    args = parser.parse_args()
+
+    # config.py reads the environment when imported
+    os.environ['TEST_DATABASE_URL'] = args.database_url
+    import sqlalchemy as sa
+    from flask_migrate import downgrade, upgrade
+    from app import create_app
+    from models import db, Venue, Artist, Show
+    from seeder import seed
+
+    # The testing config: no CSRF tokens on the forms, no fragment cache.
+    app = create_app('testing')
+    app.config.update(PROPAGATE_EXCEPTIONS=False, SQL_PROFILE=False)
+    queries = [0]
+    with app.app_context():
+        if args.reseed:
+            # the migrations also own the search indexes and FTS tables
+            downgrade(revision='base')
+        upgrade()
+        if not db.session.query(Show.id).first():
+            seed(args.venues or max(1, args.shows // 50),
+                 args.artists or max(1, args.shows // 20),
+                 args.shows, seed=args.seed)
+        ids = {'venue_id': [i for i, in db.session.query(Venue.id)],
+               'artist_id': [i for i, in db.session.query(Artist.id)],
+               'window': ['upcoming', 'past']}
+        shows = db.session.query(sa.func.count(Show.id)).scalar()
+        dialect = db.engine.dialect.name
+
+        def count_query(*_):
+            queries[0] += 1
+        sa.event.listen(db.engine, 'before_cursor_execute', count_query)
+
+    rng = random.Random(args.seed)
+    urls = app.url_map.bind('localhost')
+    results, failed = [], []
+    with app.test_client() as client:
+        for endpoint, method, rule in routes(app, args.writes):
+            drive(client, urls, endpoint, method, rule, rng, ids,
+                  args.warmup, queries)
+            latencies, counts, failures = drive(
+                client, urls, endpoint, method, rule, rng, ids,
+                args.requests, queries)
+            latencies.sort()
+            results.append({
+                'method': method,
+                'route': rule.rule,
+                'requests': len(latencies),
+                'p50_ms': percentile(latencies, 50),
+                'p95_ms': percentile(latencies, 95),
+                'p99_ms': percentile(latencies, 99),
+                'mean_queries': sum(counts) / float(len(counts)),
+                'max_queries': max(counts),
+                'failures': len(failures),
+            })
+            failed += failures
+
+    if args.json:
+        print(json.dumps({'database': dialect, 'venues': len(ids['venue_id']),
+                          'artists': len(ids['artist_id']), 'shows': shows,
+                          'routes': results}, indent=2))
+    else:
+        print('%s: %d venues, %d artists, %d shows'
+              % (dialect, len(ids['venue_id']), len(ids['artist_id']), shows))
+        print('%-6s %-52s %8s %8s %8s %8s %6s %5s'
+              % ('method', 'route', 'p50 ms', 'p95 ms', 'p99 ms',
+                 'queries', 'max', 'fail'))
+        for r in results:
+            print('%-6s %-52s %8.2f %8.2f %8.2f %8.1f %6d %5d'
+                  % (r['method'], r['route'], r['p50_ms'], r['p95_ms'],
+                     r['p99_ms'], r['mean_queries'], r['max_queries'],
+                     r['failures']))
+    for failure in failed[:20]:
+        print('failed: ' + failure, file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Show the effect of the Show indexes on the hot-path queries.
+
+Seeds a throwaway database, then prints the query plan and mean latency of
+each query twice: without and then with the indexes declared on ``Show``.
+
+    python -m bench.show_indexes
+    python -m bench.show_indexes --database-url postgresql://localhost/fyyur_bench --shows 1000000
+
+Point it at a scratch database: existing tables there are dropped.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+
+from models import db, Venue, Artist, Show
+
+QUERIES = {
+    'venue upcoming': (
+        'SELECT id, time FROM "Show" WHERE venue_id = :venue_id '
+        'AND time > :now ORDER BY time LIMIT 10'),
+    'artist past': (
+        'SELECT id, time FROM "Show" WHERE artist_id = :artist_id '
+        'AND time <= :now ORDER BY time DESC LIMIT 10'),
+    'upcoming feed': (
+        'SELECT id, time FROM "Show" WHERE time > :now '
+        'ORDER BY time, id LIMIT 50'),
+    'venue counts': (
+        'SELECT venue_id, count(id) FROM "Show" WHERE venue_id = :venue_id '
+        'AND time > :now GROUP BY venue_id'),
+}
+
+
+def seed(conn, venues, artists, shows, chunk=10000):
+    conn.execute(Venue.__table__.insert(), [
+        {'name': 'Venue %d' % i, 'city': 'City %d' % (i % 50),
+         'state': 'CA', 'address': '%d Main Street' % i}
+        for i in range(venues)])
+    conn.execute(Artist.__table__.insert(), [
+        {'name': 'Artist %d' % i, 'city': 'City %d' % (i % 50), 'state': 'CA'}
+        for i in range(artists)])
+
+    rng = random.Random(42)
+    start = datetime.now() - timedelta(days=3 * 365)
+    for offset in range(0, shows, chunk):
+        conn.execute(Show.__table__.insert(), [
+            {'venue_id': rng.randint(1, venues),
+             'artist_id': rng.randint(1, artists),
+             'time': start + timedelta(minutes=rng.randrange(6 * 365 * 24 * 60))}
+            for _ in range(min(chunk, shows - offset))])
+
+
+def explain(conn, sql, params):
+    if conn.dialect.name == 'sqlite':
+        rows = conn.execute(sa.text('EXPLAIN QUERY PLAN ' + sql), params)
+        return [row[-1] for row in rows]
+    return [row[0] for row in conn.execute(sa.text('EXPLAIN ' + sql), params)]
+
+
+def measure(conn, sql, params, repeat):
+    stmt = sa.text(sql)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        conn.execute(stmt, params).fetchall()
+    return (time.perf_counter() - started) * 1000 / repeat
+
+
+def report(conn, label, params, repeat):
+    print('== %s' % label)
+    for name, sql in QUERIES.items():
+        print('-- %s: %.3f ms' % (name, measure(conn, sql, params, repeat)))
+        for line in explain(conn, sql, params):
+            print('   ' + line)
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default='sqlite://')
+    parser.add_argument('--venues', type=int, default=2000)
+    parser.add_argument('--artists', type=int, default=5000)
+    parser.add_argument('--shows', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    engine = sa.create_engine(args.database_url)
+    with engine.begin() as conn:
+        db.metadata.drop_all(conn)
+        db.metadata.create_all(conn)
+        for index in Show.__table__.indexes:
+            index.drop(conn)
+        seed(conn, args.venues, args.artists, args.shows)
+
+    params = {'venue_id': args.venues // 2, 'artist_id': args.artists // 2,
+              'now': datetime.now()}
+    with engine.begin() as conn:
+        report(conn, 'without Show indexes', params, args.repeat)
+        for index in Show.__table__.indexes:
+            index.create(conn)
+        if conn.dialect.name == 'postgresql':
+            conn.execute(sa.text('ANALYZE "Show"'))
+        else:
+            conn.execute(sa.text('ANALYZE'))
+        report(conn, 'with Show indexes', params, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+from datetime import date, datetime, time, timedelta
+
+from flask import abort, request
+
+from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres
+from pagination import paginate
+from queries import show_counts
+
+#----------------------------------------------------------------------------#
+# Faceted browse.
+#
+# Venues or artists filtered by genre, state, seeking flag and a date range
+# (a show between ``from`` and ``to``), with a count for every facet value.
+# All the counts come from one UNION ALL of grouped queries; each facet is
+# counted under every filter but its own, so picking a second genre or
+# state widens the results the way its count says it will.
+#----------------------------------------------------------------------------#
+
+FACETS = ('genre', 'state', 'seeking')
+
+# model: (genre link table, its entity column, Show foreign key)
+LINKS = {
+    Venue: (venue_genres, venue_genres.c.venue_id, Show.venue_id),
+    Artist: (artist_genres, artist_genres.c.artist_id, Show.artist_id),
+}
+
+BROWSE_KEYS = {
+    Venue: (Venue.name, Venue.id),
+    Artist: (Artist.name, Artist.id),
+}
+
+
+def _day(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.combine(date.fromisoformat(value), time())
+    except ValueError:
+        abort(400)
+
+def browse_args():
+    """Read the filters from the query string: ``genre`` and ``state``
+    (repeatable), ``seeking`` (true/false) and ``from``/``to`` dates
+    (YYYY-MM-DD, inclusive)."""
+    seeking = request.args.get('seeking', '')
+    if seeking not in ('', 'true', 'false'):
+        abort(400)
+    start, end = _day('from'), _day('to')
+    if end is not None:
+        end += timedelta(days=1)
+    if start is not None and end is not None and end <= start:
+        abort(400)
+    return {
+        "genre": sorted(set(g for g in request.args.getlist('genre') if g)),
+        "state": sorted(set(s.upper() for s in request.args.getlist('state')
+                            if s)),
+        "seeking": {'': None, 'true': True, 'false': False}[seeking],
+        "from": start,
+        "to": end,
+    }
+
+def conditions(model, filters, skip=None):
+    """WHERE clauses for ``filters``, leaving out facet ``skip``."""
+    link, link_fk, show_fk = LINKS[model]
+    clauses = []
+    if filters["genre"] and skip != 'genre':
+        clauses.append(db.session.query(link_fk)
+                       .join(Genre, Genre.id == link.c.genre_id)
+                       .filter(link_fk == model.id,
+                               Genre.name.in_(filters["genre"])).exists())
+    if filters["state"] and skip != 'state':
+        clauses.append(model.state.in_(filters["state"]))
+    if filters["seeking"] is not None and skip != 'seeking':
+        clauses.append(db.func.coalesce(model.currently_seeking, False)
+                       == filters["seeking"])
+    if filters["from"] is not None or filters["to"] is not None:
+        shows = db.session.query(Show.id).filter(show_fk == model.id)
+        if filters["from"] is not None:
+            shows = shows.filter(Show.time >= filters["from"])
+        if filters["to"] is not None:
+            shows = shows.filter(Show.time < filters["to"])
+        clauses.append(shows.exists())
+    return clauses
+
+def facets_query(model, filters):
+    """``(facet, value, count)`` rows for every facet, plus a ``total`` row
+    counting the matches, in one statement."""
+    link, link_fk, _ = LINKS[model]
+    seeking = db.case([(db.func.coalesce(model.currently_seeking, False),
+                        db.literal_column("'true'"))],
+                      else_=db.literal_column("'false'"))
+    total = db.session.query(
+        db.literal_column("'total'").label('facet'),
+        db.literal_column("''").label('value'),
+        db.func.count(model.id).label('count')
+    ).filter(*conditions(model, filters))
+    genres = db.session.query(
+        db.literal_column("'genre'"), Genre.name, db.func.count(model.id)
+    ).select_from(model) \
+        .join(link, link_fk == model.id) \
+        .join(Genre, Genre.id == link.c.genre_id) \
+        .filter(*conditions(model, filters, skip='genre')) \
+        .group_by(Genre.name)
+    states = db.session.query(
+        db.literal_column("'state'"), model.state, db.func.count(model.id)
+    ).filter(*conditions(model, filters, skip='state')) \
+        .group_by(model.state)
+    seeking_counts = db.session.query(
+        db.literal_column("'seeking'"), seeking, db.func.count(model.id)
+    ).filter(*conditions(model, filters, skip='seeking')) \
+        .group_by(seeking)
+    return total.union_all(genres, states, seeking_counts)
+
+def build_facets(rows, filters):
+    """``(total, {facet: [{value, count, selected}]})``, busiest values
+    first; selected values are listed even when nothing matches them."""
+    total, counts = 0, {facet: {} for facet in FACETS}
+    for facet, value, count in rows:
+        if facet == 'total':
+            total = count
+        else:
+            counts[facet][value] = count
+    selected = {
+        "genre": filters["genre"],
+        "state": filters["state"],
+        "seeking": [] if filters["seeking"] is None
+                   else [str(filters["seeking"]).lower()],
+    }
+    facets = {}
+    for facet in FACETS:
+        for value in selected[facet]:
+            counts[facet].setdefault(value, 0)
+        facets[facet] = [{
+            "value": value,
+            "count": count,
+            "selected": value in selected[facet],
+        } for value, count in sorted(counts[facet].items(),
+                                     key=lambda item: (-item[1], item[0]))]
+    return total, facets
+
+def browse(model, filters, cursor=None, limit=50):
+    """A page of ``model`` matching ``filters``, with the facet counts."""
+    key = BROWSE_KEYS[model]
+    rows, next_cursor = paginate(
+        db.session.query(model.id, model.name, model.city, model.state,
+                         model.currently_seeking)
+        .filter(*conditions(model, filters)), key, cursor, limit)
+    total, facets = build_facets(facets_query(model, filters).all(), filters)
+    counts = show_counts(model, [r.id for r in rows])
+    return {
+        "count": total,
+        "facets": facets,
+        "data": [{
+            "id": r.id,
+            "name": r.name,
+            "city": r.city,
+            "state": r.state,
+            "seeking": bool(r.currently_seeking),
+            "num_upcoming_shows": counts[r.id][0],
+        } for r in rows],
+        "next_cursor": next_cursor,
+    }
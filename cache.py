@@ -0,0 +1,150 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+from models import db, Show
+
+#----------------------------------------------------------------------------#
+# Rendered-fragment cache.
+#
+# Venue and artist pages cache their rendered profile under 'venue:<id>' and
+# 'artist:<id>', stored with the ETag of the data it was rendered from. A
+# fragment is served only while the page's current ETag matches, so an
+# upcoming show becoming a past show, or a write served by another worker,
+# re-renders it. Writes also evict the pages that display the changed row,
+# so this worker's memory is freed at once.
+#
+# Backends share get/set/delete; values must be JSON-serialisable so the
+# Redis backend can store them.
+#----------------------------------------------------------------------------#
+
+class LRUCache(object):
+    """In-process cache evicting the least recently used entry when full."""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache(object):
+    """Cache shared by every worker, on any client with the redis-py API."""
+
+    def __init__(self, client, ttl=300, prefix='fyyur:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        self.client.setex(self.prefix + key, self.ttl if ttl is None else ttl,
+                          json.dumps(value))
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+
+class NullCache(object):
+    """Caching disabled: every lookup misses."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+
+def init_app(app):
+    backend = app.config.get('CACHE_BACKEND', 'lru')
+    ttl = app.config.get('CACHE_TTL', 300)
+    if backend == 'redis':
+        import redis
+        cache = RedisCache(redis.Redis.from_url(app.config['CACHE_REDIS_URL']),
+                           ttl=ttl)
+    elif backend == 'lru':
+        cache = LRUCache(maxsize=app.config.get('CACHE_MAXSIZE', 1024), ttl=ttl)
+    else:
+        cache = NullCache()
+    app.extensions['fragment_cache'] = cache
+
+def get_cache():
+    return current_app.extensions['fragment_cache']
+
+def get_or_render(key, render, version):
+    """Return the cached value for ``key`` if it was stored under
+    ``version``, else call ``render`` and store the result. With no
+    ``version`` the cache is bypassed."""
+    if version is None:
+        return render()
+    cache = get_cache()
+    entry = cache.get(key)
+    if entry is not None and entry["version"] == version:
+        return entry["value"]
+    value = render()
+    cache.set(key, {"version": version, "value": value})
+    return value
+
+#  Invalidation
+#  ----------------------------------------------------------------
+
+def venue_key(venue_id):
+    return 'venue:%d' % int(venue_id)
+
+def artist_key(artist_id):
+    return 'artist:%d' % int(artist_id)
+
+def invalidate_venue(venue_id):
+    # artist pages list the venue's name and image next to their shows
+    artist_ids = db.session.query(Show.artist_id) \
+        .filter(Show.venue_id == venue_id).distinct()
+    get_cache().delete(venue_key(venue_id),
+                       *[artist_key(a) for a, in artist_ids])
+
+def invalidate_artist(artist_id):
+    venue_ids = db.session.query(Show.venue_id) \
+        .filter(Show.artist_id == artist_id).distinct()
+    get_cache().delete(artist_key(artist_id),
+                       *[venue_key(v) for v, in venue_ids])
+
+def invalidate_show(venue_id, artist_id):
+    get_cache().delete(venue_key(venue_id), artist_key(artist_id))
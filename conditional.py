@@ -0,0 +1,151 @@
+import hashlib
+from collections import namedtuple
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import g, make_response, request, session
+
+from models import db, Venue, Artist, Show
+from scheduling import range_args
+
+#----------------------------------------------------------------------------#
+# Conditional GET.
+#
+# A validator returns a tuple of values that changes whenever the page would:
+# row counts catch deletes, max(updated_at) catches edits, and the time of
+# the next upcoming show catches a show moving from "upcoming" to "past".
+# All of it comes back from one aggregate query, so a 304 skips the page
+# queries and the rendering. Last-Modified is the latest updated_at alone;
+# the next show only feeds the ETag.
+#----------------------------------------------------------------------------#
+
+# Parts that feed only the ETag: the next show is a future start time and
+# a calendar's range is what it shows, neither a modification time.
+ETAG_ONLY = ('next_show', 'start', 'end')
+
+def _last_modified(parts):
+    """The latest updated_at among ``parts``, as an aware UTC datetime."""
+    names = getattr(parts, '_fields', None) or (None,) * len(parts)
+    stamps = [p for name, p in zip(names, parts)
+              if name not in ETAG_ONLY and isinstance(p, datetime)]
+    if not stamps:
+        return None
+    return max(stamps).replace(microsecond=0, tzinfo=timezone.utc)
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    if since is not None and last_modified is not None:
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified <= since
+    return False
+
+def conditional(validator):
+    """Answer matching If-None-Match/If-Modified-Since requests with a 304.
+
+    ``validator`` is called with the view's arguments and returns the tuple
+    the validators are derived from; the query string is folded into the
+    ETag since it selects the page.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Pending flash messages are part of the body; always render.
+            if session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            parts = validator(**kwargs)
+            source = repr((request.full_path,) + tuple(parts))
+            etag = hashlib.sha1(source.encode('utf-8')).hexdigest()
+            last_modified = _last_modified(parts)
+            g.conditional_etag = etag
+
+            if _not_modified(etag, last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+def current_etag():
+    """The ETag of the page being rendered, or None outside @conditional
+    (and while flash messages are pending)."""
+    return g.get('conditional_etag')
+
+#  Validators
+#  ----------------------------------------------------------------
+
+def _next_show(*criteria):
+    return db.session.query(db.func.min(Show.time)) \
+        .filter(Show.time > datetime.now(), *criteria)
+
+def _shows_changed(*criteria):
+    return db.session.query(db.func.max(Show.updated_at)).filter(*criteria)
+
+def _show_count(*criteria):
+    return db.session.query(db.func.count(Show.id)).filter(*criteria)
+
+def venues_validator():
+    return db.session.query(
+        db.session.query(db.func.max(Venue.updated_at)).label('venues'),
+        db.session.query(db.func.count(Venue.id)).label('count'),
+        _shows_changed().label('shows'),
+        _show_count().label('show_count'),
+        _next_show().label('next_show')
+    ).one()
+
+def artists_validator():
+    return db.session.query(
+        db.func.max(Artist.updated_at), db.func.count(Artist.id)).one()
+
+def shows_validator():
+    return db.session.query(
+        _shows_changed().label('shows'),
+        _show_count().label('show_count'),
+        db.session.query(db.func.max(Venue.updated_at)).label('venues'),
+        db.session.query(db.func.max(Artist.updated_at)).label('artists'),
+        _next_show().label('next_show')
+    ).one()
+
+def venue_validator(venue_id):
+    return db.session.query(
+        db.session.query(Venue.updated_at)
+            .filter(Venue.id == venue_id).label('venue'),
+        db.session.query(db.func.max(Artist.updated_at))
+            .join(Show, Show.artist_id == Artist.id)
+            .filter(Show.venue_id == venue_id).label('artists'),
+        _shows_changed(Show.venue_id == venue_id).label('shows'),
+        _show_count(Show.venue_id == venue_id).label('show_count'),
+        _next_show(Show.venue_id == venue_id).label('next_show')
+    ).one()
+
+def artist_validator(artist_id):
+    return db.session.query(
+        db.session.query(Artist.updated_at)
+            .filter(Artist.id == artist_id).label('artist'),
+        db.session.query(db.func.max(Venue.updated_at))
+            .join(Show, Show.venue_id == Venue.id)
+            .filter(Show.artist_id == artist_id).label('venues'),
+        _shows_changed(Show.artist_id == artist_id).label('shows'),
+        _show_count(Show.artist_id == artist_id).label('show_count'),
+        _next_show(Show.artist_id == artist_id).label('next_show')
+    ).one()
+
+def _with_range(parts):
+    """``parts`` plus the calendar range the request resolves to; without
+    ``?start=`` it follows today's date, which the data cannot show."""
+    fields = tuple(parts._fields) + ('start', 'end')
+    return namedtuple('CalendarParts', fields)(*parts, *range_args())
+
+def venue_calendar_validator(venue_id):
+    return _with_range(venue_validator(venue_id))
+
+def artist_calendar_validator(artist_id):
+    return _with_range(artist_validator(artist_id))
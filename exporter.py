@@ -0,0 +1,200 @@
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import islice
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from models import db, Venue, Artist, Show, venue_genres, artist_genres, Genre
+
+#----------------------------------------------------------------------------#
+# Bulk export.
+#
+# Rows are read through a server-side cursor (``stream_results``) in batches
+# of EXPORT_BATCH_SIZE and each batch is encoded and handed on before the
+# next is fetched, so memory stays flat however many rows are exported.
+# Column names match the import forms, so an export can be re-imported:
+# booleans are written as true/false and NDJSON genres as a JSON list.
+#----------------------------------------------------------------------------#
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _genre_list(link, fk_column, entity_id):
+    if db.engine.dialect.name == 'postgresql':
+        joined = db.func.string_agg(Genre.name, db.literal_column("','"))
+    else:
+        joined = db.func.group_concat(Genre.name, ',')
+    return db.session.query(joined) \
+        .select_from(link) \
+        .join(Genre, Genre.id == link.c.genre_id) \
+        .filter(fk_column == entity_id) \
+        .label('genres')
+
+def export_query(entity):
+    if entity == 'venues':
+        return db.session.query(
+            Venue.id, Venue.name, Venue.city, Venue.state, Venue.address,
+            Venue.phone, Venue.image_link, Venue.facebook_link,
+            Venue.website_link,
+            _genre_list(venue_genres, venue_genres.c.venue_id, Venue.id),
+            Venue.currently_seeking.label('seeking_talent'),
+            Venue.seeking_content.label('seeking_description')
+        ).order_by(Venue.id)
+    if entity == 'artists':
+        return db.session.query(
+            Artist.id, Artist.name, Artist.city, Artist.state, Artist.phone,
+            Artist.image_link, Artist.facebook_link, Artist.website_link,
+            _genre_list(artist_genres, artist_genres.c.artist_id, Artist.id),
+            Artist.currently_seeking.label('seeking_venue'),
+            Artist.seeking_content.label('seeking_description')
+        ).order_by(Artist.id)
+    return db.session.query(
+        Show.id,
+        Show.venue_id,
+        Venue.name.label('venue_name'),
+        Show.artist_id,
+        Artist.name.label('artist_name'),
+        Show.time.label('start_time')
+    ).join(Venue, Venue.id == Show.venue_id) \
+     .join(Artist, Artist.id == Show.artist_id) \
+     .order_by(Show.id)
+
+def _batches(query, size):
+    rows = iter(query.execution_options(stream_results=True).yield_per(size))
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+def _plain(value):
+    return value.strftime(TIME_FORMAT) if isinstance(value, datetime) else value
+
+def _csv_value(value):
+    # str(False) is 'False', which the import's BooleanField reads as true
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return _plain(value)
+
+def _json_value(column, value):
+    if column == 'genres':
+        return value.split(',') if value else []
+    return _plain(value)
+
+#  Encoders
+#  ----------------------------------------------------------------
+
+def csv_chunks(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows([[_csv_value(v) for v in row] for row in batch])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+def ndjson_chunks(columns, batches):
+    for batch in batches:
+        yield ''.join(
+            json.dumps({c: _json_value(c, v) for c, v in zip(columns, row)})
+            + '\n'
+            for row in batch).encode('utf-8')
+
+
+class _ChunkSink(object):
+    """Write-only file object handing bytes to a generator as they arrive."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+def parquet_chunks(columns, batches, query):
+    # pyarrow is optional; importing here fails before any bytes are sent.
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {db.Integer: pa.int64(), db.Boolean: pa.bool_(),
+             db.DateTime: pa.timestamp('us')}
+    schema = pa.schema([
+        (c['name'], next((t for sa_type, t in types.items()
+                          if isinstance(c['type'], sa_type)), pa.string()))
+        for c in query.column_descriptions])
+
+    def chunks():
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema)
+        for batch in batches:
+            # one row group per batch
+            writer.write_table(pa.Table.from_pylist(
+                [dict(zip(columns, row)) for row in batch], schema=schema))
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+    return chunks()
+
+def export_stream(entity, fmt, batch_size=None):
+    """Return an iterator over the encoded export of ``entity``, as bytes.
+
+    Raises ImportError for 'parquet' when pyarrow is not installed.
+    """
+    batch_size = batch_size or current_app.config.get('EXPORT_BATCH_SIZE', 5000)
+    query = export_query(entity)
+    columns = [c['name'] for c in query.column_descriptions]
+    batches = _batches(query, batch_size)
+    if fmt == 'parquet':
+        return parquet_chunks(columns, batches, query)
+    if fmt == 'ndjson':
+        return ndjson_chunks(columns, batches)
+    return csv_chunks(columns, batches)
+
+#  CLI
+#  ----------------------------------------------------------------
+
+@click.command('export-data')
+@click.argument('entity', type=click.Choice(['artists', 'shows', 'venues']))
+@click.argument('target', type=click.File('wb'))
+@click.option('--format', 'fmt', type=click.Choice(sorted(FORMATS)),
+              default='csv', show_default=True)
+@click.option('--batch-size', type=int, help='Rows fetched per round trip.')
+@with_appcontext
+def export_data_command(entity, target, fmt, batch_size):
+    """Stream every venue, artist or show to TARGET ('-' for stdout)."""
+    for chunk in export_stream(entity, fmt, batch_size):
+        target.write(chunk)
+
+def init_app(app):
+    app.cli.add_command(export_data_command)
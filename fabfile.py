@@ -4,11 +4,15 @@ from fabric.contrib.console import confirm
 # prepare for deployment
 
 
+# smoke run of every page route against a small throwaway SQLite database;
+# fails on any error response
+SMOKE = "python -m bench.routes --database-url sqlite:///smoke.db --reseed " \
+        "--shows 2000 --requests 3 --warmup 0 --writes"
+
+
 def test():
     with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
+        result = local("python -m pytest -q && " + SMOKE, capture=True)
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
@@ -39,9 +43,12 @@ def heroku():
 
 
 def heroku_test():
-    local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
-    )
+    local("heroku run " + SMOKE)
+
+
+def bench(shows=100000, requests=50):
+    local("python -m bench.routes --shows {} --requests {}".format(
+        shows, requests))
 
 
 def deploy():
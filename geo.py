@@ -0,0 +1,357 @@
+import math
+
+import click
+from flask.cli import with_appcontext
+
+from models import db, Venue
+
+#----------------------------------------------------------------------------#
+# Venue locations.
+#
+# Venues are placed on the map from their city and state through CITIES, an
+# offline geocode table, unless coordinates are given. Each venue also
+# stores the geohash of its location: nearby points share a prefix, so a
+# circle or box on the map is covered by a handful of geohash cells and each
+# cell is one range scan on the geohash index. The rows found are then cut
+# to the exact distance in Python; the nearby search reads a small circle
+# first and widens it only while it holds too few venues. Plain B-tree
+# indexes only, so SQLite and PostgreSQL without PostGIS behave the same.
+#----------------------------------------------------------------------------#
+
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_PRECISION = 12
+# Boxes are covered with the finest cells that need no more than this many.
+MAX_CELLS = 16
+# The nearby search widens its circle from radius / 2**NEARBY_STEPS.
+NEARBY_STEPS = 5
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# (city, state): (latitude, longitude) of the city centre.
+CITIES = {
+    ('Albuquerque', 'NM'): (35.0844, -106.6504),
+    ('Anaheim', 'CA'): (33.8366, -117.9143),
+    ('Anchorage', 'AK'): (61.2181, -149.9003),
+    ('Arlington', 'TX'): (32.7357, -97.1081),
+    ('Atlanta', 'GA'): (33.7490, -84.3880),
+    ('Aurora', 'CO'): (39.7294, -104.8319),
+    ('Austin', 'TX'): (30.2672, -97.7431),
+    ('Bakersfield', 'CA'): (35.3733, -119.0187),
+    ('Baltimore', 'MD'): (39.2904, -76.6122),
+    ('Billings', 'MT'): (45.7833, -108.5007),
+    ('Birmingham', 'AL'): (33.5186, -86.8104),
+    ('Boise', 'ID'): (43.6150, -116.2023),
+    ('Boston', 'MA'): (42.3601, -71.0589),
+    ('Buffalo', 'NY'): (42.8864, -78.8784),
+    ('Burlington', 'VT'): (44.4759, -73.2121),
+    ('Chandler', 'AZ'): (33.3062, -111.8413),
+    ('Charleston', 'SC'): (32.7765, -79.9311),
+    ('Charlotte', 'NC'): (35.2271, -80.8431),
+    ('Cheyenne', 'WY'): (41.1400, -104.8202),
+    ('Chicago', 'IL'): (41.8781, -87.6298),
+    ('Chula Vista', 'CA'): (32.6401, -117.0842),
+    ('Cincinnati', 'OH'): (39.1031, -84.5120),
+    ('Cleveland', 'OH'): (41.4993, -81.6944),
+    ('Colorado Springs', 'CO'): (38.8339, -104.8214),
+    ('Columbus', 'OH'): (39.9612, -82.9988),
+    ('Corpus Christi', 'TX'): (27.8006, -97.3964),
+    ('Dallas', 'TX'): (32.7767, -96.7970),
+    ('Denver', 'CO'): (39.7392, -104.9903),
+    ('Des Moines', 'IA'): (41.5868, -93.6250),
+    ('Detroit', 'MI'): (42.3314, -83.0458),
+    ('Durham', 'NC'): (35.9940, -78.8986),
+    ('El Paso', 'TX'): (31.7619, -106.4850),
+    ('Fargo', 'ND'): (46.8772, -96.7898),
+    ('Fort Wayne', 'IN'): (41.0793, -85.1394),
+    ('Fort Worth', 'TX'): (32.7555, -97.3308),
+    ('Fresno', 'CA'): (36.7378, -119.7871),
+    ('Glendale', 'AZ'): (33.5387, -112.1860),
+    ('Greensboro', 'NC'): (36.0726, -79.7920),
+    ('Hartford', 'CT'): (41.7658, -72.6734),
+    ('Honolulu', 'HI'): (21.3069, -157.8583),
+    ('Houston', 'TX'): (29.7604, -95.3698),
+    ('Indianapolis', 'IN'): (39.7684, -86.1581),
+    ('Irvine', 'CA'): (33.6846, -117.8265),
+    ('Jackson', 'MS'): (32.2988, -90.1848),
+    ('Jacksonville', 'FL'): (30.3322, -81.6557),
+    ('Jersey City', 'NJ'): (40.7178, -74.0431),
+    ('Kansas City', 'MO'): (39.0997, -94.5786),
+    ('Laredo', 'TX'): (27.5306, -99.4803),
+    ('Las Vegas', 'NV'): (36.1699, -115.1398),
+    ('Lexington', 'KY'): (38.0406, -84.5037),
+    ('Lincoln', 'NE'): (40.8136, -96.7026),
+    ('Little Rock', 'AR'): (34.7465, -92.2896),
+    ('Long Beach', 'CA'): (33.7701, -118.1937),
+    ('Los Angeles', 'CA'): (34.0522, -118.2437),
+    ('Louisville', 'KY'): (38.2527, -85.7585),
+    ('Lubbock', 'TX'): (33.5779, -101.8552),
+    ('Madison', 'WI'): (43.0731, -89.4012),
+    ('Manchester', 'NH'): (42.9956, -71.4548),
+    ('Memphis', 'TN'): (35.1495, -90.0490),
+    ('Mesa', 'AZ'): (33.4152, -111.8315),
+    ('Miami', 'FL'): (25.7617, -80.1918),
+    ('Milwaukee', 'WI'): (43.0389, -87.9065),
+    ('Minneapolis', 'MN'): (44.9778, -93.2650),
+    ('Nashville', 'TN'): (36.1627, -86.7816),
+    ('New Orleans', 'LA'): (29.9511, -90.0715),
+    ('New York', 'NY'): (40.7128, -74.0060),
+    ('Newark', 'NJ'): (40.7357, -74.1724),
+    ('Norfolk', 'VA'): (36.8508, -76.2859),
+    ('Oakland', 'CA'): (37.8044, -122.2712),
+    ('Oklahoma City', 'OK'): (35.4676, -97.5164),
+    ('Omaha', 'NE'): (41.2565, -95.9345),
+    ('Orlando', 'FL'): (28.5383, -81.3792),
+    ('Philadelphia', 'PA'): (39.9526, -75.1652),
+    ('Phoenix', 'AZ'): (33.4484, -112.0740),
+    ('Pittsburgh', 'PA'): (40.4406, -79.9959),
+    ('Plano', 'TX'): (33.0198, -96.6989),
+    ('Portland', 'ME'): (43.6591, -70.2568),
+    ('Portland', 'OR'): (45.5152, -122.6784),
+    ('Providence', 'RI'): (41.8240, -71.4128),
+    ('Raleigh', 'NC'): (35.7796, -78.6382),
+    ('Reno', 'NV'): (39.5296, -119.8138),
+    ('Richmond', 'VA'): (37.5407, -77.4360),
+    ('Riverside', 'CA'): (33.9806, -117.3755),
+    ('Sacramento', 'CA'): (38.5816, -121.4944),
+    ('Saint Louis', 'MO'): (38.6270, -90.1994),
+    ('Saint Paul', 'MN'): (44.9537, -93.0900),
+    ('Saint Petersburg', 'FL'): (27.7676, -82.6403),
+    ('Salt Lake City', 'UT'): (40.7608, -111.8910),
+    ('San Antonio', 'TX'): (29.4241, -98.4936),
+    ('San Diego', 'CA'): (32.7157, -117.1611),
+    ('San Francisco', 'CA'): (37.7749, -122.4194),
+    ('San Jose', 'CA'): (37.3382, -121.8863),
+    ('Santa Ana', 'CA'): (33.7455, -117.8677),
+    ('Scottsdale', 'AZ'): (33.4942, -111.9261),
+    ('Seattle', 'WA'): (47.6062, -122.3321),
+    ('Sioux Falls', 'SD'): (43.5446, -96.7311),
+    ('Spokane', 'WA'): (47.6588, -117.4260),
+    ('Stockton', 'CA'): (37.9577, -121.2908),
+    ('Tampa', 'FL'): (27.9506, -82.4572),
+    ('Toledo', 'OH'): (41.6528, -83.5379),
+    ('Tucson', 'AZ'): (32.2226, -110.9747),
+    ('Tulsa', 'OK'): (36.1540, -95.9928),
+    ('Virginia Beach', 'VA'): (36.8529, -75.9780),
+    ('Washington', 'DC'): (38.9072, -77.0369),
+    ('Wichita', 'KS'): (37.6872, -97.3301),
+    ('Wilmington', 'DE'): (39.7391, -75.5398),
+}
+
+
+def _city_key(city, state):
+    city = ' '.join((city or '').replace('.', ' ').lower().split())
+    if city.startswith('st '):
+        city = 'saint ' + city[3:]
+    return city, (state or '').strip().upper()
+
+_GEOCODE = {_city_key(city, state): point
+            for (city, state), point in CITIES.items()}
+
+def geocode(city, state):
+    """``(latitude, longitude)`` of a city in CITIES, or None."""
+    return _GEOCODE.get(_city_key(city, state))
+
+#  Geohash
+#  ----------------------------------------------------------------
+
+def _bits(precision):
+    """Latitude and longitude bits of a geohash of ``precision`` chars."""
+    total = 5 * precision
+    return total // 2, total - total // 2
+
+def _cell(lat_index, lon_index, precision):
+    """Geohash of the cell at grid position (``lat_index``, ``lon_index``)."""
+    lat_bits, lon_bits = _bits(precision)
+    value = 0
+    # bits alternate, longitude first
+    for bit in range(5 * precision):
+        if bit % 2 == 0:
+            lon_bits -= 1
+            value = (value << 1) | ((lon_index >> lon_bits) & 1)
+        else:
+            lat_bits -= 1
+            value = (value << 1) | ((lat_index >> lat_bits) & 1)
+    return ''.join(BASE32[(value >> shift) & 31]
+                   for shift in range(5 * (precision - 1), -1, -5))
+
+def _index(value, low, span, bits):
+    return min(int((value - low) / span * (1 << bits)), (1 << bits) - 1)
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_bits, lon_bits = _bits(precision)
+    return _cell(_index(latitude, -90.0, 180.0, lat_bits),
+                 _index(longitude, -180.0, 360.0, lon_bits), precision)
+
+def _successor(prefix):
+    """The smallest geohash of ``len(prefix)`` chars after ``prefix``, or
+    None after the last one."""
+    chars = list(prefix)
+    for i in range(len(chars) - 1, -1, -1):
+        position = BASE32.index(chars[i])
+        if position < 31:
+            chars[i] = BASE32[position + 1]
+            return ''.join(chars[:i + 1]) + '0' * (len(chars) - i - 1)
+        chars[i] = '0'
+    return None
+
+def cover(south, west, north, east, max_cells=MAX_CELLS):
+    """Geohash cells covering a box, at the finest precision that needs no
+    more than ``max_cells``."""
+    best = None
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        lat_bits, lon_bits = _bits(precision)
+        rows = range(_index(south, -90.0, 180.0, lat_bits),
+                     _index(north, -90.0, 180.0, lat_bits) + 1)
+        columns = range(_index(west, -180.0, 360.0, lon_bits),
+                        _index(east, -180.0, 360.0, lon_bits) + 1)
+        if best is not None and len(rows) * len(columns) > max_cells:
+            break
+        best = (rows, columns, precision)
+    rows, columns, precision = best
+    return sorted(_cell(r, c, precision) for r in rows for c in columns)
+
+def cell_ranges(cells):
+    """Merge sorted geohash ``cells`` into ``[(low, high)]`` ranges of full
+    geohashes; ``high`` is exclusive, None when unbounded."""
+    ranges = []
+    for cell in cells:
+        high = _successor(cell)
+        if ranges and ranges[-1][1] == cell:
+            ranges[-1] = (ranges[-1][0], high)
+        else:
+            ranges.append((cell, high))
+    return ranges
+
+#  Distances
+#  ----------------------------------------------------------------
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance (haversine)."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def split_box(south, west, north, east):
+    """``[(south, west, north, east)]`` with boxes crossing the
+    antimeridian split in two."""
+    south, north = max(south, -90.0), min(north, 90.0)
+    if east - west >= 360:
+        return [(south, -180.0, north, 180.0)]
+    if west < -180:
+        return [(south, west + 360, north, 180.0),
+                (south, -180.0, north, east)]
+    if east > 180:
+        return [(south, west, north, 180.0),
+                (south, -180.0, north, east - 360)]
+    if west > east:
+        return [(south, west, north, 180.0), (south, -180.0, north, east)]
+    return [(south, west, north, east)]
+
+def box_around(latitude, longitude, radius_km):
+    """The boxes (see split_box) bounding a circle."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    if abs(latitude) + dlat >= 90:
+        # the circle takes in a pole: every longitude
+        return split_box(latitude - dlat, -180.0, latitude + dlat, 180.0)
+    dlon = math.degrees(math.asin(min(1.0, math.sin(math.radians(dlat))
+                                      / math.cos(math.radians(latitude)))))
+    return split_box(latitude - dlat, longitude - dlon,
+                     latitude + dlat, longitude + dlon)
+
+#  Placing venues
+#  ----------------------------------------------------------------
+
+def place(venue):
+    """Geocode ``venue`` when it is new or has moved city, unless its
+    coordinates were set as well, and refresh its geohash."""
+    state = db.inspect(venue)
+    moved = any(state.attrs[name].history.has_changes()
+                for name in ('city', 'state'))
+    located = any(state.attrs[name].history.has_changes()
+                  for name in ('latitude', 'longitude'))
+    if not located and (moved or venue.latitude is None):
+        venue.latitude, venue.longitude = \
+            geocode(venue.city, venue.state) or (None, None)
+    if venue.latitude is None or venue.longitude is None:
+        venue.geohash = None
+    else:
+        venue.geohash = encode(venue.latitude, venue.longitude)
+
+@db.event.listens_for(db.session, 'before_flush')
+def place_venues(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Venue):
+            place(obj)
+
+#  Queries
+#  ----------------------------------------------------------------
+
+def venues_in_boxes(boxes):
+    """Venues within any of ``boxes``: one geohash range scan per covering
+    cell run, then the exact box."""
+    conditions = []
+    for south, west, north, east in boxes:
+        scans = [Venue.geohash >= low if high is None else
+                 db.and_(Venue.geohash >= low, Venue.geohash < high)
+                 for low, high in cell_ranges(cover(south, west, north, east))]
+        conditions.append(db.and_(db.or_(*scans),
+                                  Venue.latitude.between(south, north),
+                                  Venue.longitude.between(west, east)))
+    return db.session.query(Venue.id, Venue.name, Venue.city, Venue.state,
+                            Venue.latitude, Venue.longitude) \
+        .filter(db.or_(*conditions))
+
+def nearby_venues(latitude, longitude, radius_km, limit):
+    """Venues within ``radius_km``, nearest first, with their distance.
+
+    The search starts NEARBY_STEPS halvings inside ``radius_km`` and doubles
+    the circle until it holds ``limit`` venues, which are then the nearest
+    ones; in a dense area it reads about as many rows as it returns.
+    """
+    for step in range(NEARBY_STEPS, -1, -1):
+        radius = radius_km / 2 ** step
+        found = []
+        for row in venues_in_boxes(box_around(latitude, longitude, radius)):
+            distance = distance_km(latitude, longitude,
+                                   row.latitude, row.longitude)
+            if distance <= radius:
+                found.append((distance, row))
+        if len(found) >= limit:
+            break
+    found.sort(key=lambda pair: (pair[0], pair[1].id))
+    return found[:limit]
+
+def venues_within(south, west, north, east, limit):
+    """Venues in a box, ordered by id."""
+    return venues_in_boxes(split_box(south, west, north, east)) \
+        .order_by(Venue.id).limit(limit).all()
+
+#  CLI
+#  ----------------------------------------------------------------
+
+@click.command('geocode-venues')
+@with_appcontext
+def geocode_venues_command():
+    """Place venues without coordinates from their city and state."""
+    placed = 0
+    missing = db.session.query(Venue.city, Venue.state) \
+        .filter(Venue.latitude.is_(None)).distinct().all()
+    for city, state in missing:
+        point = geocode(city, state)
+        if point is None:
+            continue
+        # every venue of a city sits at its centre, so they share a geohash
+        placed += Venue.query.filter(Venue.latitude.is_(None),
+                                     Venue.city == city,
+                                     Venue.state == state) \
+            .update({Venue.latitude: point[0], Venue.longitude: point[1],
+                     Venue.geohash: encode(*point)},
+                    synchronize_session=False)
+    db.session.commit()
+    unknown = len([1 for c, s in missing if geocode(c, s) is None])
+    click.echo('%d venues placed; %d cities not in the geocode table'
+               % (placed, unknown))
+
+def init_app(app):
+    app.cli.add_command(geocode_venues_command)
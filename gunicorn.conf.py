@@ -0,0 +1,65 @@
+"""Gunicorn settings, read automatically from the working directory.
+
+Worker model: a few processes, each serving requests on a small pool of
+threads. Requests spend most of their time waiting on PostgreSQL, so
+threads overlap that wait cheaply; processes use the cores and isolate
+crashes. Each process has its own connection pool, so keep
+
+    GUNICORN_THREADS <= DB_POOL_SIZE
+    WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW
+                       + ASYNC_DB_POOL_SIZE + ASYNC_DB_MAX_OVERFLOW)
+        < max_connections
+
+The default worker count is CPU cores + 1, capped so the second holds for
+DB_MAX_CONNECTIONS (PostgreSQL's max_connections) less
+DB_RESERVED_CONNECTIONS kept free for migrations and consoles.
+
+Every value can be overridden from the environment.
+"""
+import multiprocessing
+import os
+import sys
+
+bind = '0.0.0.0:%s' % os.environ.get('PORT', '8000')
+
+# Connections one worker can hold at once (its sync and async pools), and
+# what all of them may share.
+connections_per_worker = int(os.environ.get('DB_POOL_SIZE', 5)) + \
+    int(os.environ.get('DB_MAX_OVERFLOW', 10)) + \
+    int(os.environ.get('ASYNC_DB_POOL_SIZE', 2)) + \
+    int(os.environ.get('ASYNC_DB_MAX_OVERFLOW', 2))
+connection_budget = int(os.environ.get('DB_MAX_CONNECTIONS', 100)) - \
+    int(os.environ.get('DB_RESERVED_CONNECTIONS', 10))
+
+workers = int(os.environ.get('WEB_CONCURRENCY', max(1, min(
+    multiprocessing.cpu_count() + 1,
+    connection_budget // connections_per_worker))))
+if workers * connections_per_worker > connection_budget:
+    sys.stderr.write(
+        'gunicorn.conf.py: %d workers can open %d connections, more than '
+        'the %d budgeted; lower WEB_CONCURRENCY or the pool size\n'
+        % (workers, workers * connections_per_worker, connection_budget))
+# 'gthread' by default; 'gevent' needs gevent and psycogreen installed.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+
+# A worker that stops checking in with the master this long is restarted.
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then so slow leaks cannot accumulate.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    # psycopg2 blocks the whole process unless it yields to the gevent hub.
+    if worker_class == 'gevent':
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
@@ -0,0 +1,242 @@
+import codecs
+import csv
+import json
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from werkzeug.datastructures import MultiDict
+
+from cache import get_cache, venue_key, artist_key
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, Venue, Artist, Show, Genre
+from stats import refresh_stats
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#
+# Rows stream in from a CSV (header row; genres comma-separated in one cell)
+# or NDJSON file (genres a list or a comma-separated string) and are
+# validated with the same forms the create pages use.
+# Valid rows are written IMPORT_CHUNK_SIZE at a time in one transaction per
+# chunk: shows go in with a single executemany, venues and artists with one
+# ORM flush (batched by the driver). If a chunk fails at the database it is
+# retried row by row so one bad row costs its own insert, not the batch.
+#----------------------------------------------------------------------------#
+
+FORMATS = ('csv', 'ndjson')
+
+BOOLEANS = ('seeking_talent', 'seeking_venue')
+FALSE_VALUES = ('', '0', 'false', 'f', 'no', 'n', 'off')
+
+
+class ImportResult(object):
+
+    def __init__(self):
+        self.inserted = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.errors.append({"line": line, "error": message})
+
+    def to_dict(self):
+        return {"inserted": self.inserted, "errors": self.errors}
+
+
+def format_for(filename):
+    if filename and filename.lower().endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return 'csv'
+
+def _add(data, key, value):
+    """Add ``value`` under ``key``: genres may be a list or a comma-separated
+    string, booleans any spelling of false (older exports wrote 'False')."""
+    if key == 'genres':
+        values = value if isinstance(value, list) else str(value).split(',')
+        for genre in values:
+            if genre is not None and str(genre).strip():
+                data.add(key, str(genre).strip())
+    elif key in BOOLEANS:
+        data.add(key, 'false' if str(value).strip().lower() in FALSE_VALUES
+                 else 'true')
+    elif value is not None:
+        data.add(key, value)
+
+def read_records(stream, fmt):
+    """Yield ``(line, MultiDict)`` pairs from a binary ``stream``.
+
+    A record that cannot be parsed is yielded as ``(line, ValueError)``.
+    """
+    lines = codecs.iterdecode(stream, 'utf-8')
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            data = MultiDict()
+            for key, value in row.items():
+                if key is not None and value not in (None, ''):
+                    _add(data, key, value)
+            yield reader.line_num, data
+        return
+
+    for line, text in enumerate(lines, 1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+            if not isinstance(row, dict):
+                raise ValueError('expected a JSON object')
+        except ValueError as e:
+            yield line, ValueError(str(e))
+            continue
+        data = MultiDict()
+        for key, value in row.items():
+            if value is not None:
+                _add(data, key, value)
+        yield line, data
+
+#  Row builders
+#  ----------------------------------------------------------------
+
+class GenreResolver(object):
+    """Genre rows by name for the whole import, loaded once."""
+
+    def __init__(self):
+        self.genres = {g.name: g for g in Genre.query}
+
+    def __call__(self, names):
+        resolved = []
+        for name in dict.fromkeys(n.strip() for n in names if n and n.strip()):
+            if name not in self.genres:
+                self.genres[name] = Genre(name=name)
+            resolved.append(self.genres[name])
+        return resolved
+
+def build_venue(form, genres):
+    return Venue(
+        name = form.name.data,
+        city = form.city.data,
+        state = form.state.data,
+        phone = form.phone.data,
+        address = form.address.data,
+        image_link = form.image_link.data,
+        facebook_link = form.facebook_link.data,
+        genres = genres(form.genres.data),
+        website_link = form.website_link.data,
+        currently_seeking = form.seeking_talent.data,
+        seeking_content = form.seeking_description.data,
+    )
+
+def build_artist(form, genres):
+    return Artist(
+        name = form.name.data,
+        city = form.city.data,
+        state = form.state.data,
+        phone = form.phone.data,
+        genres = genres(form.genres.data),
+        image_link = form.image_link.data,
+        facebook_link = form.facebook_link.data,
+        website_link = form.website_link.data,
+        currently_seeking = form.seeking_venue.data,
+        seeking_content = form.seeking_description.data,
+    )
+
+def build_show(form, genres):
+    return {
+        "venue_id": int(form.venue_id.data),
+        "artist_id": int(form.artist_id.data),
+        "time": form.start_time.data,
+    }
+
+ENTITIES = {
+    'venues': (VenueForm, build_venue),
+    'artists': (ArtistForm, build_artist),
+    'shows': (ShowForm, build_show),
+}
+
+#  Writers
+#  ----------------------------------------------------------------
+
+def _insert(entity, items):
+    if entity == 'shows':
+        # core inserts skip the session events that keep the stats current
+        db.session.execute(Show.__table__.insert(), items)
+        refresh_stats(Venue, [item["venue_id"] for item in items])
+        refresh_stats(Artist, [item["artist_id"] for item in items])
+    else:
+        db.session.add_all(items)
+    db.session.commit()
+
+    # New venues/artists have no cached pages; new shows change two each.
+    if entity == 'shows':
+        get_cache().delete(*[key for item in items for key in
+                             (venue_key(item["venue_id"]),
+                              artist_key(item["artist_id"]))])
+
+def write_chunk(entity, chunk, result):
+    """Insert ``chunk`` of ``(line, item)`` pairs, row by row on failure."""
+    if not chunk:
+        return
+    try:
+        _insert(entity, [item for _, item in chunk])
+        result.inserted += len(chunk)
+        return
+    except Exception:
+        db.session.rollback()
+
+    for line, item in chunk:
+        try:
+            _insert(entity, [item])
+            result.inserted += 1
+        except Exception as e:
+            db.session.rollback()
+            result.error(line, str(getattr(e, 'orig', e)).strip())
+
+def import_stream(entity, stream, fmt='csv', chunk_size=None):
+    """Validate and insert every record of ``stream``; returns ImportResult."""
+    form_class, build = ENTITIES[entity]
+    chunk_size = chunk_size or current_app.config.get('IMPORT_CHUNK_SIZE', 1000)
+    genres = GenreResolver()
+    result = ImportResult()
+
+    chunk = []
+    for line, data in read_records(stream, fmt):
+        if isinstance(data, Exception):
+            result.error(line, str(data))
+            continue
+        form = form_class(formdata=data, meta={'csrf': False})
+        if not form.validate():
+            result.error(line, "; ".join(
+                "%s: %s" % (field, err)
+                for field, errors in form.errors.items() for err in errors))
+            continue
+        try:
+            chunk.append((line, build(form, genres)))
+        except (TypeError, ValueError) as e:
+            result.error(line, str(e))
+        if len(chunk) >= chunk_size:
+            write_chunk(entity, chunk, result)
+            chunk = []
+    write_chunk(entity, chunk, result)
+    return result
+
+#  CLI
+#  ----------------------------------------------------------------
+
+@click.command('import-data')
+@click.argument('entity', type=click.Choice(sorted(ENTITIES)))
+@click.argument('source', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS),
+              help='Defaults to ndjson for .ndjson/.jsonl files, else csv.')
+@click.option('--chunk-size', type=int, help='Rows per transaction.')
+@with_appcontext
+def import_data_command(entity, source, fmt, chunk_size):
+    """Bulk-load venues, artists or shows from a CSV or NDJSON file."""
+    result = import_stream(entity, source, fmt or format_for(source.name),
+                           chunk_size)
+    for error in result.errors:
+        click.echo('line %(line)d: %(error)s' % error, err=True)
+    click.echo('%d %s imported, %d rejected'
+               % (result.inserted, entity, len(result.errors)))
+
+def init_app(app):
+    app.cli.add_command(import_data_command)
@@ -0,0 +1,329 @@
+import ipaddress
+import threading
+import time
+
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    g,
+    has_request_context,
+    jsonify,
+    request,
+    signals
+)
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from models import db
+
+#----------------------------------------------------------------------------#
+# Metrics.
+#
+# Counters and histograms live in process memory; each worker process
+# reports its own. /metrics renders them in the Prometheus text format:
+# request latency and status per endpoint, SQL statements and SQL time per
+# request (from cursor-execute events), template render time (from Flask's
+# render signals) and the connection pool. Only clients in
+# METRICS_ALLOWED_NETWORKS may read them.
+#----------------------------------------------------------------------------#
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0)
+# Upper bounds of the SQL-statements-per-request buckets.
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+metrics = Blueprint('metrics', __name__, url_prefix='/metrics')
+
+
+class Histogram(object):
+    """Thread-safe count/sum/max of observations, bucketed like Prometheus."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        index = next((i for i, bound in enumerate(self.buckets)
+                      if value <= bound), len(self.buckets))
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+
+    def cumulative(self):
+        """``[(upper bound, observations <= bound)]``, ending with +Inf."""
+        with self.lock:
+            counts = list(self.counts)
+        total, result = 0, []
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def to_dict(self):
+        with self.lock:
+            summary = {"count": self.count, "sum": self.sum, "max": self.max}
+        summary["buckets"] = {('+Inf' if bound == float('inf') else str(bound)):
+                              count for bound, count in self.cumulative()}
+        return summary
+
+#  Connection pool
+#  ----------------------------------------------------------------
+
+class TimedQueuePool(QueuePool):
+    """QueuePool recording how long each checkout waits for a connection.
+
+    The wait includes opening a new connection when the pool grows into its
+    overflow, and checkouts that give up after ``pool_timeout``.
+    """
+
+    def __init__(self, *args, **kw):
+        super(TimedQueuePool, self).__init__(*args, **kw)
+        self.checkout_latency = Histogram()
+        self.checkout_timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super(TimedQueuePool, self)._do_get()
+        except exc.TimeoutError:
+            self.checkout_timeouts += 1
+            raise
+        finally:
+            self.checkout_latency.observe(time.perf_counter() - start)
+
+    def recreate(self):
+        # dispose() swaps in a fresh pool; carry the measurements over
+        pool = super(TimedQueuePool, self).recreate()
+        pool.checkout_latency = self.checkout_latency
+        pool.checkout_timeouts = self.checkout_timeouts
+        return pool
+
+def pool_metrics(engine):
+    pool = engine.pool
+    data = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        data.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            # negative while the pool has not yet opened pool_size connections
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+        })
+    if isinstance(pool, TimedQueuePool):
+        data["checkout_seconds"] = pool.checkout_latency.to_dict()
+        data["checkout_timeouts"] = pool.checkout_timeouts
+    return data
+
+class Family(object):
+    """One metric name: a counter or histogram per distinct label values."""
+
+    def __init__(self, name, help, kind, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labels = labels
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.children = {}
+
+    def observe(self, values, amount):
+        if self.kind == 'counter':
+            with self.lock:
+                self.children[values] = self.children.get(values, 0) + amount
+            return
+        with self.lock:
+            histogram = self.children.get(values)
+            if histogram is None:
+                histogram = self.children[values] = Histogram(self.buckets)
+        histogram.observe(amount)
+
+    def samples(self):
+        with self.lock:
+            children = sorted(self.children.items())
+        for values, child in children:
+            labels = list(zip(self.labels, values))
+            if self.kind == 'counter':
+                yield self.name + '_total', labels, child
+                continue
+            for bound, count in child.cumulative():
+                yield self.name + '_bucket', labels + [('le', _number(bound))], count
+            yield self.name + '_sum', labels, child.sum
+            yield self.name + '_count', labels, child.count
+
+
+REQUEST_SECONDS = Family(
+    'fyyur_http_request_duration_seconds',
+    'Time from request start to response, by endpoint.',
+    'histogram', ('method', 'endpoint'))
+REQUESTS = Family(
+    'fyyur_http_requests',
+    'Responses sent, by endpoint and status code.',
+    'counter', ('method', 'endpoint', 'status'))
+REQUEST_QUERIES = Family(
+    'fyyur_db_queries_per_request',
+    'SQL statements executed while handling one request.',
+    'histogram', ('endpoint',), QUERY_COUNT_BUCKETS)
+REQUEST_QUERY_SECONDS = Family(
+    'fyyur_db_query_seconds_per_request',
+    'Time spent executing SQL while handling one request.',
+    'histogram', ('endpoint',))
+TEMPLATE_SECONDS = Family(
+    'fyyur_template_render_seconds',
+    'Time to render a template, including the templates it includes.',
+    'histogram', ('template',))
+
+FAMILIES = (REQUEST_SECONDS, REQUESTS, REQUEST_QUERIES,
+            REQUEST_QUERY_SECONDS, TEMPLATE_SECONDS)
+
+#  Instrumentation
+#  ----------------------------------------------------------------
+
+def _endpoint():
+    return request.endpoint or 'unmatched'
+
+def start_request():
+    g.metrics_start = time.perf_counter()
+    g.metrics_queries = 0
+    g.metrics_query_seconds = 0.0
+    g.metrics_templates = []
+
+def finish_request(response):
+    start = getattr(g, 'metrics_start', None)
+    if start is None:
+        return response
+    endpoint = _endpoint()
+    REQUEST_SECONDS.observe((request.method, endpoint),
+                            time.perf_counter() - start)
+    REQUESTS.observe((request.method, endpoint, str(response.status_code)), 1)
+    REQUEST_QUERIES.observe((endpoint,), g.metrics_queries)
+    REQUEST_QUERY_SECONDS.observe((endpoint,), g.metrics_query_seconds)
+    return response
+
+# The start time rides on the execution context, so a statement that fails
+# (no after_cursor_execute) leaves nothing behind. The few statements run
+# without a context, e.g. on first connect, count but are not timed.
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.metrics_query_start = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, 'metrics_query_start', None)
+    elapsed = 0.0 if start is None else time.perf_counter() - start
+    if has_request_context() and hasattr(g, 'metrics_queries'):
+        g.metrics_queries += 1
+        g.metrics_query_seconds += elapsed
+
+def _render_started(app, template, context, **extra):
+    if has_request_context() and hasattr(g, 'metrics_templates'):
+        g.metrics_templates.append(time.perf_counter())
+
+def _render_finished(app, template, context, **extra):
+    if has_request_context() and getattr(g, 'metrics_templates', None):
+        TEMPLATE_SECONDS.observe((template.name or 'string',),
+                                 time.perf_counter() - g.metrics_templates.pop())
+
+#  Exposition
+#  ----------------------------------------------------------------
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n') \
+        .replace('"', '\\"')
+
+def _line(name, labels, value):
+    if labels:
+        name += '{%s}' % ','.join('%s="%s"' % (key, _escape(v))
+                                  for key, v in labels)
+    return '%s %s' % (name, _number(value))
+
+def _header(name, help, kind):
+    return ['# HELP %s %s' % (name, help), '# TYPE %s %s' % (name, kind)]
+
+def _pool_lines(engine):
+    data = pool_metrics(engine)
+    lines = []
+    for key, help in (('size', 'Connections the pool keeps open.'),
+                      ('checked_out', 'Connections currently in use.'),
+                      ('overflow', 'Connections open beyond the pool size.')):
+        if key in data:
+            name = 'fyyur_db_pool_' + key
+            lines += _header(name, help, 'gauge')
+            lines.append(_line(name, [], data[key]))
+    pool = engine.pool
+    if isinstance(pool, TimedQueuePool):
+        name = 'fyyur_db_pool_checkout_seconds'
+        lines += _header(name, 'Time waiting for a pooled connection.',
+                         'histogram')
+        for bound, count in pool.checkout_latency.cumulative():
+            lines.append(_line(name + '_bucket', [('le', _number(bound))], count))
+        lines.append(_line(name + '_sum', [], pool.checkout_latency.sum))
+        lines.append(_line(name + '_count', [], pool.checkout_latency.count))
+        name = 'fyyur_db_pool_checkout_timeouts_total'
+        lines += _header(name, 'Checkouts that gave up after pool_timeout.',
+                         'counter')
+        lines.append(_line(name, [], pool.checkout_timeouts))
+    return lines
+
+def exposition(engine):
+    lines = []
+    for family in FAMILIES:
+        name = family.name + ('_total' if family.kind == 'counter' else '')
+        lines += _header(name, family.help, family.kind)
+        lines += [_line(*sample) for sample in family.samples()]
+    lines += _pool_lines(engine)
+    return '\n'.join(lines) + '\n'
+
+#  Endpoints
+#  ----------------------------------------------------------------
+
+@metrics.before_request
+def allowed_addresses():
+    networks = current_app.config.get('METRICS_ALLOWED_NETWORKS') or ()
+    try:
+        address = ipaddress.ip_address(request.remote_addr or '')
+    except ValueError:
+        abort(403)
+    if not any(address in ipaddress.ip_network(network, strict=False)
+               for network in networks):
+        abort(403)
+
+@metrics.route('')
+def prometheus():
+    return Response(exposition(db.engine),
+                    mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@metrics.route('/pool')
+def pool():
+    return jsonify(pool_metrics(db.engine))
+
+def init_app(app):
+    # Copied so apps sharing the config module do not share the dict.
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        options.setdefault('poolclass', TimedQueuePool)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    # Render signals need blinker; without it templates go untimed.
+    if signals.signals_available:
+        signals.before_render_template.connect(_render_started, app)
+        signals.template_rendered.connect(_render_finished, app)
+    app.register_blueprint(metrics)
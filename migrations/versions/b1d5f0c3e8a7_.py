@@ -0,0 +1,106 @@
+"""search documents and full-text indexes for venues and artists
+
+Revision ID: b1d5f0c3e8a7
+Revises: b7c2e91f4d3a
+Create Date: 2026-10-18 11:02:47.903514
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b1d5f0c3e8a7'
+down_revision = 'b7c2e91f4d3a'
+branch_labels = None
+depends_on = None
+
+
+# (entity table, genre link table, link column, FTS5 table)
+ENTITIES = (
+    ('Venue', 'VenueGenre', 'venue_id', 'VenueSearch'),
+    ('Artist', 'ArtistGenre', 'artist_id', 'ArtistSearch'),
+)
+
+
+def backfill(bind, entity, link, column):
+    genres = {}
+    for entity_id, name in bind.execute(sa.text(
+            'SELECT l.%s, g.name FROM "%s" l JOIN "Genre" g '
+            'ON g.id = l.genre_id ORDER BY g.name' % (column, link))):
+        genres.setdefault(entity_id, []).append(name)
+
+    rows = bind.execute(sa.text(
+        'SELECT id, name, city, state FROM "%s"' % entity)).fetchall()
+    if rows:
+        bind.execute(
+            sa.text('UPDATE "%s" SET search_document = :doc WHERE id = :id'
+                    % entity),
+            [{'id': r.id,
+              'doc': ' '.join([r.name or '', r.city or '', r.state or '']
+                              + genres.get(r.id, []))} for r in rows])
+
+
+def create_postgresql_indexes(entity):
+    op.execute(
+        'CREATE INDEX "ix_%s_search_tsv" ON "%s" '
+        "USING gin (to_tsvector('simple', search_document))"
+        % (entity, entity))
+    op.execute(
+        'CREATE INDEX "ix_%s_search_trgm" ON "%s" '
+        'USING gin (search_document gin_trgm_ops)' % (entity, entity))
+
+
+def create_sqlite_fts(entity, fts):
+    op.execute(
+        'CREATE VIRTUAL TABLE "{1}" USING fts5(search_document, '
+        "content='{0}', content_rowid='id')".format(entity, fts))
+    op.execute(
+        'CREATE TRIGGER "{0}_search_ai" AFTER INSERT ON "{0}" BEGIN '
+        'INSERT INTO "{1}"(rowid, search_document) '
+        'VALUES (new.id, new.search_document); END'.format(entity, fts))
+    op.execute(
+        'CREATE TRIGGER "{0}_search_ad" AFTER DELETE ON "{0}" BEGIN '
+        'INSERT INTO "{1}"("{1}", rowid, search_document) '
+        "VALUES ('delete', old.id, old.search_document); END"
+        .format(entity, fts))
+    op.execute(
+        'CREATE TRIGGER "{0}_search_au" AFTER UPDATE ON "{0}" BEGIN '
+        'INSERT INTO "{1}"("{1}", rowid, search_document) '
+        "VALUES ('delete', old.id, old.search_document); "
+        'INSERT INTO "{1}"(rowid, search_document) '
+        'VALUES (new.id, new.search_document); END'.format(entity, fts))
+    op.execute('INSERT INTO "{0}"("{0}") VALUES (\'rebuild\')'.format(fts))
+
+
+def upgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    for entity, link, column, fts in ENTITIES:
+        with op.batch_alter_table(entity, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('search_document', sa.Text(),
+                                          server_default='', nullable=False))
+        backfill(bind, entity, link, column)
+
+        if dialect == 'postgresql':
+            create_postgresql_indexes(entity)
+        elif dialect == 'sqlite':
+            create_sqlite_fts(entity, fts)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for entity, _, _, fts in ENTITIES:
+        if dialect == 'postgresql':
+            op.drop_index('ix_%s_search_trgm' % entity, table_name=entity)
+            op.drop_index('ix_%s_search_tsv' % entity, table_name=entity)
+        elif dialect == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute('DROP TRIGGER "%s_search_%s"' % (entity, suffix))
+            op.execute('DROP TABLE "%s"' % fts)
+
+        with op.batch_alter_table(entity, schema=None) as batch_op:
+            batch_op.drop_column('search_document')
@@ -0,0 +1,113 @@
+"""normalize genres into Genre and link tables
+
+Revision ID: b7c2e91f4d3a
+Revises: 8753317e96fc
+Create Date: 2026-10-18 10:12:31.418265
+
+"""
+import csv
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7c2e91f4d3a'
+down_revision = '8753317e96fc'
+branch_labels = None
+depends_on = None
+
+
+# (entity table, link table, link column, old column length)
+ENTITIES = (
+    ('Venue', 'VenueGenre', 'venue_id', 500),
+    ('Artist', 'ArtistGenre', 'artist_id', 120),
+)
+
+
+def parse_genres(value):
+    """Split a stored array literal such as '{Jazz,"Rock n Roll"}'."""
+    if not value:
+        return []
+    value = value.strip().strip('{}')
+    names = next(csv.reader([value], skipinitialspace=True), [])
+    return [n.strip() for n in names if n.strip()]
+
+
+def format_genres(names):
+    quoted = ['"%s"' % n if any(c in n for c in ' ,"{}') else n for n in names]
+    return '{' + ','.join(quoted) + '}'
+
+
+def upgrade():
+    genre = op.create_table('Genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    links = {}
+    for entity, link, column, _ in ENTITIES:
+        links[entity] = op.create_table(link,
+        sa.Column(column, sa.Integer(), nullable=False),
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint([column], [entity + '.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint(column, 'genre_id')
+        )
+        op.create_index('ix_%s_genre_id' % link, link, ['genre_id'],
+                        unique=False)
+
+    # Back-fill the link tables from the old array-literal strings.
+    bind = op.get_bind()
+    genre_ids = {}
+    for entity, link, column, _ in ENTITIES:
+        rows = bind.execute(
+            sa.text('SELECT id, genres FROM "%s"' % entity)).fetchall()
+        pairs = set()
+        for entity_id, genres in rows:
+            for name in parse_genres(genres):
+                if name not in genre_ids:
+                    result = bind.execute(genre.insert().values(name=name))
+                    genre_ids[name] = result.inserted_primary_key[0]
+                pairs.add((entity_id, genre_ids[name]))
+        if pairs:
+            op.bulk_insert(links[entity], [
+                {column: entity_id, 'genre_id': genre_id}
+                for entity_id, genre_id in sorted(pairs)])
+
+    for entity, _, _, _ in ENTITIES:
+        with op.batch_alter_table(entity, schema=None) as batch_op:
+            batch_op.drop_column('genres')
+
+
+def downgrade():
+    bind = op.get_bind()
+    for entity, link, column, length in ENTITIES:
+        with op.batch_alter_table(entity, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('genres', sa.String(length=length),
+                                          nullable=True))
+
+        names = {}
+        rows = bind.execute(sa.text(
+            'SELECT l.%s, g.name FROM "%s" l JOIN "Genre" g '
+            'ON g.id = l.genre_id ORDER BY g.name' % (column, link)))
+        for entity_id, name in rows:
+            names.setdefault(entity_id, []).append(name)
+        for entity_id in [r[0] for r in bind.execute(
+                sa.text('SELECT id FROM "%s"' % entity))]:
+            bind.execute(
+                sa.text('UPDATE "%s" SET genres = :genres WHERE id = :id'
+                        % entity),
+                {'genres': format_genres(names.get(entity_id, [])),
+                 'id': entity_id})
+
+        with op.batch_alter_table(entity, schema=None) as batch_op:
+            batch_op.alter_column('genres',
+                   existing_type=sa.VARCHAR(length=length),
+                   nullable=False)
+
+        op.drop_index('ix_%s_genre_id' % link, table_name=link)
+        op.drop_table(link)
+
+    op.drop_table('Genre')
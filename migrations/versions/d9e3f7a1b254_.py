@@ -0,0 +1,43 @@
+"""updated_at on Venue, Artist and Show
+
+Revision ID: d9e3f7a1b254
+Revises: c4a8d2e6f019
+Create Date: 2026-10-18 12:31:05.217740
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9e3f7a1b254'
+down_revision = 'c4a8d2e6f019'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ('Venue', 'Artist', 'Show')
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+            batch_op.create_index(batch_op.f('ix_%s_updated_at' % table), ['updated_at'], unique=False)
+
+        op.execute('UPDATE "%s" SET updated_at = CURRENT_TIMESTAMP' % table)
+
+        # Tightening the column on SQLite means rebuilding the table, which
+        # would drop the FTS5 sync triggers on Venue and Artist.
+        if dialect != 'sqlite':
+            op.alter_column(table, 'updated_at',
+                   existing_type=sa.DateTime(),
+                   nullable=False)
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f('ix_%s_updated_at' % table))
+            batch_op.drop_column('updated_at')
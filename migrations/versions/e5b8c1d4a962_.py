@@ -0,0 +1,66 @@
+"""VenueStats and ArtistStats rollups
+
+Revision ID: e5b8c1d4a962
+Revises: d9e3f7a1b254
+Create Date: 2026-10-18 14:02:47.391205
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8c1d4a962'
+down_revision = 'd9e3f7a1b254'
+branch_labels = None
+depends_on = None
+
+
+# (stats table, key column, entity table, Show foreign key)
+ROLLUPS = (
+    ('VenueStats', 'venue_id', 'Venue', 'venue_id'),
+    ('ArtistStats', 'artist_id', 'Artist', 'artist_id'),
+)
+
+BACKFILL = '''
+INSERT INTO "%(stats)s" (%(key)s, total_shows, upcoming_shows,
+                         next_show_time, last_show_time)
+SELECT e.id,
+       count(s.id),
+       count(s.id) FILTER (WHERE s.time > :now),
+       min(s.time) FILTER (WHERE s.time > :now),
+       max(s.time) FILTER (WHERE s.time <= :now)
+FROM "%(entity)s" e LEFT OUTER JOIN "Show" s ON s.%(fk)s = e.id
+GROUP BY e.id
+'''
+
+
+def upgrade():
+    for stats, key, entity, fk in ROLLUPS:
+        op.create_table(stats,
+        sa.Column(key, sa.Integer(), nullable=False),
+        sa.Column('total_shows', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('upcoming_shows', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('next_show_time', sa.DateTime(), nullable=True),
+        sa.Column('last_show_time', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint([key], ['%s.id' % entity], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint(key)
+        )
+        with op.batch_alter_table(stats, schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_%s_next_show_time' % stats), ['next_show_time'], unique=False)
+
+        # Show times are naive local times, as the app writes them.
+        op.get_bind().execute(
+            sa.text(BACKFILL % {'stats': stats, 'key': key,
+                                'entity': entity, 'fk': fk}),
+            now=datetime.now())
+
+
+def downgrade():
+    for stats, _, _, _ in reversed(ROLLUPS):
+        with op.batch_alter_table(stats, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f('ix_%s_next_show_time' % stats))
+
+        op.drop_table(stats)
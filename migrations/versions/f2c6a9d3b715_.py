@@ -0,0 +1,205 @@
+"""Venue latitude, longitude and geohash
+
+Revision ID: f2c6a9d3b715
+Revises: e5b8c1d4a962
+Create Date: 2026-10-18 16:41:09.218634
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6a9d3b715'
+down_revision = 'e5b8c1d4a962'
+branch_labels = None
+depends_on = None
+
+
+# A copy of the geocode table and geohash encoding in geo.py as of this
+# revision, so later changes to the app cannot change what it writes.
+GEOHASH_PRECISION = 12
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# (city, state): (latitude, longitude) of the city centre.
+CITIES = {
+    ('Albuquerque', 'NM'): (35.0844, -106.6504),
+    ('Anaheim', 'CA'): (33.8366, -117.9143),
+    ('Anchorage', 'AK'): (61.2181, -149.9003),
+    ('Arlington', 'TX'): (32.7357, -97.1081),
+    ('Atlanta', 'GA'): (33.7490, -84.3880),
+    ('Aurora', 'CO'): (39.7294, -104.8319),
+    ('Austin', 'TX'): (30.2672, -97.7431),
+    ('Bakersfield', 'CA'): (35.3733, -119.0187),
+    ('Baltimore', 'MD'): (39.2904, -76.6122),
+    ('Billings', 'MT'): (45.7833, -108.5007),
+    ('Birmingham', 'AL'): (33.5186, -86.8104),
+    ('Boise', 'ID'): (43.6150, -116.2023),
+    ('Boston', 'MA'): (42.3601, -71.0589),
+    ('Buffalo', 'NY'): (42.8864, -78.8784),
+    ('Burlington', 'VT'): (44.4759, -73.2121),
+    ('Chandler', 'AZ'): (33.3062, -111.8413),
+    ('Charleston', 'SC'): (32.7765, -79.9311),
+    ('Charlotte', 'NC'): (35.2271, -80.8431),
+    ('Cheyenne', 'WY'): (41.1400, -104.8202),
+    ('Chicago', 'IL'): (41.8781, -87.6298),
+    ('Chula Vista', 'CA'): (32.6401, -117.0842),
+    ('Cincinnati', 'OH'): (39.1031, -84.5120),
+    ('Cleveland', 'OH'): (41.4993, -81.6944),
+    ('Colorado Springs', 'CO'): (38.8339, -104.8214),
+    ('Columbus', 'OH'): (39.9612, -82.9988),
+    ('Corpus Christi', 'TX'): (27.8006, -97.3964),
+    ('Dallas', 'TX'): (32.7767, -96.7970),
+    ('Denver', 'CO'): (39.7392, -104.9903),
+    ('Des Moines', 'IA'): (41.5868, -93.6250),
+    ('Detroit', 'MI'): (42.3314, -83.0458),
+    ('Durham', 'NC'): (35.9940, -78.8986),
+    ('El Paso', 'TX'): (31.7619, -106.4850),
+    ('Fargo', 'ND'): (46.8772, -96.7898),
+    ('Fort Wayne', 'IN'): (41.0793, -85.1394),
+    ('Fort Worth', 'TX'): (32.7555, -97.3308),
+    ('Fresno', 'CA'): (36.7378, -119.7871),
+    ('Glendale', 'AZ'): (33.5387, -112.1860),
+    ('Greensboro', 'NC'): (36.0726, -79.7920),
+    ('Hartford', 'CT'): (41.7658, -72.6734),
+    ('Honolulu', 'HI'): (21.3069, -157.8583),
+    ('Houston', 'TX'): (29.7604, -95.3698),
+    ('Indianapolis', 'IN'): (39.7684, -86.1581),
+    ('Irvine', 'CA'): (33.6846, -117.8265),
+    ('Jackson', 'MS'): (32.2988, -90.1848),
+    ('Jacksonville', 'FL'): (30.3322, -81.6557),
+    ('Jersey City', 'NJ'): (40.7178, -74.0431),
+    ('Kansas City', 'MO'): (39.0997, -94.5786),
+    ('Laredo', 'TX'): (27.5306, -99.4803),
+    ('Las Vegas', 'NV'): (36.1699, -115.1398),
+    ('Lexington', 'KY'): (38.0406, -84.5037),
+    ('Lincoln', 'NE'): (40.8136, -96.7026),
+    ('Little Rock', 'AR'): (34.7465, -92.2896),
+    ('Long Beach', 'CA'): (33.7701, -118.1937),
+    ('Los Angeles', 'CA'): (34.0522, -118.2437),
+    ('Louisville', 'KY'): (38.2527, -85.7585),
+    ('Lubbock', 'TX'): (33.5779, -101.8552),
+    ('Madison', 'WI'): (43.0731, -89.4012),
+    ('Manchester', 'NH'): (42.9956, -71.4548),
+    ('Memphis', 'TN'): (35.1495, -90.0490),
+    ('Mesa', 'AZ'): (33.4152, -111.8315),
+    ('Miami', 'FL'): (25.7617, -80.1918),
+    ('Milwaukee', 'WI'): (43.0389, -87.9065),
+    ('Minneapolis', 'MN'): (44.9778, -93.2650),
+    ('Nashville', 'TN'): (36.1627, -86.7816),
+    ('New Orleans', 'LA'): (29.9511, -90.0715),
+    ('New York', 'NY'): (40.7128, -74.0060),
+    ('Newark', 'NJ'): (40.7357, -74.1724),
+    ('Norfolk', 'VA'): (36.8508, -76.2859),
+    ('Oakland', 'CA'): (37.8044, -122.2712),
+    ('Oklahoma City', 'OK'): (35.4676, -97.5164),
+    ('Omaha', 'NE'): (41.2565, -95.9345),
+    ('Orlando', 'FL'): (28.5383, -81.3792),
+    ('Philadelphia', 'PA'): (39.9526, -75.1652),
+    ('Phoenix', 'AZ'): (33.4484, -112.0740),
+    ('Pittsburgh', 'PA'): (40.4406, -79.9959),
+    ('Plano', 'TX'): (33.0198, -96.6989),
+    ('Portland', 'ME'): (43.6591, -70.2568),
+    ('Portland', 'OR'): (45.5152, -122.6784),
+    ('Providence', 'RI'): (41.8240, -71.4128),
+    ('Raleigh', 'NC'): (35.7796, -78.6382),
+    ('Reno', 'NV'): (39.5296, -119.8138),
+    ('Richmond', 'VA'): (37.5407, -77.4360),
+    ('Riverside', 'CA'): (33.9806, -117.3755),
+    ('Sacramento', 'CA'): (38.5816, -121.4944),
+    ('Saint Louis', 'MO'): (38.6270, -90.1994),
+    ('Saint Paul', 'MN'): (44.9537, -93.0900),
+    ('Saint Petersburg', 'FL'): (27.7676, -82.6403),
+    ('Salt Lake City', 'UT'): (40.7608, -111.8910),
+    ('San Antonio', 'TX'): (29.4241, -98.4936),
+    ('San Diego', 'CA'): (32.7157, -117.1611),
+    ('San Francisco', 'CA'): (37.7749, -122.4194),
+    ('San Jose', 'CA'): (37.3382, -121.8863),
+    ('Santa Ana', 'CA'): (33.7455, -117.8677),
+    ('Scottsdale', 'AZ'): (33.4942, -111.9261),
+    ('Seattle', 'WA'): (47.6062, -122.3321),
+    ('Sioux Falls', 'SD'): (43.5446, -96.7311),
+    ('Spokane', 'WA'): (47.6588, -117.4260),
+    ('Stockton', 'CA'): (37.9577, -121.2908),
+    ('Tampa', 'FL'): (27.9506, -82.4572),
+    ('Toledo', 'OH'): (41.6528, -83.5379),
+    ('Tucson', 'AZ'): (32.2226, -110.9747),
+    ('Tulsa', 'OK'): (36.1540, -95.9928),
+    ('Virginia Beach', 'VA'): (36.8529, -75.9780),
+    ('Washington', 'DC'): (38.9072, -77.0369),
+    ('Wichita', 'KS'): (37.6872, -97.3301),
+    ('Wilmington', 'DE'): (39.7391, -75.5398),
+}
+
+def _city_key(city, state):
+    city = ' '.join((city or '').replace('.', ' ').lower().split())
+    if city.startswith('st '):
+        city = 'saint ' + city[3:]
+    return city, (state or '').strip().upper()
+
+_GEOCODE = {_city_key(city, state): point
+            for (city, state), point in CITIES.items()}
+
+def geocode(city, state):
+    """``(latitude, longitude)`` of a city in CITIES, or None."""
+    return _GEOCODE.get(_city_key(city, state))
+
+def _bits(precision):
+    """Latitude and longitude bits of a geohash of ``precision`` chars."""
+    total = 5 * precision
+    return total // 2, total - total // 2
+
+def _cell(lat_index, lon_index, precision):
+    """Geohash of the cell at grid position (``lat_index``, ``lon_index``)."""
+    lat_bits, lon_bits = _bits(precision)
+    value = 0
+    # bits alternate, longitude first
+    for bit in range(5 * precision):
+        if bit % 2 == 0:
+            lon_bits -= 1
+            value = (value << 1) | ((lon_index >> lon_bits) & 1)
+        else:
+            lat_bits -= 1
+            value = (value << 1) | ((lat_index >> lat_bits) & 1)
+    return ''.join(BASE32[(value >> shift) & 31]
+                   for shift in range(5 * (precision - 1), -1, -5))
+
+def _index(value, low, span, bits):
+    return min(int((value - low) / span * (1 << bits)), (1 << bits) - 1)
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_bits, lon_bits = _bits(precision)
+    return _cell(_index(latitude, -90.0, 180.0, lat_bits),
+                 _index(longitude, -180.0, 360.0, lon_bits), precision)
+
+
+def upgrade():
+    with op.batch_alter_table('Venue', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('geohash', sa.String(length=12), nullable=True))
+        batch_op.create_index(batch_op.f('ix_Venue_geohash'), ['geohash'], unique=False)
+
+    # one UPDATE per distinct city; venues in cities missing from the table
+    # stay unplaced until it lists them and `flask geocode-venues` runs
+    bind = op.get_bind()
+    cities = bind.execute(sa.text(
+        'SELECT DISTINCT city, state FROM "Venue"')).fetchall()
+    for city, state in cities:
+        point = geocode(city, state)
+        if point is None:
+            continue
+        bind.execute(
+            sa.text('UPDATE "Venue" SET latitude = :lat, longitude = :lon, '
+                    'geohash = :geohash WHERE city = :city AND state = :state'),
+            lat=point[0], lon=point[1], geohash=encode(*point),
+            city=city, state=state)
+
+
+def downgrade():
+    with op.batch_alter_table('Venue', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_Venue_geohash'))
+        batch_op.drop_column('geohash')
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
@@ -5,6 +7,39 @@ db = SQLAlchemy()
 # Models.
 #----------------------------------------------------------------------------#
 
+class Genre(db.Model):
+    __tablename__ = 'Genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    @classmethod
+    def from_names(cls, names):
+        """Return Genre rows for ``names``, creating the ones not yet stored."""
+        names = list(dict.fromkeys(n.strip() for n in names if n and n.strip()))
+        if not names:
+            return []
+        existing = {g.name: g for g in cls.query.filter(cls.name.in_(names))}
+        return [existing.get(n) or cls(name=n) for n in names]
+
+# Link tables are keyed (entity, genre); the genre_id index serves lookups
+# from a genre to the venues/artists playing it.
+venue_genres = db.Table('VenueGenre',
+    db.Column('venue_id', db.Integer,
+              db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer,
+              db.ForeignKey('Genre.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_VenueGenre_genre_id', 'genre_id')
+)
+
+artist_genres = db.Table('ArtistGenre',
+    db.Column('artist_id', db.Integer,
+              db.ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer,
+              db.ForeignKey('Genre.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_ArtistGenre_genre_id', 'genre_id')
+)
+
 class Venue(db.Model):
     __tablename__ = 'Venue'
 
@@ -16,7 +51,8 @@ class Venue(db.Model):
     phone = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
-    genres = db.Column(db.String(500), nullable=False)
+    genres = db.relationship('Genre', secondary=venue_genres,
+                             order_by=Genre.name, lazy=True)
     
     # COMPLETE implement any missing fields, as a database migration using Flask-Migrate
     website_link = db.Column(db.String(120))
@@ -24,6 +60,25 @@ class Venue(db.Model):
     seeking_content = db.Column(db.String)
     shows = db.relationship('Show', backref='venue', lazy=True)
 
+    # name, city, state and genres; what venue/artist search matches against
+    search_document = db.Column(db.Text, nullable=False, server_default='')
+    updated_at = db.Column(db.DateTime, nullable=False, index=True,
+                           default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Location, geocoded from city and state by geo.py unless given. The
+    # geohash index serves the nearby/within-box searches.
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geohash = db.Column(db.String(12), index=True)
+
+    @property
+    def genre_names(self):
+        return [g.name for g in self.genres]
+
+    def build_search_document(self):
+        return ' '.join([self.name or '', self.city or '', self.state or '']
+                        + self.genre_names)
+
 class Artist(db.Model):
     __tablename__ = 'Artist'
 
@@ -32,7 +87,8 @@ class Artist(db.Model):
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(120), nullable=False)
+    genres = db.relationship('Genre', secondary=artist_genres,
+                             order_by=Genre.name, lazy=True)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     
@@ -42,12 +98,72 @@ class Artist(db.Model):
     seeking_content = db.Column(db.String)
     shows = db.relationship('Show', backref='artist', lazy=True)
 
+    # name, city, state and genres; what venue/artist search matches against
+    search_document = db.Column(db.Text, nullable=False, server_default='')
+    updated_at = db.Column(db.DateTime, nullable=False, index=True,
+                           default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def genre_names(self):
+        return [g.name for g in self.genres]
+
+    def build_search_document(self):
+        return ' '.join([self.name or '', self.city or '', self.state or '']
+                        + self.genre_names)
+
 # COMPLETE: Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
 
 class Show(db.Model):
     __tablename__ = 'Show'
+    # Profile pages, the shows feed and the count queries all filter on an
+    # entity id and/or a time range.
+    __table_args__ = (
+        db.Index('ix_Show_venue_id_time', 'venue_id', 'time'),
+        db.Index('ix_Show_artist_id_time', 'artist_id', 'time'),
+        db.Index('ix_Show_time', 'time'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
     artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
-    time = db.Column(db.DateTime)
\ No newline at end of file
+    time = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, nullable=False, index=True,
+                           default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Per-entity show rollups, kept current by stats.py. ``next_show_time`` is
+# the soonest upcoming show when the row was computed; once it has passed
+# the upcoming/last values are stale until the row is reconciled.
+class VenueStats(db.Model):
+    __tablename__ = 'VenueStats'
+
+    venue_id = db.Column(db.Integer,
+                         db.ForeignKey('Venue.id', ondelete='CASCADE'),
+                         primary_key=True)
+    total_shows = db.Column(db.Integer, nullable=False, default=0,
+                            server_default='0')
+    upcoming_shows = db.Column(db.Integer, nullable=False, default=0,
+                               server_default='0')
+    next_show_time = db.Column(db.DateTime, index=True)
+    last_show_time = db.Column(db.DateTime)
+
+class ArtistStats(db.Model):
+    __tablename__ = 'ArtistStats'
+
+    artist_id = db.Column(db.Integer,
+                          db.ForeignKey('Artist.id', ondelete='CASCADE'),
+                          primary_key=True)
+    total_shows = db.Column(db.Integer, nullable=False, default=0,
+                            server_default='0')
+    upcoming_shows = db.Column(db.Integer, nullable=False, default=0,
+                               server_default='0')
+    next_show_time = db.Column(db.DateTime, index=True)
+    last_show_time = db.Column(db.DateTime)
+
+
+@db.event.listens_for(db.session, 'before_flush')
+def refresh_search_documents(session, flush_context, instances):
+    # Genre changes only touch the link tables, so the document is rebuilt
+    # for every new or dirty venue/artist rather than on column events.
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, (Venue, Artist)):
+            obj.search_document = obj.build_search_document()
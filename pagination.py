@@ -0,0 +1,91 @@
+import base64
+import json
+from datetime import datetime
+
+from flask import abort, current_app, request
+
+from models import db
+
+#----------------------------------------------------------------------------#
+# Keyset pagination.
+#
+# A page is the first ``limit`` rows strictly after the cursor in the order
+# given by ``key_columns``. The cursor is the sort key of the last row of the
+# previous page, so fetching any page costs one index range scan no matter
+# how deep into the listing it is.
+#----------------------------------------------------------------------------#
+
+def encode_cursor(values):
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def _cursor_value(column, value):
+    """``value`` as a bound for ``column``; raises ValueError unless it is a
+    scalar of the column's type (or null, for a nullable column)."""
+    if value is None:
+        if getattr(column, 'nullable', True):
+            return None
+    elif isinstance(column.type, db.DateTime):
+        if isinstance(value, str):
+            return datetime.fromisoformat(value)
+    elif isinstance(column.type, db.Integer):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    elif isinstance(column.type, db.String):
+        if isinstance(value, str):
+            return value
+    elif not isinstance(value, (list, dict)):
+        return value
+    raise ValueError('cursor value does not match %s' % column.key)
+
+def decode_cursor(token, key_columns):
+    """Decode ``token`` into sort-key values; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw.decode('utf-8'))
+        if not isinstance(values, list) or len(values) != len(key_columns):
+            raise ValueError('wrong number of cursor values')
+        return [_cursor_value(col, v) for col, v in zip(key_columns, values)]
+    except (ValueError, TypeError) as e:
+        raise ValueError('invalid cursor') from e
+
+def page_args():
+    """Read ``cursor`` and ``limit`` from the query string."""
+    default = current_app.config.get('PAGE_SIZE', 50)
+    maximum = current_app.config.get('MAX_PAGE_SIZE', 200)
+    limit = request.args.get('limit', default, type=int)
+    return request.args.get('cursor'), max(1, min(limit, maximum))
+
+def page_query(query, key_columns, cursor=None, limit=50, descending=False):
+    """Narrow ``query`` to the page after ``cursor``, plus one row to tell
+    whether another page follows; see paginate()."""
+    if cursor:
+        try:
+            after = decode_cursor(cursor, key_columns)
+        except ValueError:
+            abort(400)
+        key, bound = db.tuple_(*key_columns), db.tuple_(*after)
+        query = query.filter(key < bound if descending else key > bound)
+    order = [c.desc() for c in key_columns] if descending else key_columns
+    return query.order_by(None).order_by(*order).limit(limit + 1)
+
+def page_result(rows, key_columns, limit):
+    """Split the rows of a page_query() into ``(rows, next_cursor)``."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(
+            [getattr(rows[-1], col.key) for col in key_columns])
+    return rows, next_cursor
+
+def paginate(query, key_columns, cursor=None, limit=50, descending=False):
+    """Return ``(rows, next_cursor)`` for the page after ``cursor``.
+
+    ``key_columns`` must be unique together (end them with the primary key)
+    and every column must be readable by name on the rows ``query`` yields.
+    With ``descending`` the listing runs from the largest key down.
+    ``next_cursor`` is None on the last page.
+    """
+    rows = page_query(query, key_columns, cursor, limit, descending).all()
+    return page_result(rows, key_columns, limit)
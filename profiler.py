@@ -0,0 +1,170 @@
+import json
+import re
+import time
+
+import click
+from flask import current_app, g, has_request_context, render_template, request
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#----------------------------------------------------------------------------#
+# SQL profiler.
+#
+# Opt-in: every request when SQL_PROFILE is set, otherwise only requests
+# sending ``X-SQL-Profile: 1`` while SQL_PROFILE_HEADER allows it. Each
+# statement is reduced to its shape (literals, bound values and IN lists
+# elided) and the shapes are grouped. A SELECT shape run
+# SQL_PROFILE_REPEAT_THRESHOLD or more times in one request is reported as
+# an N+1: a query issued once per row of an earlier result.
+#
+# The summary goes out in X-SQL-* response headers, as a panel at the foot
+# of HTML pages, and as one JSON line in the application log.
+#----------------------------------------------------------------------------#
+
+HEADER = 'X-SQL-Profile'
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = r'(?:\?|%s|%\(\w+\)s|:\w+)'
+_IN_LIST = re.compile(r'\bIN \(\s*%s(?:\s*,\s*%s)*\s*\)' % (_PLACEHOLDER,
+                                                           _PLACEHOLDER),
+                      re.IGNORECASE)
+_POSTCOMPILE = re.compile(r'\(?\[POSTCOMPILE_\w+\]\)?')
+_SPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    shape = _SPACE.sub(' ', statement).strip()
+    shape = _POSTCOMPILE.sub('(...)', shape)
+    shape = _LITERAL.sub('?', shape)
+    return _IN_LIST.sub('IN (...)', shape)
+
+def enabled():
+    config = current_app.config
+    if config.get('SQL_PROFILE'):
+        return True
+    return bool(config.get('SQL_PROFILE_HEADER')) and \
+        request.headers.get(HEADER) == '1'
+
+
+class Profile(object):
+    """The statements of one request, grouped by shape."""
+
+    def __init__(self):
+        self.statements = []
+
+    def record(self, statement, seconds, executemany):
+        self.statements.append((statement_shape(statement), seconds,
+                                executemany))
+
+    @property
+    def total_seconds(self):
+        return sum(seconds for _, seconds, _ in self.statements)
+
+    def groups(self):
+        """``[{shape, count, seconds}]``, most executed first."""
+        groups = {}
+        for shape, seconds, _ in self.statements:
+            group = groups.setdefault(shape, {"shape": shape, "count": 0,
+                                              "seconds": 0.0})
+            group["count"] += 1
+            group["seconds"] += seconds
+        return sorted(groups.values(),
+                      key=lambda g: (-g["count"], -g["seconds"]))
+
+    def n_plus_one(self, threshold):
+        return [group for group in self.groups()
+                if group["count"] >= threshold
+                and group["shape"].upper().startswith('SELECT')]
+
+    def summary(self, threshold):
+        return {
+            "method": request.method,
+            "path": request.full_path.rstrip('?'),
+            "endpoint": request.endpoint,
+            "queries": len(self.statements),
+            "seconds": round(self.total_seconds, 6),
+            "groups": self.groups(),
+            "n_plus_one": [group["shape"]
+                           for group in self.n_plus_one(threshold)],
+        }
+
+#  Recording
+#  ----------------------------------------------------------------
+
+def _profile():
+    if has_request_context():
+        return getattr(g, 'sql_profile', None)
+    return None
+
+# The start time rides on the execution context, so a statement that fails
+# (no after_cursor_execute) leaves nothing behind; see metrics.py.
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _statement_started(conn, cursor, statement, parameters, context, executemany):
+    if _profile() is not None and context is not None:
+        context.profile_start = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _statement_finished(conn, cursor, statement, parameters, context, executemany):
+    profile = _profile()
+    start = getattr(context, 'profile_start', None)
+    if profile is not None:
+        elapsed = 0.0 if start is None else time.perf_counter() - start
+        profile.record(statement, elapsed, executemany)
+
+def start_profile():
+    if enabled():
+        g.sql_profile = Profile()
+
+def report_profile(response):
+    profile = getattr(g, 'sql_profile', None)
+    if profile is None:
+        return response
+    threshold = current_app.config.get('SQL_PROFILE_REPEAT_THRESHOLD', 5)
+    summary = profile.summary(threshold)
+
+    response.headers['X-SQL-Queries'] = str(summary["queries"])
+    response.headers['X-SQL-Time-Ms'] = '%.1f' % (summary["seconds"] * 1000)
+    response.headers['X-SQL-N-Plus-One'] = str(len(summary["n_plus_one"]))
+    if summary["n_plus_one"]:
+        current_app.logger.warning(json.dumps(dict(summary, event='sql_profile')))
+    else:
+        current_app.logger.info(json.dumps(dict(summary, event='sql_profile')))
+
+    if response.mimetype == 'text/html' and not response.is_streamed \
+            and response.status_code == 200:
+        panel = render_template('pages/_sql_profile.html', profile=summary,
+                                threshold=threshold)
+        body = response.get_data(as_text=True)
+        at = body.rfind('</body>')
+        if at != -1:
+            response.set_data(body[:at] + panel + body[at:])
+    return response
+
+#  CLI
+#  ----------------------------------------------------------------
+
+@click.command('profile-sql')
+@click.argument('paths', nargs=-1, required=True)
+@with_appcontext
+def profile_sql_command(paths):
+    """GET each of PATHS with profiling on; fails if any shows an N+1."""
+    client = current_app.test_client()
+    current_app.config['SQL_PROFILE'] = True
+    failed = False
+    for path in paths:
+        response = client.get(path)
+        n_plus_one = int(response.headers.get('X-SQL-N-Plus-One', 0))
+        failed = failed or n_plus_one > 0
+        click.echo('%s %s: %s queries, %s ms, %d N+1'
+                   % (response.status_code, path,
+                      response.headers.get('X-SQL-Queries'),
+                      response.headers.get('X-SQL-Time-Ms'), n_plus_one))
+    if failed:
+        raise click.ClickException('N+1 query patterns found')
+
+def init_app(app):
+    app.before_request(start_profile)
+    app.after_request(report_profile)
+    app.cli.add_command(profile_sql_command)
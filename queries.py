@@ -0,0 +1,286 @@
+from datetime import datetime
+from itertools import groupby
+
+from flask import current_app
+
+from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres
+from pagination import paginate
+from search import search
+from stats import STATS
+
+#----------------------------------------------------------------------------#
+# Query builders.
+#
+# Builders return queries selecting plain columns so their rows can be fed
+# straight into the matching ``build_*`` function in a single pass.
+#----------------------------------------------------------------------------#
+
+def stats_counts_query(model, ids, now):
+    """``(id, total, upcoming)`` from the stats rows of ``ids`` still fresh
+    at ``now``; ids left out are missing or stale."""
+    stats, key, _ = STATS[model]
+    return db.session.query(key, stats.total_shows, stats.upcoming_shows) \
+        .filter(key.in_(list(ids)),
+                db.or_(stats.next_show_time.is_(None),
+                       stats.next_show_time > now))
+
+def live_counts_query(model, ids, now):
+    """``(id, upcoming, past)`` counted from Show in a single GROUP BY."""
+    _, _, fk_column = STATS[model]
+    return db.session.query(
+        fk_column,
+        db.func.count(Show.id).filter(Show.time > now),
+        db.func.count(Show.id).filter(Show.time <= now)
+    ).filter(fk_column.in_(list(ids))).group_by(fk_column)
+
+def show_counts(model, ids, now=None):
+    """Return ``{id: (upcoming, past)}`` show counts for ``ids``.
+
+    ``model`` is Venue or Artist. Counts are read from its stats rollup in
+    one primary-key lookup; ids whose row is stale (their next show has
+    started since it was computed) are counted from Show with a single
+    GROUP BY instead. Ids without shows map to ``(0, 0)``.
+    """
+    now = now or datetime.now()
+    counts = dict.fromkeys(ids, (0, 0))
+    if not counts:
+        return counts
+    stale = set(counts)
+    for entity_id, total, upcoming in stats_counts_query(model, counts, now):
+        counts[entity_id] = (upcoming, total - upcoming)
+        stale.discard(entity_id)
+    if stale:
+        for entity_id, upcoming, past in live_counts_query(model, stale, now):
+            counts[entity_id] = (upcoming, past)
+    return counts
+
+#  Venues
+#  ----------------------------------------------------------------
+
+# Sort key of the area listing; also its pagination key.
+VENUE_AREA_KEY = (Venue.city, Venue.state, Venue.name, Venue.id)
+
+def venue_areas_query():
+    return db.session.query(Venue.id, Venue.name, Venue.city, Venue.state) \
+        .order_by(*VENUE_AREA_KEY)
+
+def build_venue_areas(rows, counts):
+    """Group ``rows`` into city/state areas; ``counts`` from show_counts()."""
+    areas = []
+    for (city, state), venues in groupby(rows, key=lambda r: (r.city, r.state)):
+        areas.append({
+            "city": city,
+            "state": state,
+            "venues": [{"id": v.id,
+                        "name": v.name,
+                        "num_upcoming_shows": counts[v.id][0]}
+                       for v in venues]
+        })
+    return areas
+
+#  Artists
+#  ----------------------------------------------------------------
+
+ARTIST_KEY = (Artist.name, Artist.id)
+
+def artists_query():
+    return db.session.query(Artist.id, Artist.name).order_by(*ARTIST_KEY)
+
+def build_artists(rows):
+    return [{"id": a.id, "name": a.name} for a in rows]
+
+#  Search
+#  ----------------------------------------------------------------
+
+def search_results(model, term):
+    """Ranked ``model`` matches for ``term`` with their upcoming show counts."""
+    res = search(model, term)
+    counts = show_counts(model, [entity_id for entity_id, _ in res])
+    return build_search_results(res, counts)
+
+def build_search_results(rows, counts):
+    data = []
+    for entity_id, name in rows:
+        data.append({
+            "id": entity_id,
+            "name": name,
+            "num_upcoming_shows": counts[entity_id][0]
+        })
+    return {"count": len(data), "data": data}
+
+#  Shows
+#  ----------------------------------------------------------------
+
+SHOW_KEY = (Show.time, Show.id)
+
+def shows_feed_query(upcoming_only=True, now=None):
+    query = db.session.query(
+        Show.id,
+        Show.time,
+        Show.venue_id,
+        Venue.name.label('venue_name'),
+        Show.artist_id,
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')
+    ).join(Venue, Venue.id == Show.venue_id) \
+     .join(Artist, Artist.id == Show.artist_id)
+    if upcoming_only:
+        query = query.filter(Show.time > (now or datetime.now()))
+    return query.order_by(*SHOW_KEY)
+
+def build_shows_feed(rows):
+    return [{
+        "venue_id": s.venue_id,
+        "venue_name": s.venue_name,
+        "artist_id": s.artist_id,
+        "artist_name": s.artist_name,
+        "artist_image_link": s.artist_image_link,
+        "start_time": s.time
+    } for s in rows]
+
+#  Profile show lists
+#  ----------------------------------------------------------------
+
+def venue_shows_query(venue_id):
+    return db.session.query(
+        Show.id,
+        Show.time,
+        Show.artist_id,
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')
+    ).join(Artist, Artist.id == Show.artist_id) \
+     .filter(Show.venue_id == venue_id)
+
+def artist_shows_query(artist_id):
+    return db.session.query(
+        Show.id,
+        Show.time,
+        Show.venue_id,
+        Venue.name.label('venue_name'),
+        Venue.image_link.label('venue_image_link')
+    ).join(Venue, Venue.id == Show.venue_id) \
+     .filter(Show.artist_id == artist_id)
+
+def show_window(query, window, now=None):
+    """``(query, descending)`` for one profile list: ``window`` is 'upcoming'
+    (soonest first) or 'past' (most recent first)."""
+    now = now or datetime.now()
+    if window == 'upcoming':
+        return query.filter(Show.time > now), False
+    return query.filter(Show.time <= now), True
+
+def page_shows(query, window, cursor=None, limit=10, now=None):
+    """Page ``query`` for one profile list; returns ``(rows, next_cursor)``."""
+    query, descending = show_window(query, window, now)
+    return paginate(query, SHOW_KEY, cursor, limit, descending)
+
+def build_venue_shows(rows):
+    return [{
+        "artist_id": s.artist_id,
+        "artist_name": s.artist_name,
+        "artist_image_link": s.artist_image_link,
+        "start_time": s.time
+    } for s in rows]
+
+def build_artist_shows(rows):
+    return [{
+        "venue_id": s.venue_id,
+        "venue_name": s.venue_name,
+        "venue_image_link": s.venue_image_link,
+        "start_time": s.time
+    } for s in rows]
+
+#  Profiles
+#  ----------------------------------------------------------------
+
+def venue_query(venue_id):
+    return db.session.query(
+        Venue.id, Venue.name, Venue.address, Venue.city, Venue.state,
+        Venue.phone, Venue.website_link, Venue.facebook_link,
+        Venue.currently_seeking, Venue.seeking_content, Venue.image_link
+    ).filter(Venue.id == venue_id)
+
+def artist_query(artist_id):
+    return db.session.query(
+        Artist.id, Artist.name, Artist.city, Artist.state, Artist.phone,
+        Artist.website_link, Artist.facebook_link, Artist.currently_seeking,
+        Artist.seeking_content, Artist.image_link
+    ).filter(Artist.id == artist_id)
+
+def genres_query(link, fk_column, entity_id):
+    return db.session.query(Genre.name) \
+        .join(link, link.c.genre_id == Genre.id) \
+        .filter(fk_column == entity_id).order_by(Genre.name)
+
+def build_venue_profile(venue, genres, upcoming, past, counts):
+    """``upcoming``/``past`` are ``(rows, cursor)``; ``counts`` as from
+    show_counts() for this venue."""
+    upcoming_count, past_count = counts
+    return {
+        "id": venue.id,
+        "name": venue.name,
+        "genres": genres,
+        "address": venue.address,
+        "city": venue.city,
+        "state": venue.state,
+        "phone": venue.phone,
+        "website": venue.website_link,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.currently_seeking,
+        "seeking_description": venue.seeking_content,
+        "image_link": venue.image_link,
+        "past_shows": build_venue_shows(past[0]),
+        "upcoming_shows": build_venue_shows(upcoming[0]),
+        "past_shows_count": past_count,
+        "upcoming_shows_count": upcoming_count,
+        "past_shows_cursor": past[1],
+        "upcoming_shows_cursor": upcoming[1]
+    }
+
+def build_artist_profile(artist, genres, upcoming, past, counts):
+    upcoming_count, past_count = counts
+    return {
+        "id": artist.id,
+        "name": artist.name,
+        "genres": genres,
+        "city": artist.city,
+        "state": artist.state,
+        "phone": artist.phone,
+        "website": artist.website_link,
+        "facebook_link": artist.facebook_link,
+        "seeking_venue": artist.currently_seeking,
+        "seeking_description": artist.seeking_content,
+        "image_link": artist.image_link,
+        "past_shows": build_artist_shows(past[0]),
+        "upcoming_shows": build_artist_shows(upcoming[0]),
+        "past_shows_count": past_count,
+        "upcoming_shows_count": upcoming_count,
+        "past_shows_cursor": past[1],
+        "upcoming_shows_cursor": upcoming[1]
+    }
+
+def venue_profile(venue_id, now=None):
+    venue = venue_query(venue_id).first_or_404()
+    now = now or datetime.now()
+    limit = current_app.config['PROFILE_SHOWS_LIMIT']
+    genres = [name for name, in genres_query(
+        venue_genres, venue_genres.c.venue_id, venue_id)]
+    upcoming = page_shows(venue_shows_query(venue_id), 'upcoming',
+                          limit=limit, now=now)
+    past = page_shows(venue_shows_query(venue_id), 'past',
+                      limit=limit, now=now)
+    counts = show_counts(Venue, [venue_id], now)[venue_id]
+    return build_venue_profile(venue, genres, upcoming, past, counts)
+
+def artist_profile(artist_id, now=None):
+    artist = artist_query(artist_id).first_or_404()
+    now = now or datetime.now()
+    limit = current_app.config['PROFILE_SHOWS_LIMIT']
+    genres = [name for name, in genres_query(
+        artist_genres, artist_genres.c.artist_id, artist_id)]
+    upcoming = page_shows(artist_shows_query(artist_id), 'upcoming',
+                          limit=limit, now=now)
+    past = page_shows(artist_shows_query(artist_id), 'past',
+                      limit=limit, now=now)
+    counts = show_counts(Artist, [artist_id], now)[artist_id]
+    return build_artist_profile(artist, genres, upcoming, past, counts)
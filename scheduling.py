@@ -0,0 +1,203 @@
+import calendar
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from itertools import groupby
+
+from flask import abort, current_app, request
+
+from models import db, Venue, Artist, Show
+
+#----------------------------------------------------------------------------#
+# Booking conflicts.
+#
+# Every show lasts SHOW_DURATION_MINUTES. Two shows overlap when their start
+# times are less than one duration apart, so the conflicts of a new booking
+# are found with one range scan each on (venue_id, time) and
+# (artist_id, time). That is O(log n) however many shows are booked.
+#----------------------------------------------------------------------------#
+
+def show_duration():
+    return timedelta(minutes=current_app.config.get('SHOW_DURATION_MINUTES', 120))
+
+def overlapping_shows(fk_column, entity_id, start, duration=None):
+    duration = duration or show_duration()
+    return Show.query.filter(fk_column == entity_id,
+                             Show.time > start - duration,
+                             Show.time < start + duration) \
+        .order_by(Show.time)
+
+def check_booking(venue_id, artist_id, start):
+    """Return ``{form field: [messages]}`` for a show that cannot be booked.
+
+    The venue and artist rows are locked first (always in that order) so a
+    concurrent booking for either waits until this transaction ends; call it
+    in the transaction that inserts the show.
+    """
+    errors = {}
+    venue = db.session.query(Venue.id).filter(Venue.id == venue_id) \
+        .with_for_update().first()
+    artist = db.session.query(Artist.id).filter(Artist.id == artist_id) \
+        .with_for_update().first()
+    if venue is None:
+        errors.setdefault('venue_id', []).append(
+            'There is no venue with ID %s.' % venue_id)
+    if artist is None:
+        errors.setdefault('artist_id', []).append(
+            'There is no artist with ID %s.' % artist_id)
+    if errors:
+        return errors
+
+    for show in overlapping_shows(Show.venue_id, venue_id, start):
+        errors.setdefault('venue_id', []).append(
+            'The venue is already booked at %s.' % show.time)
+    for show in overlapping_shows(Show.artist_id, artist_id, start):
+        errors.setdefault('artist_id', []).append(
+            'The artist is already playing at %s.' % show.time)
+    return errors
+
+#----------------------------------------------------------------------------#
+# Availability.
+#
+# A calendar reads the shows of one venue or artist in the requested range
+# with one range scan, then merges their [start, start + duration) slots in
+# memory; free time is the gaps between the merged slots.
+#----------------------------------------------------------------------------#
+
+class IntervalSet(object):
+    """Disjoint half-open ``[start, end)`` intervals, kept sorted and merged.
+
+    Overlap tests and inserts find their place by bisection.
+    """
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        for start, end in intervals:
+            self.add(start, end)
+
+    def __iter__(self):
+        return iter(zip(self.starts, self.ends))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def add(self, start, end):
+        if end <= start:
+            return
+        # intervals i..j-1 overlap or touch [start, end); merge them in
+        i = bisect_left(self.ends, start)
+        j = bisect_right(self.starts, end)
+        if i < j:
+            start = min(start, self.starts[i])
+            end = max(end, self.ends[j - 1])
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+    def overlaps(self, start, end):
+        i = bisect_right(self.ends, start)
+        return i < len(self.starts) and self.starts[i] < end
+
+    def between(self, start, end):
+        """The intervals within ``[start, end)``, clipped to it."""
+        i = bisect_right(self.ends, start)
+        clipped = []
+        while i < len(self.starts) and self.starts[i] < end:
+            clipped.append((max(self.starts[i], start), min(self.ends[i], end)))
+            i += 1
+        return clipped
+
+    def gaps(self, start, end):
+        """The parts of ``[start, end)`` not covered by any interval."""
+        free = []
+        for busy_start, busy_end in self.between(start, end):
+            if start < busy_start:
+                free.append((start, busy_start))
+            start = busy_end
+        if start < end:
+            free.append((start, end))
+        return free
+
+
+def range_args():
+    """Read ``start`` and ``end`` dates (YYYY-MM-DD, inclusive) from the
+    query string; returns the half-open datetime range they cover."""
+    span = current_app.config.get('CALENDAR_DAYS', 31)
+    maximum = current_app.config.get('CALENDAR_MAX_DAYS', 366)
+    try:
+        first = date.fromisoformat(request.args['start']) \
+            if request.args.get('start') else date.today()
+        last = date.fromisoformat(request.args['end']) \
+            if request.args.get('end') else first + timedelta(days=span - 1)
+    except ValueError:
+        abort(400)
+    if last < first or (last - first).days >= maximum:
+        abort(400)
+    return (datetime.combine(first, time()),
+            datetime.combine(last + timedelta(days=1), time()))
+
+def adjacent_ranges(start, end):
+    """``start``/``end`` query arguments for the ranges either side."""
+    span, day = end - start, timedelta(days=1)
+    return ({"start": (start - span).date().isoformat(),
+             "end": (start - day).date().isoformat()},
+            {"start": end.date().isoformat(),
+             "end": (end + span - day).date().isoformat()})
+
+def availability(model, entity_id, start, end):
+    """Booked shows, booked slots and free slots of a venue or artist."""
+    entity = db.session.query(model.id, model.name) \
+        .filter(model.id == entity_id).first_or_404()
+    if model is Venue:
+        fk_column, other, other_fk, kind = \
+            Show.venue_id, Artist, Show.artist_id, 'artist'
+    else:
+        fk_column, other, other_fk, kind = \
+            Show.artist_id, Venue, Show.venue_id, 'venue'
+
+    duration = show_duration()
+    rows = db.session.query(Show.id, Show.time, other.id, other.name) \
+        .join(other, other.id == other_fk) \
+        .filter(fk_column == entity_id,
+                Show.time > start - duration,
+                Show.time < end) \
+        .order_by(Show.time).all()
+    booked = IntervalSet((r[1], r[1] + duration) for r in rows)
+
+    return {
+        "id": entity.id,
+        "name": entity.name,
+        "start": start,
+        "end": end,
+        "show_duration_minutes": int(duration.total_seconds() // 60),
+        "shows": [{
+            "show_id": show_id,
+            kind + "_id": other_id,
+            kind + "_name": other_name,
+            "start_time": show_time,
+            "end_time": show_time + duration,
+        } for show_id, show_time, other_id, other_name in rows],
+        "booked": [{"start": s, "end": e} for s, e in booked.between(start, end)],
+        "free": [{"start": s, "end": e} for s, e in booked.gaps(start, end)],
+    }
+
+def calendar_months(data):
+    """Lay the shows of ``availability()`` out as month grids.
+
+    Returns ``[(first of month, weeks)]`` where each week is seven
+    ``(day, shows)`` pairs; ``day`` is None outside the requested range.
+    """
+    by_day = {day: list(shows) for day, shows in
+              groupby(data["shows"], key=lambda s: s["start_time"].date())}
+    first, last = data["start"].date(), data["end"].date() - timedelta(days=1)
+    grid = calendar.Calendar(firstweekday=calendar.SUNDAY)
+
+    months = []
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        weeks = [[(day, by_day.get(day, []))
+                  if first <= day <= last and day.month == month else (None, [])
+                  for day in week]
+                 for week in grid.monthdatescalendar(year, month)]
+        months.append((date(year, month, 1), weeks))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
@@ -0,0 +1,96 @@
+import re
+
+from flask import current_app
+
+from models import db, Venue, Artist
+
+#----------------------------------------------------------------------------#
+# Venue and artist search.
+#
+# Both models carry a ``search_document`` (name, city, state and genres) kept
+# up to date on flush. How it is indexed depends on the database:
+#
+#   postgresql  GIN index on to_tsvector('simple', search_document) for
+#               word-prefix matches, ranked with ts_rank, and a GIN trigram
+#               index for substring matches inside words, listed after them
+#               by similarity; one statement serves both.
+#   sqlite      an external-content FTS5 table per model, ranked with bm25.
+#   otherwise   a plain case-insensitive substring match.
+#
+# The indexes are created by migration b1d5f0c3e8a7.
+#----------------------------------------------------------------------------#
+
+FTS_TABLES = {Venue: 'VenueSearch', Artist: 'ArtistSearch'}
+
+
+def _tokens(term):
+    return re.findall(r'\w+', term.lower())
+
+def _contains(column, term):
+    """``column ILIKE '%term%'``, with LIKE wildcards in ``term`` matched
+    literally."""
+    escaped = re.sub(r'([\\%_])', r'\\\1', term)
+    return column.ilike('%' + escaped + '%', escape='\\')
+
+# Each backend is split into query builders and a runner, so the async
+# read path (aio.py) can execute the same statements.
+
+def ilike_query(model, term, limit):
+    return db.session.query(model.id, model.name) \
+        .filter(_contains(model.search_document, term)) \
+        .order_by(model.name, model.id).limit(limit)
+
+def tsquery_query(model, term, limit):
+    """Word-prefix matches by ts_rank, then substring matches inside words
+    ("usical") by trigram similarity."""
+    tokens = _tokens(term)
+    vector = db.func.to_tsvector(db.literal_column("'simple'"),
+                                 model.search_document)
+    query = db.func.to_tsquery(db.literal_column("'simple'"),
+                               ' & '.join(t + ':*' for t in tokens))
+    words = vector.op('@@')(query)
+    rank = db.case([(words, db.func.ts_rank(vector, query))], else_=0)
+    similarity = db.func.similarity(model.search_document, term)
+    return db.session.query(model.id, model.name) \
+        .filter(db.or_(words, _contains(model.search_document, term))) \
+        .order_by(db.case([(words, 0)], else_=1), rank.desc(),
+                  similarity.desc(), model.name, model.id) \
+        .limit(limit)
+
+def fts_statement(model, term, limit):
+    table = FTS_TABLES[model]
+    match = ' AND '.join('"%s"*' % t for t in _tokens(term))
+    return db.text(
+        'SELECT rowid AS id, bm25("{0}") AS rank FROM "{0}" '
+        'WHERE "{0}" MATCH :match ORDER BY rank LIMIT :limit'.format(table)) \
+        .bindparams(match=match, limit=limit)
+
+def names_query(model, ids):
+    return db.session.query(model.id, model.name).filter(model.id.in_(ids))
+
+def ranked_names(ranked, names):
+    """``(id, name)`` in FTS rank order, skipping rows deleted meanwhile."""
+    names = dict(names)
+    return [(r.id, names[r.id]) for r in ranked if r.id in names]
+
+def backend(term):
+    """'postgresql', 'sqlite' or 'ilike': how ``term`` is searched."""
+    if not _tokens(term):
+        return 'ilike'
+    dialect = db.engine.dialect.name
+    return dialect if dialect in ('postgresql', 'sqlite') else 'ilike'
+
+def search(model, term, limit=None):
+    """Return ``(id, name)`` rows of ``model`` matching ``term``, best first."""
+    if limit is None:
+        limit = current_app.config.get('SEARCH_RESULTS_LIMIT', 100)
+    term = term.strip()
+    kind = backend(term)
+    if kind == 'postgresql':
+        return tsquery_query(model, term, limit).all()
+    if kind == 'sqlite':
+        ranked = db.session.execute(fts_statement(model, term, limit)).fetchall()
+        if not ranked:
+            return []
+        return ranked_names(ranked, names_query(model, [r.id for r in ranked]))
+    return ilike_query(model, term, limit).all()
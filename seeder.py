@@ -0,0 +1,219 @@
+import math
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+import click
+from flask.cli import with_appcontext
+
+from forms import VenueForm
+from geo import encode, geocode
+from models import (
+    db,
+    Venue,
+    Artist,
+    Show,
+    Genre,
+    venue_genres,
+    artist_genres
+)
+from stats import refresh_stats
+
+#----------------------------------------------------------------------------#
+# Synthetic data.
+#
+# Generates venues, artists and shows shaped like a real catalogue: a few
+# busy venues and headline artists take most of the bookings (Zipf-like
+# weights), shows fall on evenings over the past two years and the next
+# one, and every row carries genres and a search document; venues are
+# scattered around their city centre. Rows go in with core executemany in
+# chunks, so tens of millions of shows stay feasible; the stats rollups are
+# rebuilt at the end.
+#----------------------------------------------------------------------------#
+
+CITIES = [
+    ('New York', 'NY'), ('Los Angeles', 'CA'), ('Chicago', 'IL'),
+    ('Houston', 'TX'), ('Phoenix', 'AZ'), ('Philadelphia', 'PA'),
+    ('San Antonio', 'TX'), ('San Diego', 'CA'), ('Dallas', 'TX'),
+    ('Austin', 'TX'), ('San Francisco', 'CA'), ('Seattle', 'WA'),
+    ('Denver', 'CO'), ('Nashville', 'TN'), ('Portland', 'OR'),
+    ('Las Vegas', 'NV'), ('Detroit', 'MI'), ('Memphis', 'TN'),
+    ('Atlanta', 'GA'), ('Miami', 'FL'), ('Minneapolis', 'MN'),
+    ('New Orleans', 'LA'), ('Boston', 'MA'), ('Baltimore', 'MD'),
+]
+
+VENUE_WORDS = (['The'], ['Blue', 'Golden', 'Velvet', 'Electric', 'Rusty',
+                         'Silver', 'Crimson', 'Midnight', 'Lucky', 'Old'],
+               ['Room', 'Hall', 'Tavern', 'Lounge', 'Ballroom', 'Garage',
+                'Theatre', 'Cellar', 'Warehouse', 'Barn'])
+ARTIST_WORDS = (['The', 'DJ', 'Lil', 'Saint', 'Captain', 'Young'],
+                ['Wild', 'Hollow', 'Neon', 'Paper', 'Iron', 'Quiet',
+                 'Broken', 'Stone', 'Lunar', 'Gentle'],
+                ['Owls', 'Rivers', 'Echoes', 'Horses', 'Kings', 'Ghosts',
+                 'Parade', 'Collective', 'Machine', 'Brothers'])
+
+GENRES = [value for value, _ in VenueForm.genres.kwargs['choices']]
+
+
+def _name(rng, words, serial):
+    return '%s %s %s %d' % (rng.choice(words[0]), rng.choice(words[1]),
+                            rng.choice(words[2]), serial)
+
+def _weights(count, skew):
+    """Cumulative Zipf-like weights: rank r is picked in proportion to 1/r**skew."""
+    weights = [1.0 / (rank ** skew) for rank in range(1, count + 1)]
+    return list(accumulate(weights))
+
+def _chunks(total, size):
+    for offset in range(0, total, size):
+        yield min(size, total - offset)
+
+def _scatter(rng, latitude, longitude, km=8.0):
+    """A point around a city centre, ``km`` standard deviation."""
+    degrees = km / 111.0
+    return (latitude + rng.gauss(0, degrees),
+            longitude + rng.gauss(0, degrees / math.cos(math.radians(latitude))))
+
+def _genre_ids(rng, genre_ids):
+    return rng.sample(genre_ids, rng.randint(1, 3))
+
+def _ensure_genres():
+    existing = {g.name: g.id for g in Genre.query}
+    missing = [{"name": name} for name in GENRES if name not in existing]
+    if missing:
+        db.session.execute(Genre.__table__.insert(), missing)
+        existing = {g.name: g.id for g in Genre.query}
+    return existing
+
+def _insert_entities(model, link, fk, rows, genre_lists):
+    """Insert ``rows`` of ``model`` and their genre links; returns new ids."""
+    before = db.session.query(db.func.max(model.id)).scalar() or 0
+    db.session.execute(model.__table__.insert(), rows)
+    ids = [i for i, in db.session.query(model.id)
+           .filter(model.id > before).order_by(model.id)]
+    db.session.execute(link.insert(), [
+        {fk: entity_id, "genre_id": genre_id}
+        for entity_id, genres in zip(ids, genre_lists) for genre_id in genres])
+    return ids
+
+def seed_venues(rng, count, genres, chunk_size):
+    names = {genre_id: name for name, genre_id in genres.items()}
+    ids = []
+    for size in _chunks(count, chunk_size):
+        rows, genre_lists = [], []
+        for _ in range(size):
+            city, state = rng.choice(CITIES)
+            latitude, longitude = _scatter(rng, *geocode(city, state))
+            name = _name(rng, VENUE_WORDS, len(ids) + len(rows) + 1)
+            genre_ids = _genre_ids(rng, list(names))
+            genre_lists.append(genre_ids)
+            rows.append({
+                "name": name,
+                "city": city,
+                "state": state,
+                "address": '%d %s Street' % (rng.randint(1, 9999),
+                                             rng.choice(VENUE_WORDS[1])),
+                "phone": '%03d-%03d-%04d' % (rng.randint(200, 999),
+                                             rng.randint(200, 999),
+                                             rng.randint(0, 9999)),
+                "latitude": latitude,
+                "longitude": longitude,
+                "geohash": encode(latitude, longitude),
+                "currently_seeking": rng.random() < 0.3,
+                "seeking_content": 'Booking local acts.',
+                "search_document": ' '.join(
+                    [name, city, state] + sorted(names[g] for g in genre_ids)),
+            })
+        ids += _insert_entities(Venue, venue_genres, 'venue_id', rows,
+                                genre_lists)
+        db.session.commit()
+    return ids
+
+def seed_artists(rng, count, genres, chunk_size):
+    names = {genre_id: name for name, genre_id in genres.items()}
+    ids = []
+    for size in _chunks(count, chunk_size):
+        rows, genre_lists = [], []
+        for _ in range(size):
+            city, state = rng.choice(CITIES)
+            name = _name(rng, ARTIST_WORDS, len(ids) + len(rows) + 1)
+            genre_ids = _genre_ids(rng, list(names))
+            genre_lists.append(genre_ids)
+            rows.append({
+                "name": name,
+                "city": city,
+                "state": state,
+                "phone": '%03d-%03d-%04d' % (rng.randint(200, 999),
+                                             rng.randint(200, 999),
+                                             rng.randint(0, 9999)),
+                "currently_seeking": rng.random() < 0.2,
+                "seeking_content": 'Looking for a residency.',
+                "search_document": ' '.join(
+                    [name, city, state] + sorted(names[g] for g in genre_ids)),
+            })
+        ids += _insert_entities(Artist, artist_genres, 'artist_id', rows,
+                                genre_lists)
+        db.session.commit()
+    return ids
+
+def seed_shows(rng, count, venue_ids, artist_ids, chunk_size, skew=1.0):
+    venue_weights = _weights(len(venue_ids), skew)
+    artist_weights = _weights(len(artist_ids), skew)
+    # shuffle so the busiest venues are not simply the oldest rows
+    venue_ids, artist_ids = list(venue_ids), list(artist_ids)
+    rng.shuffle(venue_ids)
+    rng.shuffle(artist_ids)
+    # two years back, one year ahead; evenings between 6pm and 11pm
+    first_day = datetime.now().replace(hour=0, minute=0, second=0,
+                                       microsecond=0) - timedelta(days=730)
+    for size in _chunks(count, chunk_size):
+        venues = rng.choices(venue_ids, cum_weights=venue_weights, k=size)
+        artists = rng.choices(artist_ids, cum_weights=artist_weights, k=size)
+        db.session.execute(Show.__table__.insert(), [
+            {"venue_id": venue_id,
+             "artist_id": artist_id,
+             "time": first_day + timedelta(days=rng.randrange(1095),
+                                           minutes=18 * 60 + 30 * rng.randrange(11))}
+            for venue_id, artist_id in zip(venues, artists)])
+        db.session.commit()
+
+def seed(venues, artists, shows, chunk_size=10000, seed=None):
+    """Add ``venues``, ``artists`` and ``shows`` synthetic rows; returns the
+    new venue and artist ids."""
+    rng = random.Random(seed)
+    genres = _ensure_genres()
+    venue_ids = seed_venues(rng, venues, genres, chunk_size)
+    artist_ids = seed_artists(rng, artists, genres, chunk_size)
+    seed_shows(rng, shows, venue_ids, artist_ids, chunk_size)
+
+    # core inserts skip the session events that keep the stats current
+    for model, ids in ((Venue, venue_ids), (Artist, artist_ids)):
+        for offset in range(0, len(ids), 1000):
+            refresh_stats(model, ids[offset:offset + 1000])
+            db.session.commit()
+    return venue_ids, artist_ids
+
+#  CLI
+#  ----------------------------------------------------------------
+
+@click.command('seed-data')
+@click.option('--shows', type=int, default=10000, show_default=True)
+@click.option('--venues', type=int,
+              help='Defaults to one venue per 50 shows.')
+@click.option('--artists', type=int,
+              help='Defaults to one artist per 20 shows.')
+@click.option('--chunk-size', type=int, default=10000, show_default=True,
+              help='Rows per insert.')
+@click.option('--seed', 'random_seed', type=int,
+              help='Seed the generator for a repeatable data set.')
+@with_appcontext
+def seed_data_command(shows, venues, artists, chunk_size, random_seed):
+    """Fill the database with synthetic venues, artists and shows."""
+    venues = venues or max(1, shows // 50)
+    artists = artists or max(1, shows // 20)
+    seed(venues, artists, shows, chunk_size, random_seed)
+    click.echo('%d venues, %d artists and %d shows added'
+               % (venues, artists, shows))
+
+def init_app(app):
+    app.cli.add_command(seed_data_command)
@@ -2,3 +2,99 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// "Load more" on venue/artist pages: append the next page of show tiles to
+// the row above the button, and drop the button once the list is exhausted.
+$(document).on('click', '.load-more', function () {
+  var button = $(this);
+  var kind = button.data('kind');
+  button.prop('disabled', true);
+  $.getJSON(button.data('url'), { cursor: button.data('cursor') }, function (page) {
+    var row = button.prev('.row');
+    $.each(page.shows, function (_, show) {
+      var tile = $('<div class="tile tile-show">')
+        .append($('<img>').attr({ src: show[kind + '_image_link'], alt: 'Show Image' }))
+        .append($('<h5>').append($('<a>')
+          .attr('href', '/' + kind + 's/' + show[kind + '_id'])
+          .text(show[kind + '_name'])))
+        .append($('<h6>').text(show.start_time));
+      row.append($('<div class="col-sm-4">').append(tile));
+    });
+    if (page.next_cursor) {
+      button.data('cursor', page.next_cursor).prop('disabled', false);
+    } else {
+      button.remove();
+    }
+  }).fail(function () {
+    button.prop('disabled', false);
+  });
+});
+
+// Name suggestions under the navbar search boxes. Picking one opens that
+// venue/artist; Enter without a pick submits the full search as before.
+(function () {
+  var timer = null;
+  var sequence = 0;
+
+  function close(input) {
+    input.siblings('.suggestions').remove();
+  }
+
+  function show(input, kind, data) {
+    close(input);
+    if (!data.length) {
+      return;
+    }
+    var list = $('<ul class="dropdown-menu suggestions">');
+    $.each(data, function (_, item) {
+      list.append($('<li>').append($('<a>')
+        .attr('href', '/' + kind + 's/' + item.id)
+        .text(item.name)));
+    });
+    input.after(list);
+  }
+
+  $(document).on('input', '[data-autocomplete]', function () {
+    var input = $(this);
+    var query = $.trim(input.val());
+    clearTimeout(timer);
+    if (!query) {
+      close(input);
+      return;
+    }
+    timer = setTimeout(function () {
+      var current = ++sequence;
+      $.getJSON(input.data('autocomplete'), { q: query }, function (page) {
+        // answers can arrive out of order; keep only the latest
+        if (current === sequence) {
+          show(input, input.data('kind'), page.data);
+        }
+      });
+    }, 150);
+  });
+
+  $(document).on('keydown', '[data-autocomplete]', function (event) {
+    var input = $(this);
+    var items = input.siblings('.suggestions').find('li');
+    var active = items.filter('.active');
+    var index = items.index(active);
+    if ((event.which === 40 || event.which === 38) && items.length) {  // down, up
+      event.preventDefault();
+      index += event.which === 40 ? 1 : -1;
+      index = (index + items.length) % items.length;
+      active.removeClass('active');
+      items.eq(index).addClass('active');
+    } else if (event.which === 13 && active.length) {  // enter
+      event.preventDefault();
+      window.location = active.find('a').attr('href');
+    } else if (event.which === 27) {  // escape
+      close(input);
+    }
+  });
+
+  $(document).on('blur', '[data-autocomplete]', function () {
+    var input = $(this);
+    // after a click on a suggestion has followed its link
+    setTimeout(function () { close(input); }, 200);
+  });
+})();
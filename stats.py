@@ -0,0 +1,138 @@
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+
+from models import db, Venue, Artist, Show, VenueStats, ArtistStats
+
+#----------------------------------------------------------------------------#
+# Show statistics.
+#
+# VenueStats/ArtistStats hold one row per venue/artist: total and upcoming
+# show counts, the next upcoming show and the last show played. Inserting a
+# show bumps its two rows in place; deleting or moving one recomputes them
+# from Show. Time passing is the one change no write sees: a row whose
+# next_show_time has gone by is stale until ``reconcile_stats`` (run from
+# cron via ``flask reconcile-stats``) recomputes it, and readers count such
+# rows from Show in the meantime.
+#----------------------------------------------------------------------------#
+
+# model -> (stats model, stats key column, Show foreign key)
+STATS = {
+    Venue: (VenueStats, VenueStats.venue_id, Show.venue_id),
+    Artist: (ArtistStats, ArtistStats.artist_id, Show.artist_id),
+}
+
+COLUMNS = ('total_shows', 'upcoming_shows', 'next_show_time', 'last_show_time')
+
+
+def _aggregate(model, now):
+    _, _, fk_column = STATS[model]
+    return db.session.query(
+        model.id,
+        db.func.count(Show.id),
+        db.func.count(Show.id).filter(Show.time > now),
+        db.func.min(Show.time).filter(Show.time > now),
+        db.func.max(Show.time).filter(Show.time <= now)
+    ).outerjoin(Show, fk_column == model.id).group_by(model.id)
+
+def refresh_stats(model, ids, now=None, connection=None):
+    """Recompute the stats rows of the ``model`` rows ``ids`` from Show."""
+    ids = list(set(ids))
+    if not ids:
+        return
+    stats, key, _ = STATS[model]
+    now = now or datetime.now()
+    connection = connection or db.session.connection()
+    table = stats.__table__
+    connection.execute(table.delete().where(key.in_(ids)))
+    connection.execute(table.insert().from_select(
+        [key.key] + list(COLUMNS),
+        _aggregate(model, now).filter(model.id.in_(ids)).statement))
+
+def _record_show(connection, model, entity_id, time, now):
+    stats, key, _ = STATS[model]
+    values = {'total_shows': stats.total_shows + 1}
+    if time is not None and time > now:
+        values['upcoming_shows'] = stats.upcoming_shows + 1
+        values['next_show_time'] = db.case(
+            [(db.or_(stats.next_show_time.is_(None),
+                     stats.next_show_time > time), time)],
+            else_=stats.next_show_time)
+    elif time is not None:
+        values['last_show_time'] = db.case(
+            [(db.or_(stats.last_show_time.is_(None),
+                     stats.last_show_time < time), time)],
+            else_=stats.last_show_time)
+    connection.execute(
+        stats.__table__.update().where(key == entity_id).values(**values))
+
+def _moved(show):
+    state = db.inspect(show)
+    return any(state.attrs[name].history.has_changes()
+               for name in ('venue_id', 'artist_id', 'time'))
+
+def _previous(show, name):
+    history = db.inspect(show).attrs[name].history
+    return history.deleted[0] if history.deleted else getattr(show, name)
+
+@db.event.listens_for(db.session, 'after_flush')
+def maintain_stats(session, flush_context):
+    connection = session.connection()
+    now = datetime.now()
+
+    for obj in session.new:
+        if isinstance(obj, (Venue, Artist)):
+            stats, key, _ = STATS[type(obj)]
+            connection.execute(stats.__table__.insert(), {key.key: obj.id})
+
+    stale = {Venue: set(), Artist: set()}
+    for obj in session.new:
+        if isinstance(obj, Show):
+            _record_show(connection, Venue, obj.venue_id, obj.time, now)
+            _record_show(connection, Artist, obj.artist_id, obj.time, now)
+    for obj in session.deleted:
+        if isinstance(obj, Show):
+            stale[Venue].add(obj.venue_id)
+            stale[Artist].add(obj.artist_id)
+    for obj in session.dirty:
+        if isinstance(obj, Show) and _moved(obj):
+            stale[Venue].update((_previous(obj, 'venue_id'), obj.venue_id))
+            stale[Artist].update((_previous(obj, 'artist_id'), obj.artist_id))
+
+    for model, ids in stale.items():
+        refresh_stats(model, ids, now, connection)
+
+#  Reconciliation
+#  ----------------------------------------------------------------
+
+def reconcile_stats(now=None, full=False):
+    """Recompute stale and missing stats rows (every row with ``full``).
+
+    Returns the number of rows recomputed; the caller commits.
+    """
+    now = now or datetime.now()
+    count = 0
+    for model, (stats, key, _) in STATS.items():
+        if full:
+            ids = [i for i, in db.session.query(model.id)]
+        else:
+            ids = [i for i, in db.session.query(model.id)
+                   .outerjoin(stats, key == model.id)
+                   .filter(db.or_(key.is_(None), stats.next_show_time <= now))]
+        refresh_stats(model, ids, now)
+        count += len(ids)
+    return count
+
+@click.command('reconcile-stats')
+@click.option('--all', 'full', is_flag=True,
+              help='Recompute every row, not only the stale ones.')
+@with_appcontext
+def reconcile_stats_command(full):
+    """Roll venue/artist show statistics forward to the current time."""
+    count = reconcile_stats(full=full)
+    db.session.commit()
+    click.echo('%d stats rows recomputed' % count)
+
+def init_app(app):
+    app.cli.add_command(reconcile_stats_command)
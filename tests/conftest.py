@@ -0,0 +1,46 @@
+import os
+
+# config.py reads the environment when imported; the suite runs on a fresh
+# in-memory SQLite database per test unless pointed elsewhere.
+os.environ.setdefault('TEST_DATABASE_URL', 'sqlite://')
+
+import pytest
+from flask_migrate import upgrade
+
+from app import create_app
+from models import db
+import seeder
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        # the migrations also create the search tables and triggers
+        upgrade()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def queries(app):
+    """SQL statements executed while the test runs; clear() between steps."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db.event.listen(db.engine, 'before_cursor_execute', record)
+    yield statements
+    db.event.remove(db.engine, 'before_cursor_execute', record)
+
+@pytest.fixture
+def seed(app):
+    """seeder.seed(), deterministic."""
+    def seed(venues, artists, shows):
+        return seeder.seed(venues, artists, shows, chunk_size=500, seed=1)
+    return seed
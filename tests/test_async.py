@@ -0,0 +1,79 @@
+import pytest
+from flask_migrate import upgrade
+
+from aio import AsyncDatabase
+from app import create_app
+from config import async_url
+from models import db
+import seeder
+
+pytest.importorskip('aiosqlite')
+
+
+@pytest.fixture
+def app(tmp_path):
+    # an in-memory database is private to its connection: use a file both
+    # engines can open
+    url = 'sqlite:///%s' % (tmp_path / 'async.db')
+    app = create_app('testing')
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    async_db = app.extensions['async_db'] = AsyncDatabase(async_url(url), {}, 10)
+    with app.app_context():
+        upgrade()
+        yield app
+        async_db.close()
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def seeded(app):
+    venue_ids, artist_ids = seeder.seed(20, 30, 200, chunk_size=500, seed=1)
+    return venue_ids[0], artist_ids[0]
+
+
+def _content(client, path, form=None):
+    response = client.post(path, data=form) if form else client.get(path)
+    assert response.status_code == 200
+    page = response.get_data(as_text=True)
+    # the navbar follows the endpoint; compare what is inside <main>
+    return page[page.index('<main'):page.index('</main>')]
+
+
+@pytest.mark.parametrize('path', [
+    '/venues', '/artists', '/shows', '/shows?window=all',
+    '/venues?limit=5', '/artists?limit=5'])
+def test_listings_match_the_sync_views(client, seeded, path):
+    assert _content(client, '/async' + path) == _content(client, path)
+
+
+def test_profiles_match_the_sync_views(client, seeded):
+    venue_id, artist_id = seeded
+    for path in ('/venues/%d' % venue_id, '/artists/%d' % artist_id):
+        assert _content(client, '/async' + path) == _content(client, path)
+
+
+@pytest.mark.parametrize('path', ['/venues/search', '/artists/search'])
+def test_search_matches_the_sync_views(client, seeded, path):
+    form = {"search_term": 'the'}
+    assert _content(client, '/async' + path, form) == \
+        _content(client, path, form)
+
+
+def test_unknown_profiles_are_not_found(client, app):
+    assert client.get('/async/venues/999999').status_code == 404
+    assert client.get('/async/artists/999999').status_code == 404
+    assert client.get('/async/shows?window=past').status_code == 400
+
+
+def test_close_stops_the_loop_and_a_fetch_restarts_it(client, app):
+    async_db = app.extensions['async_db']
+    assert client.get('/async/venues').status_code == 200
+    thread = async_db.thread
+    assert thread.is_alive()
+
+    async_db.close()
+    assert not thread.is_alive()
+    assert async_db.loop is None and async_db.engine is None
+    assert client.get('/async/venues').status_code == 200
+    assert async_db.thread.is_alive()
@@ -0,0 +1,80 @@
+import pytest
+
+from autocomplete import PrefixIndex
+from models import db, Venue, Artist
+
+
+@pytest.fixture
+def venues(app):
+    db.session.add_all([
+        Venue(name='The Musical Hop', city='San Francisco', state='CA',
+              address='1015 Folsom Street'),
+        Venue(name='100% Vinyl', city='New York', state='NY',
+              address='335 Delancey Street'),
+        Venue(name='Park Square Live Music & Coffee', city='San Francisco',
+              state='CA', address='34 Whiskey Moore Ave'),
+    ])
+    db.session.commit()
+
+
+def _names(client, kind, term, **args):
+    body = client.get('/api/v1/%s/autocomplete' % kind,
+                      query_string=dict(args, q=term)).get_json()
+    return [entity["name"] for entity in body["data"]]
+
+
+def test_prefix_of_any_word_matches():
+    index = PrefixIndex([(1, 'The Musical Hop'), (2, 'Hop Along')])
+    assert sorted(index.complete('hop', 10)) == [(1, 'The Musical Hop'),
+                                                 (2, 'Hop Along')]
+    assert index.complete('musical h', 10) == [(1, 'The Musical Hop')]
+    assert index.complete('  THE  mus', 10) == [(1, 'The Musical Hop')]
+    assert index.complete('op', 10) == []
+    assert index.complete('', 10) == []
+
+
+def test_limit_counts_names_not_words():
+    index = PrefixIndex([(i, 'Jazz Jazz Club %d' % i) for i in range(5)])
+    found = index.complete('jazz', 3)
+    assert len(found) == len(dict(found)) == 3
+
+
+def test_edits_move_names():
+    index = PrefixIndex([(1, 'The Musical Hop')])
+    index.add(1, 'The Dueling Pianos Bar')
+    assert index.complete('musical', 10) == []
+    assert index.complete('pianos', 10) == [(1, 'The Dueling Pianos Bar')]
+    index.remove(1)
+    assert index.complete('dueling', 10) == [] and len(index) == 0
+
+
+@pytest.mark.parametrize('term', ['%', '_', '%%', '\\'])
+def test_like_wildcards_match_literally(client, venues, term):
+    assert _names(client, 'venues', term) == []
+
+
+def test_endpoint_matches_punctuated_names(client, venues):
+    assert _names(client, 'venues', '100%') == ['100% Vinyl']
+    assert _names(client, 'venues', 'music') == \
+        ['Park Square Live Music & Coffee', 'The Musical Hop']
+    assert _names(client, 'venues', 'music &') == \
+        ['Park Square Live Music & Coffee', 'The Musical Hop']
+
+
+def test_endpoint_limit_is_capped(app, client, venues):
+    assert len(_names(client, 'venues', 'mus')) == 2
+    assert _names(client, 'venues', 'mus', limit=1) == \
+        ['Park Square Live Music & Coffee']
+    app.config['AUTOCOMPLETE_LIMIT'] = 1
+    assert len(_names(client, 'venues', 'mus', limit=50)) == 1
+
+
+def test_endpoint_sees_new_names(client, venues):
+    assert _names(client, 'artists', 'guns') == []
+    db.session.add(Artist(name="Guns N Petals", city='San Francisco',
+                          state='CA'))
+    db.session.commit()
+    assert _names(client, 'artists', 'guns') == ['Guns N Petals']
+    response = client.get('/api/v1/artists/autocomplete')
+    assert response.status_code == 200
+    assert response.get_json() == {"data": []}
@@ -0,0 +1,98 @@
+from datetime import datetime
+
+import pytest
+
+from models import db, Venue, Artist, Show, Genre
+
+
+@pytest.fixture
+def venues(app):
+    jazz, rock, folk = Genre(name='Jazz'), Genre(name='Rock'), Genre(name='Folk')
+    hall = Venue(name='Jazz Hall', city='San Francisco', state='CA',
+                 address='1 Main Street', genres=[jazz, rock],
+                 currently_seeking=True)
+    db.session.add_all([
+        hall,
+        Venue(name='Blue Room', city='New York', state='NY',
+              address='2 Main Street', genres=[jazz], currently_seeking=False),
+        Venue(name='Rock Barn', city='Oakland', state='CA',
+              address='3 Main Street', genres=[rock]),
+        Venue(name='Folk Loft', city='Brooklyn', state='NY',
+              address='4 Main Street', genres=[folk], currently_seeking=True),
+    ])
+    artist = Artist(name='The Quartet', city='San Francisco', state='CA')
+    db.session.add(Show(venue=hall, artist=artist,
+                        time=datetime(2030, 1, 10, 20)))
+    db.session.commit()
+
+
+def _browse(client, **args):
+    response = client.get('/api/v1/venues/browse', query_string=args)
+    assert response.status_code == 200
+    return response.get_json()
+
+def _counts(results, facet):
+    return [(item["value"], item["count"], item["selected"])
+            for item in results["facets"][facet]]
+
+
+def test_facet_counts_without_filters(client, venues):
+    results = _browse(client)
+    assert results["count"] == 4
+    assert _counts(results, 'genre') == [('Jazz', 2, False), ('Rock', 2, False),
+                                         ('Folk', 1, False)]
+    assert _counts(results, 'state') == [('CA', 2, False), ('NY', 2, False)]
+    # no seeking flag counts as not seeking
+    assert _counts(results, 'seeking') == [('false', 2, False),
+                                           ('true', 2, False)]
+
+
+def test_each_facet_is_counted_under_the_other_filters(client, venues):
+    results = _browse(client, genre='Jazz', state='ca')
+    assert results["count"] == 1
+    assert [venue["name"] for venue in results["data"]] == ['Jazz Hall']
+    # genres of the CA venues; states of the Jazz venues
+    assert _counts(results, 'genre') == [('Rock', 2, False), ('Jazz', 1, True)]
+    assert _counts(results, 'state') == [('CA', 1, True), ('NY', 1, False)]
+    assert _counts(results, 'seeking') == [('true', 1, False)]
+
+
+def test_values_of_one_facet_widen_the_results(client, venues):
+    results = _browse(client, genre=['Jazz', 'Folk'], seeking='true')
+    assert sorted(venue["name"] for venue in results["data"]) == \
+        ['Folk Loft', 'Jazz Hall']
+    assert _counts(results, 'seeking') == [('true', 2, True),
+                                           ('false', 1, False)]
+
+
+def test_show_date_range(client, venues):
+    results = _browse(client, **{"from": '2030-01-01', "to": '2030-01-10'})
+    assert [venue["name"] for venue in results["data"]] == ['Jazz Hall']
+    assert _browse(client, **{"from": '2030-01-11'})["count"] == 0
+
+
+def test_empty_facets(client):
+    results = _browse(client)
+    assert results["count"] == 0 and results["data"] == []
+    assert results["facets"] == {"genre": [], "state": [], "seeking": []}
+    # a selected value stays listed, at zero, so it can be unticked
+    results = _browse(client, state='WY')
+    assert _counts(results, 'state') == [('WY', 0, True)]
+
+
+def test_no_match_keeps_other_facet_counts(client, venues):
+    results = _browse(client, genre='Folk', state='CA')
+    assert results["count"] == 0 and results["data"] == []
+    assert _counts(results, 'genre') == [('Rock', 2, False), ('Jazz', 1, False),
+                                         ('Folk', 0, True)]
+    assert _counts(results, 'state') == [('NY', 1, False), ('CA', 0, True)]
+
+
+def test_browse_page(client, venues):
+    body = client.get('/venues/browse', query_string={"genre": 'Jazz',
+                                                      "state": 'CA'}) \
+        .get_data(as_text=True)
+    assert '1 venue<' in body
+    assert 'Jazz Hall' in body and 'Blue Room' not in body
+    assert client.get('/venues/browse?seeking=maybe').status_code == 400
+    assert client.get('/venues/browse?from=tomorrow').status_code == 400
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from cache import LRUCache
+from models import db, Venue, Artist, Show
+
+
+@pytest.fixture
+def cached(app):
+    # the testing config renders every page afresh; cache like production
+    app.extensions['fragment_cache'] = LRUCache()
+
+
+def _page(client, path):
+    return client.get(path).get_data(as_text=True)
+
+def _form(model, entity_id):
+    # requests close the shared session, so read the fields up front
+    entity = model.query.get(entity_id)
+    return {"name": entity.name, "city": entity.city, "state": entity.state,
+            "address": getattr(entity, 'address', ''), "genres": ['Jazz'],
+            "facebook_link": 'https://www.facebook.com/fyyur'}
+
+def _edit(client, path, form, **changes):
+    assert client.post(path, data=dict(form, **changes)).status_code == 302
+
+
+def test_venue_edit_reaches_cached_pages(client, seed, cached):
+    venue_ids, _ = seed(1, 1, 0)
+    venue_path = '/venues/%d' % venue_ids[0]
+    form = _form(Venue, venue_ids[0])
+    assert form["name"] in _page(client, venue_path)
+
+    _edit(client, venue_path + '/edit', form, name='Renamed Hall')
+    assert 'Renamed Hall' in _page(client, venue_path)
+
+
+def test_new_show_and_artist_edit_reach_cached_pages(client, seed, cached):
+    venue_ids, artist_ids = seed(1, 1, 0)
+    venue_path = '/venues/%d' % venue_ids[0]
+    form = _form(Artist, artist_ids[0])
+    assert form["name"] not in _page(client, venue_path)
+
+    start = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d 20:00:00')
+    client.post('/shows/create', data={"venue_id": str(venue_ids[0]),
+                                       "artist_id": str(artist_ids[0]),
+                                       "start_time": start})
+    assert form["name"] in _page(client, venue_path)
+
+    # the venue page lists the artist's name next to the show
+    _edit(client, '/artists/%d/edit' % artist_ids[0], form,
+          name='The Renamed Quartet')
+    assert 'The Renamed Quartet' in _page(client, venue_path)
+
+
+def test_write_from_another_worker_reaches_cached_page(client, seed, cached):
+    venue_ids, artist_ids = seed(1, 1, 0)
+    venue_path = '/venues/%d' % venue_ids[0]
+    artist_name = Artist.query.get(artist_ids[0]).name
+    assert artist_name not in _page(client, venue_path)
+
+    # a show booked elsewhere: nothing evicts this process's fragment
+    db.session.add(Show(venue_id=venue_ids[0], artist_id=artist_ids[0],
+                        time=datetime.now() + timedelta(days=7)))
+    db.session.commit()
+    assert artist_name in _page(client, venue_path)
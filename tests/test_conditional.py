@@ -0,0 +1,74 @@
+from datetime import date, datetime, timedelta, timezone
+
+import scheduling
+from models import db, Show
+
+
+def test_last_modified_ignores_upcoming_shows(client, seed):
+    venue_ids, artist_ids = seed(1, 1, 0)
+    db.session.add(Show(venue_id=venue_ids[0], artist_id=artist_ids[0],
+                        time=datetime.now() + timedelta(days=300)))
+    db.session.commit()
+    soon = datetime.now(timezone.utc) + timedelta(minutes=5)
+    for path in ('/venues', '/shows', '/venues/%d' % venue_ids[0],
+                 '/artists/%d' % artist_ids[0]):
+        response = client.get(path)
+        assert response.status_code == 200
+        assert response.last_modified is not None
+        assert response.last_modified < soon
+
+
+def test_etag_revalidates_until_a_write(client, seed):
+    venue_ids, artist_ids = seed(1, 1, 0)
+    path = '/venues/%d' % venue_ids[0]
+    etag = client.get(path).headers['ETag']
+    assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+
+    db.session.add(Show(venue_id=venue_ids[0], artist_id=artist_ids[0],
+                        time=datetime.now() + timedelta(days=3)))
+    db.session.commit()
+    assert client.get(path, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_etag_changes_when_a_show_is_deleted(client, seed):
+    venue_ids, artist_ids = seed(1, 1, 0)
+    # the deleted show is neither the latest edit nor the next upcoming one
+    old, newer = [Show(venue_id=venue_ids[0], artist_id=artist_ids[0],
+                       time=datetime.now() - timedelta(days=days))
+                  for days in (30, 10)]
+    db.session.add(old)
+    db.session.commit()
+    db.session.add(newer)
+    db.session.commit()
+    # requests close the shared session; keep the id, not the instance
+    old_id = old.id
+    paths = ('/venues', '/shows?window=all', '/venues/%d' % venue_ids[0],
+             '/artists/%d' % artist_ids[0])
+    etags = {path: client.get(path).headers['ETag'] for path in paths}
+
+    db.session.delete(Show.query.get(old_id))
+    db.session.commit()
+    for path in paths:
+        response = client.get(path, headers={"If-None-Match": etags[path]})
+        assert response.status_code == 200
+
+
+def test_calendar_etag_follows_the_default_range(client, seed, monkeypatch):
+    venue_ids, artist_ids = seed(1, 1, 0)
+    paths = ('/venues/%d/calendar' % venue_ids[0],
+             '/artists/%d/calendar' % artist_ids[0],
+             '/api/v1/venues/%d/availability' % venue_ids[0])
+    etags = {path: client.get(path).headers['ETag'] for path in paths}
+    for path in paths:
+        response = client.get(path, headers={"If-None-Match": etags[path]})
+        assert response.status_code == 304
+
+    class Tomorrow(date):
+        @classmethod
+        def today(cls):
+            return date.today() + timedelta(days=1)
+
+    monkeypatch.setattr(scheduling, 'date', Tomorrow)
+    for path in paths:
+        response = client.get(path, headers={"If-None-Match": etags[path]})
+        assert response.status_code == 200
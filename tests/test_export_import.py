@@ -0,0 +1,70 @@
+import io
+
+import pytest
+
+from exporter import export_stream
+from importer import import_stream
+from models import db, Venue, Artist, Genre
+
+
+def _round_trip(entity, fmt):
+    data = b''.join(export_stream(entity, fmt))
+    result = import_stream(entity, io.BytesIO(data), fmt)
+    assert result.errors == []
+    return result.inserted
+
+
+def _fields(entity):
+    return [(e.name, e.city, e.state, e.phone, e.facebook_link,
+             bool(e.currently_seeking), e.seeking_content,
+             [g.name for g in e.genres])
+            for e in entity.query.order_by(entity.id)]
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'ndjson'])
+def test_venues_round_trip(app, fmt):
+    jazz, folk = Genre(name='Jazz'), Genre(name='Folk')
+    db.session.add_all([
+        Venue(name='The Musical Hop', city='San Francisco', state='CA',
+              address='1015 Folsom Street', phone='123-123-1234',
+              facebook_link='https://www.facebook.com/TheMusicalHop',
+              genres=[folk, jazz], currently_seeking=True,
+              seeking_content='Looking for local artists'),
+        Venue(name='Park Square Live Music & Coffee', city='San Francisco',
+              state='CA', address='34 Whiskey Moore Ave', phone='415-000-1234',
+              facebook_link='https://www.facebook.com/ParkSquareLive',
+              genres=[jazz], currently_seeking=False,
+              seeking_content='Not booking until spring'),
+    ])
+    db.session.commit()
+    exported = _fields(Venue)
+
+    assert _round_trip('venues', fmt) == 2
+    assert _fields(Venue) == exported + exported
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'ndjson'])
+def test_artists_round_trip(app, fmt):
+    db.session.add(Artist(
+        name='Guns N Petals', city='San Francisco', state='CA',
+        phone='326-123-5000',
+        facebook_link='https://www.facebook.com/GunsNPetals',
+        genres=[Genre(name='Rock n Roll')], currently_seeking=False,
+        seeking_content='Touring this year'))
+    db.session.commit()
+    exported = _fields(Artist)
+
+    assert _round_trip('artists', fmt) == 1
+    assert _fields(Artist) == exported + exported
+
+
+def test_import_reads_older_exports(app):
+    data = (b'{"name": "The Dueling Pianos Bar", "city": "New York", '
+            b'"state": "NY", "address": "335 Delancey Street", '
+            b'"facebook_link": "https://www.facebook.com/DuelingPianos", '
+            b'"genres": "Classical,R&B", "seeking_talent": "False"}\n')
+    result = import_stream('venues', io.BytesIO(data), 'ndjson')
+    assert result.errors == []
+    venue = Venue.query.one()
+    assert venue.currently_seeking is False
+    assert [g.name for g in venue.genres] == ['Classical', 'R&B']
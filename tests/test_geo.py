@@ -0,0 +1,29 @@
+from geo import distance_km, geocode, nearby_venues, venues_within
+from models import db, Venue
+
+
+def _nearest(latitude, longitude, radius_km, limit):
+    found = sorted(
+        (distance_km(latitude, longitude, v.latitude, v.longitude), v.id)
+        for v in db.session.query(Venue.id, Venue.latitude, Venue.longitude))
+    return [venue_id for distance, venue_id in found
+            if distance <= radius_km][:limit]
+
+
+def test_nearby_matches_a_full_scan(seed):
+    seed(400, 1, 0)
+    latitude, longitude = geocode('Chicago', 'IL')
+    for radius_km, limit in ((1, 5), (10, 20), (25, 100), (500, 3)):
+        found = nearby_venues(latitude, longitude, radius_km, limit)
+        assert [row.id for _, row in found] == \
+            _nearest(latitude, longitude, radius_km, limit)
+
+
+def test_within_is_ordered_and_limited(seed):
+    seed(400, 1, 0)
+    latitude, longitude = geocode('Chicago', 'IL')
+    box = (latitude - 0.5, longitude - 0.5, latitude + 0.5, longitude + 0.5)
+    ids = sorted(v.id for v in Venue.query.filter(
+        Venue.latitude.between(box[0], box[2]),
+        Venue.longitude.between(box[1], box[3])))
+    assert [row.id for row in venues_within(*box, limit=7)] == ids[:7]
@@ -0,0 +1,29 @@
+import pytest
+
+
+@pytest.fixture
+def venue_and_artist(seed):
+    venue_ids, artist_ids = seed(1, 1, 0)
+    return venue_ids[0], artist_ids[0]
+
+
+def test_venue_pages_show_the_venue_search(client, venue_and_artist):
+    venue_id, _ = venue_and_artist
+    for path in ('/venues', '/venues/%d' % venue_id):
+        page = client.get(path).get_data(as_text=True)
+        assert 'action="/venues/search"' in page
+        assert 'action="/artists/search"' not in page
+    page = client.post('/venues/search', data={"search_term": "the"}) \
+        .get_data(as_text=True)
+    assert 'action="/venues/search"' in page
+
+
+def test_artist_pages_show_the_artist_search(client, venue_and_artist):
+    _, artist_id = venue_and_artist
+    for path in ('/artists', '/artists/%d' % artist_id):
+        page = client.get(path).get_data(as_text=True)
+        assert 'action="/artists/search"' in page
+        assert 'action="/venues/search"' not in page
+    page = client.post('/artists/search', data={"search_term": "the"}) \
+        .get_data(as_text=True)
+    assert 'action="/artists/search"' in page
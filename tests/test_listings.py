@@ -0,0 +1,41 @@
+def _count(client, queries, path):
+    queries.clear()
+    response = client.get(path)
+    assert response.status_code == 200
+    return len(queries)
+
+
+def test_venues_query_count_does_not_grow_with_catalogue(client, queries, seed):
+    seed(5, 10, 20)
+    small = _count(client, queries, '/venues')
+    seed(300, 600, 3000)
+    large = _count(client, queries, '/venues')
+    assert small == large
+
+
+def test_artists_query_count_does_not_grow_with_catalogue(client, queries, seed):
+    seed(5, 10, 20)
+    small = _count(client, queries, '/artists')
+    seed(300, 600, 3000)
+    large = _count(client, queries, '/artists')
+    assert small == large
+
+
+def test_venue_page_query_count_does_not_grow_with_shows(client, queries, seed):
+    venue_ids, _ = seed(1, 10, 5)
+    small = _count(client, queries, '/venues/%d' % venue_ids[0])
+    venue_ids, _ = seed(1, 10, 500)
+    large = _count(client, queries, '/venues/%d' % venue_ids[0])
+    assert small == large
+
+
+def test_empty_listings(client):
+    assert client.get('/venues').status_code == 200
+    assert client.get('/artists').status_code == 200
+    assert client.get('/shows').status_code == 200
+
+
+def test_shows_window_is_validated(client):
+    assert client.get('/shows?window=all').status_code == 200
+    assert client.get('/shows?window=past').status_code == 400
+    assert client.get('/api/v1/shows?window=past').status_code == 400
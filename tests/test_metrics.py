@@ -0,0 +1,27 @@
+import pytest
+from sqlalchemy import exc
+
+from models import db
+
+
+def test_metrics_answer_loopback_only(client):
+    assert client.get('/metrics').status_code == 200
+    assert client.get('/metrics/pool').status_code == 200
+    outside = {"REMOTE_ADDR": '203.0.113.7'}
+    assert client.get('/metrics', environ_base=outside).status_code == 403
+    assert client.get('/metrics/pool', environ_base=outside).status_code == 403
+
+
+def test_allowed_networks_are_configurable(app, client):
+    app.config['METRICS_ALLOWED_NETWORKS'] = ['10.0.0.0/8']
+    assert client.get('/metrics').status_code == 403
+    inside = {"REMOTE_ADDR": '10.1.2.3'}
+    assert client.get('/metrics', environ_base=inside).status_code == 200
+
+
+def test_failed_statement_leaves_no_timer_behind(app):
+    with db.engine.connect() as conn:
+        with pytest.raises(exc.DBAPIError):
+            conn.execute(db.text('SELECT * FROM "NoSuchTable"'))
+        assert 'metrics_query_start' not in conn.info
+        assert conn.execute(db.text('SELECT 1')).scalar() == 1
@@ -0,0 +1,31 @@
+import pytest
+
+from pagination import encode_cursor
+
+
+@pytest.mark.parametrize('path', [
+    # an object where a string key belongs
+    '/venues?cursor=W3siYSI6MX0sMSwxLDFd',
+    '/artists?cursor=W3siYSI6MX0sMV0',
+    # a string id, a boolean id, null for a required column
+    '/artists?cursor=' + encode_cursor(['Guns N Petals', '4']),
+    '/artists?cursor=' + encode_cursor(['Guns N Petals', True]),
+    '/artists?cursor=' + encode_cursor([None, 4]),
+    # wrong number of values, not base64 JSON, not a timestamp
+    '/artists?cursor=' + encode_cursor(['Guns N Petals']),
+    '/artists?cursor=not-a-cursor',
+    '/shows?cursor=' + encode_cursor(['yesterday', 1]),
+])
+def test_malformed_cursor_is_a_bad_request(client, path):
+    assert client.get(path).status_code == 400
+
+
+def test_cursor_walks_every_artist_once(client, seed):
+    _, artist_ids = seed(2, 25, 10)
+    seen, path = [], '/api/v1/artists?limit=10'
+    while path:
+        body = client.get(path).get_json()
+        seen += [artist["id"] for artist in body["artists"]]
+        cursor = body.get("next_cursor")
+        path = cursor and '/api/v1/artists?limit=10&cursor=' + cursor
+    assert sorted(seen) == sorted(artist_ids)
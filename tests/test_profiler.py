@@ -0,0 +1,42 @@
+import pytest
+from flask import g
+from sqlalchemy import exc
+
+from models import db
+from profiler import Profile, statement_shape
+
+
+def test_statement_shape_elides_values():
+    assert statement_shape("SELECT * FROM \"Show\"\n WHERE venue_id = 12 "
+                           "AND name = 'x''y' AND id IN (?, ?, ?)") == \
+        'SELECT * FROM "Show" WHERE venue_id = ? AND name = ? AND id IN (...)'
+
+
+def test_profiled_request_reports_its_queries(app, client, seed):
+    seed(5, 5, 20)
+    app.config['SQL_PROFILE'] = True
+    response = client.get('/venues')
+    assert int(response.headers['X-SQL-Queries']) > 0
+    assert response.headers['X-SQL-N-Plus-One'] == '0'
+
+
+def test_repeated_selects_are_an_n_plus_one(app):
+    with app.test_request_context('/'):
+        g.sql_profile = Profile()
+        for venue_id in range(6):
+            db.session.execute(db.text('SELECT :id'), {"id": venue_id})
+        summary = g.sql_profile.summary(threshold=5)
+    assert summary["queries"] == 6
+    assert summary["n_plus_one"] == ['SELECT ?']
+
+
+def test_failed_statement_is_not_recorded_or_left_behind(app):
+    with app.test_request_context('/'):
+        g.sql_profile = Profile()
+        with db.engine.connect() as conn:
+            with pytest.raises(exc.DBAPIError):
+                conn.execute(db.text('SELECT * FROM "NoSuchTable"'))
+            assert 'profile_start' not in conn.info
+            conn.execute(db.text('SELECT 1'))
+        shapes = [shape for shape, _, _ in g.sql_profile.statements]
+    assert shapes == ['SELECT ?']
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, Show
+from scheduling import check_booking
+
+START = datetime(2031, 5, 1, 20, 0)
+
+
+@pytest.fixture
+def booked(seed):
+    """Two venues and two artists; venue 0 has artist 0 at START."""
+    venue_ids, artist_ids = seed(2, 2, 0)
+    db.session.add(Show(venue_id=venue_ids[0], artist_id=artist_ids[0],
+                        time=START))
+    db.session.commit()
+    return venue_ids, artist_ids
+
+
+def test_overlap_at_the_venue_is_rejected(booked):
+    venue_ids, artist_ids = booked
+    errors = check_booking(venue_ids[0], artist_ids[1],
+                           START + timedelta(minutes=90))
+    assert list(errors) == ['venue_id']
+
+
+def test_overlap_for_the_artist_is_rejected(booked):
+    venue_ids, artist_ids = booked
+    errors = check_booking(venue_ids[1], artist_ids[0],
+                           START - timedelta(minutes=119))
+    assert list(errors) == ['artist_id']
+
+
+def test_back_to_back_bookings_are_allowed(booked):
+    venue_ids, artist_ids = booked
+    for delta in (timedelta(minutes=120), timedelta(minutes=-120)):
+        assert check_booking(venue_ids[0], artist_ids[0], START + delta) == {}
+
+
+def test_unknown_ids_are_reported(booked):
+    errors = check_booking(10 ** 6, 10 ** 6, START)
+    assert sorted(errors) == ['artist_id', 'venue_id']
+
+
+def _submit(client, venue_id, artist_id, start):
+    return client.post('/shows/create', data={
+        "venue_id": str(venue_id), "artist_id": str(artist_id),
+        "start_time": start.strftime('%Y-%m-%d %H:%M:%S')})
+
+
+def test_form_rejects_a_double_booking(client, booked):
+    venue_ids, artist_ids = booked
+    response = _submit(client, venue_ids[0], artist_ids[1],
+                       START + timedelta(minutes=30))
+    assert 'The venue is already booked at' in response.get_data(as_text=True)
+    assert Show.query.count() == 1
+
+
+def test_form_books_back_to_back(client, booked):
+    venue_ids, artist_ids = booked
+    response = _submit(client, venue_ids[0], artist_ids[0],
+                       START + timedelta(minutes=120))
+    assert 'Show was successfully listed!' in response.get_data(as_text=True)
+    assert Show.query.count() == 2
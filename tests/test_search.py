@@ -0,0 +1,30 @@
+import pytest
+
+from models import db, Venue
+
+
+@pytest.fixture
+def venues(app):
+    db.session.add_all([
+        Venue(name='The Musical Hop', city='San Francisco', state='CA',
+              address='1015 Folsom Street'),
+        Venue(name='100% Vinyl', city='New York', state='NY',
+              address='335 Delancey Street'),
+    ])
+    db.session.commit()
+
+
+def _names(client, term):
+    body = client.get('/api/v1/venues/search', query_string={"q": term}) \
+        .get_json()
+    return sorted(venue["name"] for venue in body["data"])
+
+
+def test_search_matches_word_prefixes(client, venues):
+    assert _names(client, 'music') == ['The Musical Hop']
+    assert _names(client, 'san fran') == ['The Musical Hop']
+
+
+@pytest.mark.parametrize('term', ['%', '_', '%%', '\\'])
+def test_like_wildcards_match_literally(client, venues, term):
+    assert _names(client, term) == (['100% Vinyl'] if term == '%' else [])
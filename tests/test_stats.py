@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+from models import db, Venue, Artist, Show, VenueStats, ArtistStats
+from stats import COLUMNS, _aggregate, reconcile_stats
+
+
+def _rollups(stats, key):
+    return sorted(tuple(row) for row in db.session.query(
+        key, *[getattr(stats, column) for column in COLUMNS]))
+
+def _recomputed(model):
+    return sorted(tuple(row) for row in _aggregate(model, datetime.now()))
+
+def assert_consistent():
+    assert _rollups(VenueStats, VenueStats.venue_id) == _recomputed(Venue)
+    assert _rollups(ArtistStats, ArtistStats.artist_id) == _recomputed(Artist)
+
+
+def test_rollups_follow_show_writes(seed):
+    venue_ids, artist_ids = seed(3, 3, 0)
+    now = datetime.now().replace(microsecond=0)
+    shows = [Show(venue_id=venue_ids[i % 3], artist_id=artist_ids[i % 2],
+                  time=now + timedelta(days=days))
+             for i, days in enumerate((-30, -2, 3, 10, 40, 90))]
+    db.session.add_all(shows)
+    db.session.commit()
+    assert_consistent()
+
+    # move one show to another venue and later, delete another, add one
+    shows[2].venue_id, shows[2].time = venue_ids[2], now + timedelta(days=60)
+    db.session.delete(shows[4])
+    db.session.add(Show(venue_id=venue_ids[0], artist_id=artist_ids[2],
+                        time=now - timedelta(days=5)))
+    db.session.commit()
+    assert_consistent()
+
+
+def test_seeded_rollups_match_shows(seed):
+    seed(10, 20, 300)
+    assert_consistent()
+
+
+def test_reconcile_rolls_past_shows_forward(seed):
+    venue_ids, artist_ids = seed(1, 1, 0)
+    db.session.add(Show(venue_id=venue_ids[0], artist_id=artist_ids[0],
+                        time=datetime.now() + timedelta(days=1)))
+    db.session.commit()
+    later = datetime.now() + timedelta(days=2)
+    assert reconcile_stats(now=later) == 2
+    stats = VenueStats.query.get(venue_ids[0])
+    assert (stats.upcoming_shows, stats.next_show_time) == (0, None)
+    assert stats.total_shows == 1
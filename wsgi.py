@@ -0,0 +1,10 @@
+"""Production entry point:  gunicorn wsgi:app
+
+Settings come from gunicorn.conf.py and the environment; FYYUR_ENV defaults
+to production here.
+"""
+import os
+
+from app import create_app
+
+app = create_app(os.environ.get('FYYUR_ENV', 'production'))